@@ -2,9 +2,11 @@
 
 from ._ffi import alsa, ffi
 from .address import ALL_SUBSCRIBERS, SYSTEM_ANNOUNCE, SYSTEM_TIMER, Address
-from .client import (AsyncSequencerClient, ClientInfo, ClientPool, ClientType, RemoveCondition,
-                     RemoveEvents, SequencerClient, SequencerType, SubscriptionQuery,
-                     SubscriptionQueryType, SystemInfo)
+from .cache import InfoCache
+from .client import (AsyncSequencerClient, ClientInfo, ClientPool, ClientType, Connection,
+                     RemoveCondition, RemoveEvents, SequencerClient, SequencerType,
+                     SubscriptionQuery, SubscriptionQueryType, SystemInfo)
+from .clock import QueueClock, QueueTimeMapping
 from .event import (ActiveSensingEvent, BounceEvent, ChannelPressureEvent, ClientChangeEvent,
                     ClientExitEvent, ClientStartEvent, ClockEvent, ContinueEvent,
                     Control14BitChangeEvent, ControlChangeEvent, EchoEvent, Event, EventFlags,
@@ -18,20 +20,39 @@ from .event import (ActiveSensingEvent, BounceEvent, ChannelPressureEvent, Clien
                     SyncPositionChangedEvent, SysExEvent, SystemEvent, TickEvent,
                     TimeSignatureEvent, TuneRequestEvent, UserVar0Event, UserVar1Event,
                     UserVar2Event, UserVar3Event, UserVar4Event)
+from .eventlog import EventLog, EventLogRecord, EventLogWriter, RingRecorder
 from .exceptions import ALSAError, Error, StateError
+from .forward import Forwarder, ForwardRule
+from .notes import NoteTracker, SoundingNote
+from .player import MultiTrackPlayer, QueuePlayer
 from .port import READ_PORT, RW_PORT, WRITE_PORT, Port, PortCaps, PortInfo, PortType
+from .processing import ControllerCoalescer, ParameterAssembler, TimestampMerger
 from .queue import Queue, QueueInfo, QueueStatus, QueueTempo, QueueTimer, QueueTimerType
+from .routing import Route, Router
+from .scheduler import EchoScheduler
+from .shared import SharedClientView, get_shared_client
+from .smf import MidiFile, MidiFilePlayer, MidiFileRecorder, MidiFileWriter
+from .sync import ClockFollower, ClockGenerator
+from .tempo import TempoMap
+from .topology import TopologyDelta
 
 __all__ = [
         "Address", "ALL_SUBSCRIBERS", "SYSTEM_TIMER", "SYSTEM_ANNOUNCE",
         "SequencerClient", "AsyncSequencerClient", "ClientInfo", "ClientType", "SequencerType",
-        "SystemInfo", "SubscriptionQueryType", "SubscriptionQuery", "ClientPool", "RemoveEvents",
-        "RemoveCondition",
+        "SystemInfo", "SubscriptionQueryType", "SubscriptionQuery", "Connection", "ClientPool",
+        "RemoveEvents", "RemoveCondition", "InfoCache",
         "RealTime", "EventType", "EventFlags", "Event", "MidiBytesEvent",
         "Error", "StateError", "ALSAError",
         "Port", "PortCaps", "PortType", "PortInfo",
         "READ_PORT", "WRITE_PORT", "RW_PORT",
         "Queue", "QueueInfo", "QueueStatus", "QueueTempo", "QueueTimer", "QueueTimerType",
+        "QueuePlayer", "MultiTrackPlayer", "EchoScheduler", "TempoMap", "QueueClock",
+        "QueueTimeMapping", "ClockFollower", "ClockGenerator",
+        "TopologyDelta", "SharedClientView", "get_shared_client", "MidiFile", "MidiFilePlayer",
+        "MidiFileWriter", "MidiFileRecorder", "EventLogWriter", "EventLog", "EventLogRecord",
+        "RingRecorder", "Forwarder", "ForwardRule", "Route", "Router",
+        "ControllerCoalescer", "TimestampMerger", "ParameterAssembler",
+        "NoteTracker", "SoundingNote",
         "alsa", "ffi",
 
         "SystemEvent", "ResultEvent", "NoteEvent", "NoteOnEvent", "NoteOffEvent",
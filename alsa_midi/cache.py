@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+from .address import Address
+from .event import AddressEventBase, ConnectEventBase, Event, EventType
+
+if TYPE_CHECKING:
+    from .client import ClientInfo
+    from .port import PortInfo
+
+
+_CLIENT_EVENTS = frozenset((EventType.CLIENT_START, EventType.CLIENT_EXIT,
+                            EventType.CLIENT_CHANGE))
+_PORT_EVENTS = frozenset((EventType.PORT_START, EventType.PORT_EXIT, EventType.PORT_CHANGE))
+_SUBSCRIPTION_EVENTS = frozenset((EventType.PORT_SUBSCRIBED, EventType.PORT_UNSUBSCRIBED))
+
+_ANNOUNCE_EVENTS = _CLIENT_EVENTS | _PORT_EVENTS | _SUBSCRIPTION_EVENTS
+
+
+class InfoCache:
+    """Bounded cache of client and port information.
+
+    When assigned to :attr:`SequencerClientBase.info_cache`, results of
+    :meth:`~SequencerClientBase.get_client_info` and
+    :meth:`~SequencerClientBase.get_port_info` are kept here and the entries
+    are dropped when matching announcement events are received by the client.
+
+    Least recently used entries are evicted when the cache is full.
+
+    :param max_size: maximum number of entries (separately for clients and ports)
+
+    :ivar max_size: maximum number of entries (separately for clients and ports)
+    """
+
+    max_size: int
+
+    def __init__(self, max_size: int = 256):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self._clients: OrderedDict[int, 'ClientInfo'] = OrderedDict()
+        self._ports: OrderedDict[Address, 'PortInfo'] = OrderedDict()
+
+    def __len__(self):
+        return len(self._clients) + len(self._ports)
+
+    def get_client_info(self, client_id: int) -> Optional['ClientInfo']:
+        """Return cached client information or `None` if not available.
+
+        :param client_id: client id
+        """
+        info = self._clients.get(client_id)
+        if info is not None:
+            self._clients.move_to_end(client_id)
+        return info
+
+    def put_client_info(self, info: 'ClientInfo'):
+        """Store client information in the cache.
+
+        :param info: client information
+        """
+        self._clients[info.client_id] = info
+        self._clients.move_to_end(info.client_id)
+        if len(self._clients) > self.max_size:
+            self._clients.popitem(last=False)
+
+    def get_port_info(self, addr: Address) -> Optional['PortInfo']:
+        """Return cached port information or `None` if not available.
+
+        :param addr: port address
+        """
+        info = self._ports.get(addr)
+        if info is not None:
+            self._ports.move_to_end(addr)
+        return info
+
+    def put_port_info(self, info: 'PortInfo'):
+        """Store port information in the cache.
+
+        :param info: port information
+        """
+        addr = Address(info.client_id, info.port_id)
+        self._ports[addr] = info
+        self._ports.move_to_end(addr)
+        if len(self._ports) > self.max_size:
+            self._ports.popitem(last=False)
+
+    def invalidate_client(self, client_id: int):
+        """Drop information about a client and all its ports.
+
+        :param client_id: client id
+        """
+        self._clients.pop(client_id, None)
+        for addr in [addr for addr in self._ports if addr.client_id == client_id]:
+            del self._ports[addr]
+
+    def invalidate_port(self, addr: Address):
+        """Drop information about a port.
+
+        :param addr: port address
+        """
+        self._ports.pop(addr, None)
+
+    def invalidate(self, event: Event) -> bool:
+        """Drop entries affected by an announcement event.
+
+        :param event: event received from the :data:`~alsa_midi.SYSTEM_ANNOUNCE` port
+
+        :return: `True` if the event was an announcement event
+        """
+        e_type = event.type
+        if e_type in _PORT_EVENTS:
+            assert isinstance(event, AddressEventBase)
+            self.invalidate_port(event.addr)
+            if e_type != EventType.PORT_CHANGE:
+                # port count in the client information changed
+                self._clients.pop(event.addr.client_id, None)
+        elif e_type in _SUBSCRIPTION_EVENTS:
+            # subscription counters in the port information changed
+            assert isinstance(event, ConnectEventBase)
+            self.invalidate_port(event.connect_sender)
+            self.invalidate_port(event.connect_dest)
+        elif e_type in _CLIENT_EVENTS:
+            assert isinstance(event, AddressEventBase)
+            self.invalidate_client(event.addr.client_id)
+        else:
+            return False
+        return True
+
+    def clear(self):
+        """Drop all the cached information."""
+        self._clients.clear()
+        self._ports.clear()
+
+
+__all__ = ["InfoCache"]
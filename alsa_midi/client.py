@@ -2,21 +2,23 @@ import asyncio
 import errno
 import select
 import time
-from collections.abc import MutableMapping
-from dataclasses import dataclass, field
+from collections.abc import AsyncIterator, Iterable, Iterator, MutableMapping
+from dataclasses import dataclass, field, replace
 from enum import IntEnum, IntFlag
 from functools import partial
-from typing import Any, Callable, NewType, Optional, Union, overload
+from typing import Any, Callable, NamedTuple, NewType, Optional, Union, overload
 from weakref import WeakValueDictionary
 
 from ._ffi import alsa, ffi
-from .address import Address, AddressType
+from .address import SYSTEM_ANNOUNCE, Address, AddressType
+from .cache import _ANNOUNCE_EVENTS, InfoCache
 from .event import MIDI_BYTES_EVENTS, Event, EventType, MidiBytesEvent, RealTime, _snd_seq_event_t
-from .exceptions import StateError
+from .exceptions import ALSAError, StateError
 from .port import (DEFAULT_PORT_TYPE, READ_PORT_PREFERRED_TYPES, RW_PORT, RW_PORT_PREFERRED_TYPES,
                    WRITE_PORT_PREFERRED_TYPES, Port, PortCaps, PortInfo, PortType,
                    get_port_info_sort_key)
 from .queue import Queue, QueueInfo, QueueStatus
+from .topology import TopologyDelta
 from .util import _check_alsa_error
 
 _snd_seq_t = NewType("_snd_seq_t", object)
@@ -269,6 +271,28 @@ class SubscriptionQuery:
         return query
 
 
+class Connection(NamedTuple):
+    """Port connection information (named tuple).
+
+    Compact description of a single sender→destination edge of the
+    sequencer connection graph, as returned by
+    :meth:`SequencerClientBase.list_connections`.
+
+    :ivar sender: sender port address
+    :ivar dest: destination port address
+    :ivar queue_id: queue id used for time stamping
+    :ivar exclusive: exclusive connection
+    :ivar time_update: time stamp updates enabled
+    :ivar time_real: real time stamps used instead of MIDI ticks
+    """
+    sender: Address
+    dest: Address
+    queue_id: int = 0
+    exclusive: bool = False
+    time_update: bool = False
+    time_real: bool = False
+
+
 _snd_seq_client_pool_t = NewType("_snd_seq_client_pool_t", object)
 
 
@@ -329,11 +353,18 @@ class RemoveCondition(IntFlag):
     TAG_MATCH = alsa.SND_SEQ_REMOVE_TAG_MATCH
 
 
+_snd_seq_remove_events_t = NewType("_snd_seq_remove_events_t", object)
+
+
 @dataclass
 class RemoveEvents:
     """Events removal condition.
 
-    Represents :alsa:`snd_seq_remove_events_t` data."""
+    Represents :alsa:`snd_seq_remove_events_t` data.
+
+    The ALSA structure is built on first use and kept with the object, so
+    a condition used repeatedly (e.g. for every seek) is cheap to reuse.
+    Only `time` and `tag` may be changed without rebuilding it."""
     condition: RemoveCondition = RemoveCondition(0)
     queue_id: int = 0
     time: Union[RealTime, int] = field(default_factory=RealTime)
@@ -341,6 +372,42 @@ class RemoveEvents:
     channel: int = 0
     event_type: EventType = EventType.NONE
     tag: int = 0
+    _alsa: Optional[tuple[_snd_seq_remove_events_t, Any]] = field(
+            default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value: Any):
+        if name not in ("time", "tag", "_alsa"):
+            object.__setattr__(self, "_alsa", None)
+        object.__setattr__(self, name, value)
+
+    def _to_alsa(self) -> _snd_seq_remove_events_t:
+        if self._alsa is None:
+            cond_p = ffi.new("snd_seq_remove_events_t **")
+            err = alsa.snd_seq_remove_events_malloc(cond_p)
+            _check_alsa_error(err)
+            a_cond = ffi.gc(cond_p[0], alsa.snd_seq_remove_events_free)
+            alsa.snd_seq_remove_events_set_condition(a_cond, self.condition)
+            alsa.snd_seq_remove_events_set_queue(a_cond, self.queue_id)
+            dest = Address(self.dest)
+            a_dest = ffi.new("snd_seq_addr_t *")
+            a_dest.client = dest.client_id
+            a_dest.port = dest.port_id
+            alsa.snd_seq_remove_events_set_dest(a_cond, a_dest)
+            alsa.snd_seq_remove_events_set_channel(a_cond, self.channel)
+            alsa.snd_seq_remove_events_set_event_type(a_cond, self.event_type)
+            a_time = ffi.new("snd_seq_timestamp_t *")
+            self._alsa = (a_cond, a_time)
+        else:
+            a_cond, a_time = self._alsa
+        time = self.time
+        if isinstance(time, RealTime):
+            a_time.time.tv_sec = time.seconds
+            a_time.time.tv_nsec = time.nanoseconds
+        else:
+            a_time.tick = time
+        alsa.snd_seq_remove_events_set_time(a_cond, a_time)
+        alsa.snd_seq_remove_events_set_tag(a_cond, self.tag)
+        return a_cond
 
 
 class SequencerClientBase:
@@ -354,9 +421,16 @@ class SequencerClientBase:
 
     :ivar client_id: ALSA client id
     :ivar handle: ALSA client handle (for use with the cffi bindings)
+    :ivar info_cache: optional client and port information cache. When set,
+                      :meth:`get_client_info` and :meth:`get_port_info`
+                      results are cached and invalidated by the announcement
+                      events received with :meth:`event_input` (a port
+                      connected from :data:`~alsa_midi.SYSTEM_ANNOUNCE` is
+                      needed for that).
     """
     client_id: int
     handle: _snd_seq_t
+    info_cache: Optional[InfoCache] = None
     _handle_p: _snd_seq_t_p
     _fd: int = -1
     _event_parser: Optional[_snd_midi_event_t] = None
@@ -667,25 +741,41 @@ class SequencerClientBase:
             return result, None
         alsa_event = buf[0]
         try:
-            if prefer_bytes and alsa_event.type in MIDI_BYTES_EVENTS:
-                parser = self._get_event_parser()
-                if alsa_event.type == EventType.SYSEX:
-                    buf_len = alsa_event.data.ext.len
-                else:
-                    buf_len = 12
-                bytes_buf = ffi.new("char[]", buf_len)
-                count = alsa.snd_midi_event_decode(parser, bytes_buf, buf_len, alsa_event)
-                if count < 0:
-                    return count, None
-                event = MidiBytesEvent._from_alsa(alsa_event,
-                                                  midi_bytes=ffi.buffer(bytes_buf, count))
-                return result, event
-            else:
-                cls = Event._specialized.get(buf[0].type, Event)
-                return result, cls._from_alsa(alsa_event)
+            return self._decode_event(result, alsa_event, prefer_bytes=prefer_bytes)
         finally:
             alsa.snd_seq_free_event(alsa_event)
 
+    def _decode_event(self, result: int, alsa_event: _snd_seq_event_t,
+                      prefer_bytes: bool = False) -> tuple[int, Optional[Event]]:
+        """Create an :class:`Event` object for ALSA event received.
+
+        :param result: result of the :alsa:`snd_seq_event_input` call, returned
+                       on success
+        :param alsa_event: the event received
+        :param prefer_bytes: set to `True` to return :class:`MidiBytesEvent` when possible.
+
+        :return: `result` or negative error code and the event object.
+        """
+        if prefer_bytes and alsa_event.type in MIDI_BYTES_EVENTS:
+            parser = self._get_event_parser()
+            if alsa_event.type == EventType.SYSEX:
+                buf_len = alsa_event.data.ext.len
+            else:
+                buf_len = 12
+            bytes_buf = ffi.new("char[]", buf_len)
+            count = alsa.snd_midi_event_decode(parser, bytes_buf, buf_len, alsa_event)
+            if count < 0:
+                return count, None
+            event = MidiBytesEvent._from_alsa(alsa_event,
+                                              midi_bytes=ffi.buffer(bytes_buf, count))
+            return result, event
+        else:
+            cls = Event._specialized.get(alsa_event.type, Event)
+            event = cls._from_alsa(alsa_event)
+            if self.info_cache is not None and alsa_event.type in _ANNOUNCE_EVENTS:
+                self.info_cache.invalidate(event)
+            return result, event
+
     def event_input(self, prefer_bytes: bool = False):
         """Receive an incoming event.
 
@@ -953,6 +1043,11 @@ class SequencerClientBase:
 
         :return: client information
         """
+        cache = self.info_cache
+        if cache is not None:
+            result = cache.get_client_info(self.client_id if client_id is None else client_id)
+            if result is not None:
+                return result
         info_p = ffi.new("snd_seq_client_info_t **")
         err = alsa.snd_seq_client_info_malloc(info_p)
         _check_alsa_error(err)
@@ -963,6 +1058,8 @@ class SequencerClientBase:
             err = alsa.snd_seq_get_any_client_info(self.handle, client_id, info)
         _check_alsa_error(err)
         result = ClientInfo._from_alsa(info)
+        if cache is not None:
+            cache.put_client_info(result)
         return result
 
     def set_client_info(self, info: ClientInfo):
@@ -976,6 +1073,8 @@ class SequencerClientBase:
         a_info = info._to_alsa()
         err = alsa.snd_seq_set_client_info(self.handle, a_info)
         _check_alsa_error(err)
+        if self.info_cache is not None:
+            self.info_cache.invalidate_client(self.client_id)
 
     def set_client_event_filter(self, event_type: EventType):
         """Add an event to client's event filter.
@@ -1036,6 +1135,11 @@ class SequencerClientBase:
             port_id = port
         else:
             client_id, port_id = Address(port)
+        cache = self.info_cache
+        if cache is not None:
+            result = cache.get_port_info(Address(client_id, port_id))
+            if result is not None:
+                return result
         info_p = ffi.new("snd_seq_port_info_t **")
         err = alsa.snd_seq_port_info_malloc(info_p)
         _check_alsa_error(err)
@@ -1046,6 +1150,8 @@ class SequencerClientBase:
             err = alsa.snd_seq_get_any_port_info(self.handle, client_id, port_id, info)
         _check_alsa_error(err)
         result = PortInfo._from_alsa(info)
+        if cache is not None:
+            cache.put_port_info(result)
         return result
 
     def set_port_info(self, port: Union[int, Port], info: PortInfo):
@@ -1060,6 +1166,8 @@ class SequencerClientBase:
         alsa_info = info._to_alsa()
         err = alsa.snd_seq_set_port_info(self.handle, port_id, alsa_info)
         _check_alsa_error(err)
+        if self.info_cache is not None:
+            self.info_cache.invalidate_port(Address(self.client_id, port_id))
 
     @overload
     def query_next_port(self, client_id: int, previous: PortInfo
@@ -1150,6 +1258,14 @@ class SequencerClientBase:
         _check_alsa_error(err)
         port_ainfo = ffi.gc(port_ainfo_p[0], alsa.snd_seq_port_info_free)
 
+        # plain ints, so no IntFlag objects are created for ports filtered out
+        type_mask = int(type) if type else 0
+        cap_read = int(PortCaps.READ)
+        cap_write = int(PortCaps.WRITE)
+        cap_sub_read = int(PortCaps.SUBS_READ)
+        cap_sub_write = int(PortCaps.SUBS_WRITE)
+        cap_no_export = int(PortCaps.NO_EXPORT)
+
         alsa.snd_seq_client_info_set_client(client_ainfo, -1)
         while True:
             err = alsa.snd_seq_query_next_client(self.handle, client_ainfo)
@@ -1161,11 +1277,12 @@ class SequencerClientBase:
             if client_id == 0 and not include_system:
                 continue
 
-            client_name = alsa.snd_seq_client_info_get_name(client_ainfo)
-            client_name = ffi.string(client_name).decode()
-
-            if client_name == "Midi Through" and not include_midi_through:
-                continue
+            client_name = None
+            if not include_midi_through:
+                client_name = alsa.snd_seq_client_info_get_name(client_ainfo)
+                client_name = ffi.string(client_name).decode()
+                if client_name == "Midi Through":
+                    continue
 
             alsa.snd_seq_port_info_set_client(port_ainfo, client_id)
             alsa.snd_seq_port_info_set_port(port_ainfo, -1)
@@ -1175,19 +1292,21 @@ class SequencerClientBase:
                     break
                 _check_alsa_error(err)
 
-                port_info = PortInfo._from_alsa(port_ainfo)
+                # only the fields needed for filtering are read first
+                if type_mask:
+                    p_type = alsa.snd_seq_port_info_get_type(port_ainfo)
+                    if (p_type & type_mask) != type_mask:
+                        continue
 
-                if type and (port_info.type & type) != type:
-                    continue
+                caps = alsa.snd_seq_port_info_get_capability(port_ainfo)
 
-                if port_info.capability & PortCaps.NO_EXPORT \
-                        and not include_no_export:
+                if caps & cap_no_export and not include_no_export:
                     continue
 
-                can_write = port_info.capability & PortCaps.WRITE
-                can_sub_write = port_info.capability & PortCaps.SUBS_WRITE
-                can_read = port_info.capability & PortCaps.READ
-                can_sub_read = port_info.capability & PortCaps.SUBS_READ
+                can_write = caps & cap_write
+                can_sub_write = caps & cap_sub_write
+                can_read = caps & cap_read
+                can_sub_read = caps & cap_sub_read
 
                 if output:
                     if not can_write:
@@ -1212,6 +1331,11 @@ class SequencerClientBase:
                     elif not can_read and not can_write:
                         continue
 
+                if client_name is None:
+                    client_name = alsa.snd_seq_client_info_get_name(client_ainfo)
+                    client_name = ffi.string(client_name).decode()
+
+                port_info = PortInfo._from_alsa(port_ainfo)
                 port_info.client_name = client_name
                 result.append(port_info)
 
@@ -1363,6 +1487,96 @@ class SequencerClientBase:
                 i += 1
         return result
 
+    def _iter_connections(self, include_system: bool = False) -> Iterator[list[Connection]]:
+        """Walk all ports of all clients and yield their outgoing connections.
+
+        One list of connections is yielded per client, so the caller may
+        interleave the walk with other work. The ALSA info and query objects
+        are allocated once and reused for the whole walk.
+        """
+        self._check_handle()
+
+        client_ainfo_p = ffi.new("snd_seq_client_info_t **")
+        err = alsa.snd_seq_client_info_malloc(client_ainfo_p)
+        _check_alsa_error(err)
+        client_ainfo = ffi.gc(client_ainfo_p[0], alsa.snd_seq_client_info_free)
+        port_ainfo_p = ffi.new("snd_seq_port_info_t **")
+        err = alsa.snd_seq_port_info_malloc(port_ainfo_p)
+        _check_alsa_error(err)
+        port_ainfo = ffi.gc(port_ainfo_p[0], alsa.snd_seq_port_info_free)
+        query_p = ffi.new("snd_seq_query_subscribe_t **")
+        err = alsa.snd_seq_query_subscribe_malloc(query_p)
+        _check_alsa_error(err)
+        query = ffi.gc(query_p[0], alsa.snd_seq_query_subscribe_free)
+
+        alsa.snd_seq_client_info_set_client(client_ainfo, -1)
+        while True:
+            err = alsa.snd_seq_query_next_client(self.handle, client_ainfo)
+            if err == -errno.ENOENT:
+                break
+            _check_alsa_error(err)
+
+            client_id = alsa.snd_seq_client_info_get_client(client_ainfo)
+            if client_id == 0 and not include_system:
+                continue
+
+            result = []
+            alsa.snd_seq_port_info_set_client(port_ainfo, client_id)
+            alsa.snd_seq_port_info_set_port(port_ainfo, -1)
+            while True:
+                err = alsa.snd_seq_query_next_port(self.handle, port_ainfo)
+                if err == -errno.ENOENT:
+                    break
+                _check_alsa_error(err)
+
+                port_id = alsa.snd_seq_port_info_get_port(port_ainfo)
+                sender = Address(client_id, port_id)
+
+                # every connection is listed once: as a 'read' subscription of its sender
+                alsa.snd_seq_query_subscribe_set_client(query, client_id)
+                alsa.snd_seq_query_subscribe_set_port(query, port_id)
+                alsa.snd_seq_query_subscribe_set_type(query, SubscriptionQueryType.READ)
+                i = 0
+                while True:
+                    alsa.snd_seq_query_subscribe_set_index(query, i)
+                    err = alsa.snd_seq_query_port_subscribers(self.handle, query)
+                    if err < 0:
+                        break
+                    a_addr = alsa.snd_seq_query_subscribe_get_addr(query)
+                    result.append(Connection(
+                        sender=sender,
+                        dest=Address(a_addr.client, a_addr.port),
+                        queue_id=alsa.snd_seq_query_subscribe_get_queue(query),
+                        exclusive=bool(alsa.snd_seq_query_subscribe_get_exclusive(query)),
+                        time_update=bool(alsa.snd_seq_query_subscribe_get_time_update(query)),
+                        time_real=bool(alsa.snd_seq_query_subscribe_get_time_real(query)),
+                        ))
+                    i += 1
+                    if i >= alsa.snd_seq_query_subscribe_get_num_subs(query):
+                        # no need for another query to learn there are no more
+                        break
+            yield result
+
+    def list_connections(self, *, include_system: bool = False) -> list[Connection]:
+        """List all port connections in the system.
+
+        Walks every port of every client in a single pass, reusing one set of
+        ALSA query objects, which is much cheaper than calling
+        :meth:`list_port_subscribers` for each port.
+
+        Wraps :alsa:`snd_seq_query_next_client`, :alsa:`snd_seq_query_next_port`
+        and :alsa:`snd_seq_query_port_subscribers`.
+
+        :param include_system: include connections from the system ports (e.g.
+                               announcement subscriptions)
+
+        :return: list of sender→destination connections
+        """
+        result = []
+        for connections in self._iter_connections(include_system=include_system):
+            result += connections
+        return result
+
     def get_client_pool(self) -> ClientPool:
         """Obtain the pool information of the client.
 
@@ -1536,19 +1750,7 @@ class SequencerClientBase:
                 and any((queue, time, dest, channel, event_type, tag))):
             raise TypeError("condition must not be RemoveEvents object when using other arguments")
         self._check_handle()
-        cond_p = ffi.new("snd_seq_remove_events_t **")
-        err = alsa.snd_seq_remove_events_malloc(cond_p)
-        _check_alsa_error(err)
-        a_cond = ffi.gc(cond_p[0], alsa.snd_seq_remove_events_free)
-        if isinstance(condition, RemoveEvents):
-            cond_bits = condition.condition
-            queue_id = condition.queue_id
-            time = condition.time
-            dest = condition.dest
-            channel = condition.channel
-            event_type = condition.event_type
-            tag = condition.tag
-        else:
+        if not isinstance(condition, RemoveEvents):
             if condition is None:
                 cond_bits = RemoveCondition(0)
             else:
@@ -1575,35 +1777,45 @@ class SequencerClientBase:
             elif queue is not None:
                 queue_id = queue.queue_id
             else:
-                queue_id = None
-
-        alsa.snd_seq_remove_events_set_condition(a_cond, cond_bits)
-        if queue_id is not None:
-            alsa.snd_seq_remove_events_set_queue(a_cond, queue_id)
-        if time is not None:
-            a_time = ffi.new("snd_seq_timestamp_t *")
-            if isinstance(time, RealTime):
-                a_time.time.tv_sec = time.seconds
-                a_time.time.tv_nsec = time.nanoseconds
-            else:
-                a_time.tick = time
-            alsa.snd_seq_remove_events_set_time(a_cond, a_time)
-        if dest is not None:
-            dest = Address(dest)
-            a_dest = ffi.new("snd_seq_addr_t *")
-            a_dest.client = dest.client_id
-            a_dest.port = dest.port_id
-            alsa.snd_seq_remove_events_set_dest(a_cond, a_dest)
-        if channel is not None:
-            alsa.snd_seq_remove_events_set_channel(a_cond, channel)
-        if event_type is not None:
-            alsa.snd_seq_remove_events_set_event_type(a_cond, event_type)
-        if tag is not None:
-            alsa.snd_seq_remove_events_set_tag(a_cond, tag)
+                queue_id = 0
+            condition = RemoveEvents(condition=cond_bits,
+                                     queue_id=queue_id,
+                                     time=time if time is not None else RealTime(),
+                                     dest=dest if dest is not None else Address(0, 0),
+                                     channel=channel if channel is not None else 0,
+                                     event_type=(event_type if event_type is not None
+                                                 else EventType.NONE),
+                                     tag=tag if tag is not None else 0)
+        a_cond = condition._to_alsa()
         result = alsa.snd_seq_remove_events(self.handle, a_cond)
         _check_alsa_error(result)
         return result
 
+    def remove_events_tags(self, tags: Iterable[int], condition: Optional[RemoveEvents] = None):
+        """Remove events with any of the tags given.
+
+        ALSA matches a single tag per :alsa:`snd_seq_remove_events` call, so
+        one call is made per tag, but the condition structure is built only
+        once.
+
+        :param tags: event tags to match
+        :param condition: the other removal conditions. Should include
+                          :attr:`RemoveCondition.TAG_MATCH`, it is added (to
+                          a copy) otherwise; its `tag` is ignored.
+                          Default: remove from the output.
+        """
+        self._check_handle()
+        if condition is None:
+            condition = RemoveEvents(RemoveCondition.OUTPUT | RemoveCondition.TAG_MATCH)
+        elif not condition.condition & RemoveCondition.TAG_MATCH:
+            condition = replace(condition,
+                                condition=condition.condition | RemoveCondition.TAG_MATCH)
+        a_cond = condition._to_alsa()
+        for tag in tags:
+            alsa.snd_seq_remove_events_set_tag(a_cond, tag)
+            result = alsa.snd_seq_remove_events(self.handle, a_cond)
+            _check_alsa_error(result)
+
 
 class SequencerClient(SequencerClientBase):
     """ALSA sequencer client connection.
@@ -1949,7 +2161,93 @@ class AsyncSequencerClient(SequencerClientBase):
         func = partial(self._event_output_direct, event, queue, port, dest)
         return await self._event_output_wait(func)
 
+    async def list_connections(self, *, include_system: bool = False) -> list[Connection]:
+        """List all port connections in the system.
+
+        Same as :meth:`SequencerClient.list_connections`, but yields control
+        to the event loop after each client processed, so the loop is not
+        blocked for long on systems with many ports.
+
+        Wraps :alsa:`snd_seq_query_next_client`, :alsa:`snd_seq_query_next_port`
+        and :alsa:`snd_seq_query_port_subscribers`.
+
+        :param include_system: include connections from the system ports (e.g.
+                               announcement subscriptions)
+
+        :return: list of sender→destination connections
+        """
+        result = []
+        for connections in self._iter_connections(include_system=include_system):
+            result += connections
+            await asyncio.sleep(0)
+        return result
+
+    async def topology_changes(self,
+                               window: float = 0.1,
+                               *,
+                               port: Optional[Port] = None,
+                               ) -> AsyncIterator[TopologyDelta]:
+        """Iterate over sequencer topology changes.
+
+        Subscribes to the :data:`~alsa_midi.SYSTEM_ANNOUNCE` port and yields
+        :class:`~alsa_midi.TopologyDelta` objects describing ports
+        and connections added, removed or changed. Announcements arriving
+        within `window` seconds from each other are collapsed into a single
+        delta, so e.g. plugging in a USB hub results in one update instead of
+        dozens.
+
+        All events received by the client are consumed by the iterator, so it
+        should be used on a client dedicated to topology monitoring.
+
+        :param window: quiet period (in seconds) that ends a burst of
+                       announcements
+        :param port: port to receive the announcements on. Default: a
+                     temporary port is created for the iteration. The port
+                     is subscribed to :data:`~alsa_midi.SYSTEM_ANNOUNCE` for
+                     the iteration only, unless it already was.
+        """
+        self._check_handle()
+        if port is None:
+            own_port = self.create_port("topology",
+                                        caps=PortCaps.WRITE | PortCaps.NO_EXPORT,
+                                        type=PortType.APPLICATION)
+            port = own_port
+        else:
+            own_port = None
+        try:
+            port.connect_from(SYSTEM_ANNOUNCE)
+            subscribed = True
+        except ALSAError as err:
+            # already subscribed by the caller – leave it that way
+            if err.errnum != -errno.EBUSY:
+                raise
+            subscribed = False
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                delta = TopologyDelta()
+                event = await self.event_input()
+                if event is None or not delta.add_event(event):
+                    continue
+                deadline = loop.time() + window
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    event = await self.event_input(timeout=remaining)
+                    if event is None:
+                        break
+                    if delta.add_event(event):
+                        deadline = loop.time() + window
+                if delta:
+                    yield delta
+        finally:
+            if own_port is not None:
+                own_port.close()
+            elif subscribed and self.handle is not None and port.client is not None:
+                port.disconnect_from(SYSTEM_ANNOUNCE)
+
 
 __all__ = ["SequencerClientBase", "SequencerClient", "ClientInfo", "ClientType", "SequencerType",
-           "SystemInfo", "SubscriptionQueryType", "SubscriptionQuery", "ClientPool",
+           "SystemInfo", "SubscriptionQueryType", "SubscriptionQuery", "Connection", "ClientPool",
            "RemoveEvents", "RemoveCondition"]
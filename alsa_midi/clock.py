@@ -0,0 +1,289 @@
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from .event import (ContinueEvent, Event, QueueControlEventBase, QueueSkewEvent, RealTime,
+                    SetQueuePositionTickEvent, SetQueuePositionTimeEvent, SetQueueTempoEvent,
+                    StartEvent, StopEvent)
+
+if TYPE_CHECKING:
+    from .queue import Queue, QueueStatus, QueueTempo
+
+
+_RESYNC_EVENTS = (StartEvent, StopEvent, ContinueEvent,
+                  SetQueuePositionTickEvent, SetQueuePositionTimeEvent)
+_TEMPO_EVENTS = (SetQueueTempoEvent, QueueSkewEvent)
+
+
+class QueueClock:
+    """Local estimation of a queue position.
+
+    The queue status is read only occasionally (every `resync_interval`
+    seconds) and the current position is extrapolated from the monotonic
+    clock and the queue tempo and skew in between, so the position may be read
+    often (e.g. for every frame of a user interface) at little cost.
+
+    The queue tempo and position changes are not seen by the model, unless
+    the related events (scheduled or received by the application) are passed
+    to :meth:`handle_event`, or :meth:`invalidate` is called.
+
+    :param queue: the queue to follow
+    :param resync_interval: maximum time (in seconds) between status reads
+    :param max_error: when the position extrapolated differs by more than
+                      this many seconds from the one read, the resync interval
+                      is shortened until the estimation is correct again
+    :param clock: monotonic clock function returning seconds
+
+    :ivar queue: the queue followed
+    :ivar resync_interval: maximum time (in seconds) between status reads
+    :ivar max_error: error (in seconds) that shortens the resync interval
+    :ivar last_error: difference (in seconds) between the extrapolated and
+                      actual queue real time found on the last resync
+    """
+
+    queue: 'Queue'
+    resync_interval: float
+    max_error: float
+    last_error: float
+
+    def __init__(self,
+                 queue: 'Queue',
+                 *,
+                 resync_interval: float = 1.0,
+                 max_error: float = 0.002,
+                 clock: Callable[[], float] = time.monotonic):
+        if resync_interval <= 0:
+            raise ValueError("resync_interval must be positive")
+        self.queue = queue
+        self.resync_interval = resync_interval
+        self.max_error = max_error
+        self.last_error = 0.0
+        self._clock = clock
+        self._interval = resync_interval
+        self._tempo: Optional['QueueTempo'] = None
+        self._ticks_per_second = 0.0
+        # queue seconds per clock second (skew / skew base)
+        self._rate = 1.0
+        self._sample_clock: Optional[float] = None
+        self._sample_real = 0.0
+        self._sample_tick = 0
+        self._running = False
+
+    def invalidate(self, tempo: bool = False):
+        """Force queue status read on the next position query.
+
+        :param tempo: re-read the queue tempo too
+        """
+        self._sample_clock = None
+        if tempo:
+            self._tempo = None
+
+    def handle_event(self, event: Event) -> bool:
+        """Update the model for a queue control event.
+
+        :param event: event scheduled or received by the application
+
+        :return: `True` if the event affects the followed queue
+        """
+        if not isinstance(event, QueueControlEventBase):
+            return False
+        if event.control_queue != self.queue.queue_id:
+            return False
+        if isinstance(event, _TEMPO_EVENTS):
+            self.invalidate(tempo=True)
+        elif isinstance(event, _RESYNC_EVENTS):
+            self.invalidate()
+        else:
+            return False
+        return True
+
+    def sync(self):
+        """Read the queue status and tempo now."""
+        if self._tempo is None:
+            tempo = self.queue.get_tempo()
+            if tempo.skew and tempo.skew_base:
+                rate = tempo.skew / tempo.skew_base
+            else:
+                rate = 1.0
+            self._tempo = tempo
+            self._rate = rate
+            self._ticks_per_second = tempo.ppq * 1000000.0 / tempo.tempo * rate
+        before = self._clock()
+        status = self.queue.get_status()
+        after = self._clock()
+        now = (before + after) / 2
+        real = float(status.real_time)
+        if self._sample_clock is not None and self._running and status.running:
+            expected = self._sample_real + (now - self._sample_clock) * self._rate
+            self.last_error = expected - real
+            if abs(self.last_error) > self.max_error:
+                self._interval = max(self._interval / 2, self.resync_interval / 16)
+            else:
+                self._interval = self.resync_interval
+        self._sample_clock = now
+        self._sample_real = real
+        self._sample_tick = status.tick_time
+        self._running = status.running
+
+    def _elapsed(self) -> float:
+        now = self._clock()
+        if self._sample_clock is None or now - self._sample_clock > self._interval:
+            self.sync()
+            assert self._sample_clock is not None
+        if not self._running:
+            return 0.0
+        return max(now - self._sample_clock, 0.0)
+
+    @property
+    def running(self) -> bool:
+        """Whether the queue is running (as of the last status read)."""
+        if self._sample_clock is None:
+            self.sync()
+        return self._running
+
+    def real_time(self) -> RealTime:
+        """Get the current queue real time (estimated)."""
+        elapsed = self._elapsed()
+        return RealTime(self._sample_real + elapsed * self._rate)
+
+    def tick(self) -> int:
+        """Get the current queue position in MIDI ticks (estimated)."""
+        elapsed = self._elapsed()
+        return self._sample_tick + int(elapsed * self._ticks_per_second)
+
+
+class QueueTimeMapping:
+    """Mapping between queue real time and :func:`time.monotonic_ns`.
+
+    Estimates the offset and the drift between the two clocks from a few
+    samples of the queue status, so timestamps of the events received can be
+    correlated with other clocks without reading the queue status for every
+    event. The conversions are simple linear functions.
+
+    The mapping is refreshed with :meth:`update` (which reads the queue
+    status) or :meth:`add_sample` (for a status read anyway). It is valid only
+    for a running queue, so :meth:`reset` should be called when the queue is
+    stopped or repositioned (:meth:`handle_event` does that for queue control
+    events).
+
+    :param queue: the queue
+    :param window: number of samples used for the drift estimation
+    :param clock: monotonic clock function returning nanoseconds
+
+    :ivar queue: the queue
+    :ivar rate: queue seconds per monotonic clock second (drift is `rate - 1`)
+    """
+
+    queue: 'Queue'
+    rate: float
+
+    def __init__(self,
+                 queue: 'Queue',
+                 *,
+                 window: int = 16,
+                 clock: Callable[[], int] = time.monotonic_ns):
+        if window < 1:
+            raise ValueError("window must be positive")
+        self.queue = queue
+        self.rate = 1.0
+        self._clock = clock
+        self._samples: deque[tuple[int, int]] = deque(maxlen=window)
+        self._ref_monotonic = 0
+        self._ref_queue = 0
+
+    def __len__(self):
+        return len(self._samples)
+
+    def reset(self):
+        """Drop all the samples collected."""
+        self._samples.clear()
+        self.rate = 1.0
+
+    def handle_event(self, event: Event) -> bool:
+        """Reset the mapping on a queue control event.
+
+        :param event: event scheduled or received by the application
+
+        :return: `True` if the event affects the queue
+        """
+        if not isinstance(event, _RESYNC_EVENTS):
+            return False
+        if event.control_queue != self.queue.queue_id:
+            return False
+        self.reset()
+        return True
+
+    def add_sample(self, status: 'QueueStatus', monotonic_ns: int) -> bool:
+        """Refresh the mapping with a queue status.
+
+        :param status: queue status
+        :param monotonic_ns: monotonic clock value at the time the status was read
+
+        :return: `False` if the sample was not used, because the queue is not running
+        """
+        if not status.running:
+            return False
+        real_time = status.real_time
+        queue_ns = real_time.seconds * 1000000000 + real_time.nanoseconds
+        samples = self._samples
+        samples.append((monotonic_ns, queue_ns))
+
+        count = len(samples)
+        base_mono, base_queue = samples[0]
+        mean_x = sum(x - base_mono for x, _ in samples) / count
+        mean_y = sum(y - base_queue for _, y in samples) / count
+        if count > 1:
+            sxx = sxy = 0.0
+            for x, y in samples:
+                dx = x - base_mono - mean_x
+                sxx += dx * dx
+                sxy += dx * (y - base_queue - mean_y)
+            if sxx > 0:
+                self.rate = sxy / sxx
+        self._ref_monotonic = base_mono + round(mean_x)
+        self._ref_queue = base_queue + round(mean_y)
+        return True
+
+    def update(self) -> bool:
+        """Read the queue status and refresh the mapping.
+
+        :return: `False` if the sample was not used, because the queue is not running
+        """
+        before = self._clock()
+        status = self.queue.get_status()
+        after = self._clock()
+        return self.add_sample(status, (before + after) // 2)
+
+    def _check(self):
+        if not self._samples:
+            raise ValueError("No samples collected yet")
+
+    def to_monotonic_ns(self, real_time: Union[RealTime, float, int]) -> int:
+        """Convert queue real time to monotonic clock value.
+
+        :param real_time: queue real time (:class:`RealTime` or seconds)
+
+        :return: :func:`time.monotonic_ns` value
+        """
+        self._check()
+        real_time = RealTime(real_time)
+        queue_ns = real_time.seconds * 1000000000 + real_time.nanoseconds
+        return self._ref_monotonic + round((queue_ns - self._ref_queue) / self.rate)
+
+    def to_real_time(self, monotonic_ns: Optional[int] = None) -> RealTime:
+        """Convert monotonic clock value to queue real time.
+
+        :param monotonic_ns: :func:`time.monotonic_ns` value. Default: now.
+
+        :return: queue real time (not earlier than the queue start)
+        """
+        self._check()
+        if monotonic_ns is None:
+            monotonic_ns = self._clock()
+        queue_ns = self._ref_queue + round((monotonic_ns - self._ref_monotonic) * self.rate)
+        if queue_ns < 0:
+            return RealTime(0)
+        return RealTime(queue_ns // 1000000000, queue_ns % 1000000000)
+
+
+__all__ = ["QueueClock", "QueueTimeMapping"]
@@ -0,0 +1,514 @@
+import mmap
+import os
+import struct
+import time
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterator, NamedTuple, Optional, Union
+
+from ._ffi import ffi
+from .address import AddressType
+from .event import (Event, EventFlags, MidiBytesEvent, RealTime, SetQueueTempoEvent,
+                    _snd_seq_event_t)
+from .player import QueuePlayer
+from .scheduler import EchoScheduler
+from .smf import MidiFileWriter
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+    from .port import Port
+    from .queue import Queue
+
+
+_MAGIC = b"ALSAEVLG"
+_VERSION = 1
+_HEADER = struct.Struct("<8sHH4x")
+# monotonic timestamp (ns), ext data offset, ext data length
+_RECORD_TAIL = struct.Struct("<QQI")
+_EVENT_SIZE = ffi.sizeof("snd_seq_event_t")
+
+_EXT_SUFFIX = ".ext"
+
+
+class EventLogRecord(NamedTuple):
+    """Event log entry (named tuple).
+
+    :ivar timestamp: :func:`time.monotonic_ns` value of the entry
+    :ivar event: the event logged
+    """
+    timestamp: int
+    event: Event
+
+
+class EventLogWriter:
+    """Binary event log writer.
+
+    Events are stored as fixed-size records: the raw :alsa:`snd_seq_event_t`
+    image followed by a monotonic clock timestamp and the location of the
+    event's external data (e.g. SysEx), which is appended to a separate file
+    (the log file name with `.ext` suffix). Nothing is formatted, so logging
+    costs little more than the event conversion and a buffered write.
+
+    :param path: log file name
+    :param clock: monotonic clock function returning nanoseconds
+    :param buffer_size: size of the file buffers
+
+    :ivar path: log file name
+    """
+
+    path: str
+
+    def __init__(self,
+                 path: Union[str, os.PathLike],
+                 *,
+                 clock: Callable[[], int] = time.monotonic_ns,
+                 buffer_size: int = 65536):
+        self.path = os.fspath(path)
+        self._clock = clock
+        self._file = open(self.path, "wb", buffering=buffer_size)
+        self._ext_file = open(self.path + _EXT_SUFFIX, "wb", buffering=buffer_size)
+        self._ext_offset = 0
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, _EVENT_SIZE))
+        self._alsa_event: _snd_seq_event_t = ffi.new("snd_seq_event_t *")
+        self._event_buf = ffi.buffer(self._alsa_event)
+        self._zero = bytes(_EVENT_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append_alsa(self, alsa_event: _snd_seq_event_t, timestamp: Optional[int] = None):
+        """Append a raw ALSA event to the log.
+
+        :param alsa_event: the event
+        :param timestamp: :func:`time.monotonic_ns` value. Default: now.
+        """
+        if self._file is None:
+            raise ValueError("Event log closed")
+        if timestamp is None:
+            timestamp = self._clock()
+        image = bytes(ffi.buffer(alsa_event))
+        if alsa_event.flags & EventFlags.EVENT_LENGTH_VARIABLE:
+            ext_len = alsa_event.data.ext.len
+            ext_offset = self._ext_offset
+            self._ext_file.write(ffi.buffer(alsa_event.data.ext.ptr, ext_len))
+            self._ext_offset += ext_len
+        else:
+            ext_len = ext_offset = 0
+        self._file.write(image)
+        self._file.write(_RECORD_TAIL.pack(timestamp, ext_offset, ext_len))
+
+    def append(self, event: Event, timestamp: Optional[int] = None):
+        """Append an event to the log.
+
+        :param event: the event (e.g. as received). :class:`MidiBytesEvent`
+                      is not supported.
+        :param timestamp: :func:`time.monotonic_ns` value. Default: now.
+        """
+        if isinstance(event, MidiBytesEvent):
+            raise TypeError("MidiBytesEvent cannot be logged")
+        self._event_buf[:] = self._zero
+        self.append_alsa(event._to_alsa(self._alsa_event), timestamp)
+
+    def flush(self):
+        """Write the buffered data to the files."""
+        if self._file is not None:
+            self._ext_file.flush()
+            self._file.flush()
+
+    def close(self):
+        """Close the log files."""
+        if self._file is not None:
+            self._ext_file.close()
+            self._file.close()
+            self._file = None
+
+
+def _decode_record(data: Union[bytes, bytearray, mmap.mmap], offset: int,
+                   ext: bytes) -> EventLogRecord:
+    alsa_event = ffi.new("snd_seq_event_t *")
+    ffi.memmove(alsa_event, data[offset:offset + _EVENT_SIZE], _EVENT_SIZE)
+    timestamp = _RECORD_TAIL.unpack_from(data, offset + _EVENT_SIZE)[0]
+    if alsa_event.flags & EventFlags.EVENT_LENGTH_VARIABLE:
+        ext_buf = ffi.from_buffer(ext)
+        alsa_event.data.ext.ptr = ext_buf
+        alsa_event.data.ext.len = len(ext)
+    cls = Event._specialized.get(alsa_event.type, Event)
+    return EventLogRecord(timestamp, cls._from_alsa(alsa_event))
+
+
+def _bisect(timestamp_at: Callable[[int], int], low: int, high: int, timestamp: int) -> int:
+    while low < high:
+        middle = (low + high) // 2
+        if timestamp_at(middle) < timestamp:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class EventLog:
+    """Binary event log reader.
+
+    The log files (written by :class:`EventLogWriter`) are memory-mapped, so
+    records can be accessed randomly and only the ones accessed are read from
+    the disk. Records are in the order of logging, which, as the timestamps
+    come from a monotonic clock, is also the time order – time ranges are
+    found with a binary search.
+
+    :param path: log file name
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        path = os.fspath(path)
+        self._data = _map(path)
+        if self._data is None or len(self._data) < _HEADER.size:
+            raise ValueError("Not an event log")
+        magic, version, event_size = _HEADER.unpack_from(self._data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not an event log or unsupported version")
+        if event_size != _EVENT_SIZE:
+            raise ValueError("Event log written on an incompatible platform")
+        self._record_size = event_size + _RECORD_TAIL.size
+        self._count = (len(self._data) - _HEADER.size) // self._record_size
+        ext_path = path + _EXT_SUFFIX
+        self._ext = _map(ext_path) if os.path.exists(ext_path) else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unmap the log files."""
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._ext is not None:
+            self._ext.close()
+            self._ext = None
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("event log index out of range")
+        return _HEADER.size + index * self._record_size
+
+    def timestamp(self, index: int) -> int:
+        """Get timestamp of a record.
+
+        :param index: record number
+
+        :return: :func:`time.monotonic_ns` value
+        """
+        assert self._data is not None
+        return _RECORD_TAIL.unpack_from(self._data, self._offset(index) + _EVENT_SIZE)[0]
+
+    def __getitem__(self, index: int) -> EventLogRecord:
+        data = self._data
+        assert data is not None
+        offset = self._offset(index)
+        _, ext_offset, ext_len = _RECORD_TAIL.unpack_from(data, offset + _EVENT_SIZE)
+        if ext_len:
+            if self._ext is None or ext_offset + ext_len > len(self._ext):
+                raise ValueError("Event log external data missing")
+            ext = self._ext[ext_offset:ext_offset + ext_len]
+        else:
+            ext = b""
+        return _decode_record(data, offset, ext)
+
+    def __iter__(self) -> Iterator[EventLogRecord]:
+        return self.records()
+
+    def index(self, timestamp: int) -> int:
+        """Find the first record not earlier than given time.
+
+        :param timestamp: :func:`time.monotonic_ns` value
+
+        :return: record number (:func:`len` of the log when no record found)
+        """
+        return _bisect(self.timestamp, 0, self._count, timestamp)
+
+    def records(self,
+                start: Optional[int] = None,
+                end: Optional[int] = None) -> Iterator[EventLogRecord]:
+        """Iterate over the records of a time range.
+
+        :param start: :func:`time.monotonic_ns` value of the range start
+        :param end: :func:`time.monotonic_ns` value of the range end (exclusive)
+
+        :return: iterator over the records
+        """
+        first = self.index(start) if start is not None else 0
+        last = self.index(end) if end is not None else self._count
+        for i in range(first, last):
+            yield self[i]
+
+    def _replay_events(self, start: Optional[int], end: Optional[int]) -> Iterator[Event]:
+        base = None
+        for timestamp, event in self.records(start, end):
+            if base is None:
+                base = timestamp
+            ns = timestamp - base
+            event.time = RealTime(ns // 1000000000, ns % 1000000000)
+            event.tick = None
+            event.relative = None
+            event.queue_id = None
+            event.source = None
+            event.dest = None
+            yield event
+
+    def replay(self,
+               client: 'SequencerClient',
+               queue: 'Queue',
+               port: 'Port',
+               *,
+               start: Optional[int] = None,
+               end: Optional[int] = None,
+               dest: Optional[AddressType] = None,
+               lookahead: float = 0.5,
+               tag: int = 0,
+               scheduler: Optional[EchoScheduler] = None) -> QueuePlayer:
+        """Create a player for replaying the logged events on a queue.
+
+        The events are scheduled in queue real time, with the original
+        intervals, the first event replayed at the queue start. All the
+        events of the range are replayed, including e.g. system announcements,
+        if they were logged.
+
+        :param client: client to use
+        :param queue: queue to play the events on
+        :param port: port to send the events from (see :class:`QueuePlayer`)
+        :param start: :func:`time.monotonic_ns` value of the range start
+        :param end: :func:`time.monotonic_ns` value of the range end (exclusive)
+        :param dest: destination for the events. Default: all subscribers of `port`.
+        :param lookahead: length of the window scheduled (in seconds)
+        :param tag: tag for the events scheduled
+        :param scheduler: scheduler to use for the refills
+
+        :return: the player, not started yet
+        """
+        return QueuePlayer(client, queue, port, self._replay_events(start, end),
+                           lookahead=lookahead, dest=dest, tag=tag, scheduler=scheduler)
+
+
+class RingRecorder:
+    """Rolling in-memory capture of the most recent events.
+
+    Events are stored as raw records (the same as in :class:`EventLogWriter`
+    files) in a preallocated ring buffer, so no Python objects are kept per
+    event and the memory use is constant. Only the events of the last
+    `duration` seconds are available. When more than `capacity` events are
+    received in that time, the oldest ones are overwritten earlier.
+
+    External data (e.g. SysEx) is kept in a separate ring of `ext_capacity`
+    bytes. Events whose external data has been overwritten are skipped.
+
+    A time range of the capture can be saved to an event log
+    (:meth:`dump_log`) or a Standard MIDI File (:meth:`dump_smf`) at any
+    time – for a 'retroactive record' function.
+
+    :param duration: how long (in seconds) the events are kept
+    :param capacity: maximum number of events kept
+    :param ext_capacity: size (in bytes) of the external data ring
+    :param clock: monotonic clock function returning nanoseconds
+
+    :ivar duration: how long (in seconds) the events are kept
+    :ivar capacity: maximum number of events kept
+    """
+
+    duration: float
+    capacity: int
+
+    def __init__(self,
+                 duration: float = 600.0,
+                 *,
+                 capacity: int = 262144,
+                 ext_capacity: int = 1048576,
+                 clock: Callable[[], int] = time.monotonic_ns):
+        if duration <= 0:
+            raise ValueError("duration must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.duration = duration
+        self.capacity = capacity
+        self._clock = clock
+        self._record_size = _EVENT_SIZE + _RECORD_TAIL.size
+        self._data = bytearray(capacity * self._record_size)
+        self._ext = bytearray(ext_capacity)
+        # total number of events and external data bytes written
+        self._count = 0
+        self._ext_total = 0
+        self._alsa_event: _snd_seq_event_t = ffi.new("snd_seq_event_t *")
+        self._event_buf = ffi.buffer(self._alsa_event)
+        self._zero = bytes(_EVENT_SIZE)
+
+    def __len__(self):
+        """Number of events stored (including ones older than `duration`)."""
+        return min(self._count, self.capacity)
+
+    def clear(self):
+        """Drop all the events stored."""
+        self._count = 0
+        self._ext_total = 0
+
+    def _store_ext(self, data) -> int:
+        ext = self._ext
+        size = len(ext)
+        length = len(data)
+        offset = self._ext_total
+        if length <= size:
+            start = offset % size
+            first = min(length, size - start)
+            ext[start:start + first] = data[:first]
+            ext[:length - first] = data[first:]
+            self._ext_total += length
+        return offset
+
+    def _load_ext(self, offset: int, length: int) -> Optional[bytes]:
+        ext = self._ext
+        size = len(ext)
+        if length > size or offset < self._ext_total - size:
+            return None
+        start = offset % size
+        first = min(length, size - start)
+        return bytes(ext[start:start + first] + ext[:length - first])
+
+    def append_alsa(self, alsa_event: _snd_seq_event_t, timestamp: Optional[int] = None):
+        """Store a raw ALSA event.
+
+        :param alsa_event: the event
+        :param timestamp: :func:`time.monotonic_ns` value. Default: now.
+        """
+        if timestamp is None:
+            timestamp = self._clock()
+        offset = (self._count % self.capacity) * self._record_size
+        self._data[offset:offset + _EVENT_SIZE] = ffi.buffer(alsa_event)
+        if alsa_event.flags & EventFlags.EVENT_LENGTH_VARIABLE:
+            ext_len = alsa_event.data.ext.len
+            ext_offset = self._store_ext(ffi.buffer(alsa_event.data.ext.ptr, ext_len))
+        else:
+            ext_len = ext_offset = 0
+        _RECORD_TAIL.pack_into(self._data, offset + _EVENT_SIZE, timestamp, ext_offset, ext_len)
+        self._count += 1
+
+    def append(self, event: Event, timestamp: Optional[int] = None):
+        """Store an event.
+
+        :param event: the event (e.g. as received). :class:`MidiBytesEvent`
+                      is not supported.
+        :param timestamp: :func:`time.monotonic_ns` value. Default: now.
+        """
+        if isinstance(event, MidiBytesEvent):
+            raise TypeError("MidiBytesEvent cannot be recorded")
+        self._event_buf[:] = self._zero
+        self.append_alsa(event._to_alsa(self._alsa_event), timestamp)
+
+    def _offset(self, number: int) -> int:
+        return (number % self.capacity) * self._record_size
+
+    def _timestamp(self, number: int) -> int:
+        return _RECORD_TAIL.unpack_from(self._data, self._offset(number) + _EVENT_SIZE)[0]
+
+    def records(self,
+                start: Optional[int] = None,
+                end: Optional[int] = None) -> Iterator[EventLogRecord]:
+        """Iterate over the events of a time range.
+
+        The events are decoded while iterating, so the iteration should not be
+        interleaved with :meth:`append` calls from another thread.
+
+        :param start: :func:`time.monotonic_ns` value of the range start.
+                      Default: `duration` seconds ago.
+        :param end: :func:`time.monotonic_ns` value of the range end (exclusive).
+                    Default: now.
+
+        :return: iterator over the records
+        """
+        oldest = self._count - len(self)
+        cutoff = self._clock() - int(self.duration * 1000000000)
+        if start is None or start < cutoff:
+            start = cutoff
+        first = _bisect(self._timestamp, oldest, self._count, start)
+        if end is not None:
+            last = _bisect(self._timestamp, first, self._count, end)
+        else:
+            last = self._count
+        for number in range(first, last):
+            offset = self._offset(number)
+            _, ext_offset, ext_len = _RECORD_TAIL.unpack_from(self._data,
+                                                              offset + _EVENT_SIZE)
+            if ext_len:
+                ext = self._load_ext(ext_offset, ext_len)
+                if ext is None:
+                    continue
+            else:
+                ext = b""
+            yield _decode_record(self._data, offset, ext)
+
+    def dump_log(self,
+                 path: Union[str, os.PathLike],
+                 start: Optional[int] = None,
+                 end: Optional[int] = None) -> int:
+        """Save events of a time range to an event log.
+
+        :param path: log file name
+        :param start: :func:`time.monotonic_ns` value of the range start
+        :param end: :func:`time.monotonic_ns` value of the range end (exclusive)
+
+        :return: number of events saved
+        """
+        count = 0
+        with EventLogWriter(path) as writer:
+            for timestamp, event in self.records(start, end):
+                writer.append(event, timestamp)
+                count += 1
+        return count
+
+    def dump_smf(self,
+                 file: Union[str, os.PathLike, BinaryIO],
+                 start: Optional[int] = None,
+                 end: Optional[int] = None,
+                 *,
+                 tempo: int = 500000,
+                 ppq: int = 96) -> int:
+        """Save events of a time range to a Standard MIDI File.
+
+        Event times are converted to MIDI ticks, relative to the first event,
+        with the tempo given (which is also written to the file). Events which
+        cannot be stored in a MIDI file are skipped.
+
+        :param file: file name or binary file object
+        :param start: :func:`time.monotonic_ns` value of the range start
+        :param end: :func:`time.monotonic_ns` value of the range end (exclusive)
+        :param tempo: MIDI tempo (microseconds per quarter note)
+        :param ppq: MIDI pulses (ticks) per quarter note
+
+        :return: number of events saved
+        """
+        count = 0
+        base = None
+        with MidiFileWriter(file, ppq) as writer:
+            writer.write_event(SetQueueTempoEvent(tempo), tick=0)
+            for timestamp, event in self.records(start, end):
+                if base is None:
+                    base = timestamp
+                tick = (timestamp - base) * ppq // (tempo * 1000)
+                if writer.write_event(event, tick):
+                    count += 1
+        return count
+
+
+__all__ = ["EventLogWriter", "EventLog", "EventLogRecord", "RingRecorder"]
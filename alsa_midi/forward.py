@@ -0,0 +1,210 @@
+import errno
+import select
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from ._ffi import alsa, ffi
+from .address import Address, AddressType
+from .event import EventType, _snd_seq_event_t
+from .util import _check_alsa_error
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+    from .port import Port
+
+
+# events using the snd_seq_ev_note_t data
+_NOTE_EVENTS = frozenset({EventType.NOTE, EventType.NOTEON, EventType.NOTEOFF,
+                          EventType.KEYPRESS})
+# events using the snd_seq_ev_ctrl_t data
+_CONTROL_EVENTS = frozenset({EventType.CONTROLLER, EventType.PGMCHANGE, EventType.CHANPRESS,
+                             EventType.PITCHBEND, EventType.CONTROL14, EventType.NONREGPARAM,
+                             EventType.REGPARAM})
+
+
+def _port_id(port: Union['Port', int]) -> int:
+    return port if isinstance(port, int) else port.port_id
+
+
+@dataclass
+class ForwardRule:
+    """Raw event forwarding rule.
+
+    All the criteria set must match for the rule to apply. The modifications
+    apply only to the forwarded copy of the event.
+
+    :ivar input_port: port the event was received on. `None` for any.
+    :ivar event_types: types of events forwarded. `None` for all.
+    :ivar port: port to send the event from
+    :ivar dest: new event destination. `None` for the subscribers of `port`.
+    :ivar channel: new MIDI channel for channel events, or a mapping of
+                   channel numbers (channels not in the mapping are not changed)
+    :ivar transpose: number of semitones to transpose note events by. Notes
+                     out of the MIDI range are dropped.
+    """
+    input_port: Optional[Union['Port', int]] = None
+    event_types: Optional[Iterable[EventType]] = None
+    port: Union['Port', int] = 0
+    dest: Optional[AddressType] = None
+    channel: Optional[Union[int, Mapping[int, int]]] = None
+    transpose: int = 0
+
+
+class _CompiledRule:
+    """:class:`ForwardRule` converted to plain values."""
+
+    __slots__ = ("input_port", "event_types", "port", "dest_client", "dest_port",
+                 "channel_map", "transpose")
+
+    def __init__(self, rule: ForwardRule):
+        self.input_port = _port_id(rule.input_port) if rule.input_port is not None else None
+        if rule.event_types is not None:
+            types = frozenset(int(t) for t in rule.event_types)
+            self.event_types: Optional[frozenset[int]] = types
+        else:
+            self.event_types = None
+        self.port = _port_id(rule.port)
+        if rule.dest is not None:
+            self.dest_client, self.dest_port = Address(rule.dest)
+        else:
+            self.dest_client = alsa.SND_SEQ_ADDRESS_SUBSCRIBERS
+            self.dest_port = alsa.SND_SEQ_ADDRESS_UNKNOWN
+        channel = rule.channel
+        if channel is None:
+            self.channel_map: Optional[list[int]] = None
+        elif isinstance(channel, int):
+            self.channel_map = [channel] * 16
+        else:
+            self.channel_map = [channel.get(i, i) for i in range(16)]
+        self.transpose = rule.transpose
+
+
+class Forwarder:
+    """Forwards input events of a client without converting them to
+    :class:`Event` objects.
+
+    The ALSA events received are matched against the rules and, for each
+    rule matching, a raw copy of the event is modified and sent directly (not
+    via a queue) with :alsa:`snd_seq_event_output`. Events not matching any
+    rule are dropped.
+
+    The forwarder reads the client input itself – it should not be used
+    together with :meth:`SequencerClient.event_input` on the same client.
+
+    :param client: the client to receive and send the events with
+    :param rules: the forwarding rules
+
+    :ivar client: client used
+    :ivar forwarded: number of events sent
+    :ivar dropped: number of events received and not forwarded
+    """
+
+    client: 'SequencerClient'
+    forwarded: int
+    dropped: int
+
+    def __init__(self, client: 'SequencerClient', rules: Iterable[ForwardRule]):
+        self.client = client
+        self.forwarded = 0
+        self.dropped = 0
+        self._rules = [_CompiledRule(rule) for rule in rules]
+        self._buf = ffi.new("snd_seq_event_t **", ffi.NULL)
+        self._out: _snd_seq_event_t = ffi.new("snd_seq_event_t *")
+        self._output = partial(self._output_alsa, self._out)
+        self._poll = select.poll()
+        self._poll.register(client._fd, select.POLLIN)
+
+    def _output_alsa(self, alsa_event: _snd_seq_event_t, remainder: Any = None):
+        _ = remainder
+        return alsa.snd_seq_event_output(self.client.handle, alsa_event), None
+
+    def _apply(self, rule: _CompiledRule, alsa_event: _snd_seq_event_t) -> bool:
+        out = self._out
+        ffi.memmove(out, alsa_event, ffi.sizeof("snd_seq_event_t"))
+        ev_type = out.type
+        if rule.channel_map is not None:
+            if ev_type in _NOTE_EVENTS:
+                out.data.note.channel = rule.channel_map[out.data.note.channel & 0x0f]
+            elif ev_type in _CONTROL_EVENTS:
+                out.data.control.channel = rule.channel_map[out.data.control.channel & 0x0f]
+        if rule.transpose and ev_type in _NOTE_EVENTS:
+            note = out.data.note.note + rule.transpose
+            if not 0 <= note < 128:
+                return False
+            out.data.note.note = note
+        out.source.port = rule.port
+        out.dest.client = rule.dest_client
+        out.dest.port = rule.dest_port
+        out.queue = alsa.SND_SEQ_QUEUE_DIRECT
+        self.client._event_output_wait(self._output)
+        return True
+
+    def forward_event(self, alsa_event: _snd_seq_event_t) -> int:
+        """Forward a single ALSA event, according to the rules.
+
+        The event is not changed. :meth:`SequencerClient.drain_output` needs
+        to be called for the events to be actually sent.
+
+        :param alsa_event: the event
+
+        :return: number of copies sent
+        """
+        count = 0
+        ev_type = alsa_event.type
+        in_port = alsa_event.dest.port
+        for rule in self._rules:
+            if rule.input_port is not None and rule.input_port != in_port:
+                continue
+            if rule.event_types is not None and ev_type not in rule.event_types:
+                continue
+            if self._apply(rule, alsa_event):
+                count += 1
+        if count:
+            self.forwarded += count
+        else:
+            self.dropped += 1
+        return count
+
+    def forward_pending(self) -> int:
+        """Forward all the events available, without waiting.
+
+        :return: number of events received
+        """
+        handle = self.client.handle
+        buf = self._buf
+        count = 0
+        while True:
+            result = alsa.snd_seq_event_input(handle, buf)
+            if result == -errno.EAGAIN:
+                break
+            if result == -errno.ENOSPC:
+                # input overrun – some events were lost, continue with the rest
+                continue
+            _check_alsa_error(result)
+            try:
+                self.forward_event(buf[0])
+            finally:
+                alsa.snd_seq_free_event(buf[0])
+            count += 1
+        if count:
+            self.client.drain_output()
+        return count
+
+    def run(self, timeout: Optional[float] = None) -> int:
+        """Forward events until nothing is received for `timeout` seconds.
+
+        :param timeout: maximum time to wait for an event. Default: forward forever.
+
+        :return: number of events received
+        """
+        total = 0
+        poll_timeout = timeout * 1000 if timeout is not None else None
+        while True:
+            total += self.forward_pending()
+            if not self._poll.poll(poll_timeout) and timeout is not None:
+                return total
+
+
+__all__ = ["ForwardRule", "Forwarder"]
@@ -0,0 +1,296 @@
+from collections.abc import Iterable, Iterator
+from functools import partial
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional, Union
+
+from ._ffi import alsa, ffi
+from .address import Address, AddressType
+from .client import RemoveCondition, RemoveEvents
+from .event import Event, EventFlags, EventType, _snd_seq_event_t
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+    from .port import Port
+    from .queue import Queue
+
+
+_NOTE_ON_EVENTS = frozenset({EventType.NOTEON, EventType.NOTE})
+
+# scheduled event record:
+# (queue id, tick timestamp?, timestamp, tag, counters key, counter index, note on?)
+_Scheduled = tuple[int, bool, int, int, tuple[int, int, int], int, bool]
+
+
+class SoundingNote(NamedTuple):
+    """Note tracked as sounding by :class:`NoteTracker`.
+
+    :ivar port: port the note was sent from
+    :ivar dest: destination of the note. Subscribers of `port` when
+                :attr:`~Address.client_id` is
+                :data:`~alsa_midi.alsa.SND_SEQ_ADDRESS_SUBSCRIBERS`.
+    :ivar channel: MIDI channel
+    :ivar note: note number
+    """
+    port: int
+    dest: Address
+    channel: int
+    note: int
+
+
+class NoteTracker:
+    """Tracks the notes sent by a client to each destination, so they can be
+    silenced.
+
+    For each sending port and destination a table of 16 × 128 counters
+    (channel × note) is kept. A Note On increases the counter, a Note Off (or
+    a Note On with velocity 0) decreases it. :class:`NoteEvent` is counted as
+    a Note On, as not all the receivers generate the Note Off for it.
+
+    Events scheduled on a queue are counted when sent, but also remembered
+    (with their timestamps) until the queue time passes them, so when they are
+    removed from the queue before being delivered, :meth:`discard_scheduled`
+    can revert their effect. Events with relative timestamps are counted as
+    delivered immediately.
+
+    :meth:`panic` uses that to silence everything the client played with
+    a minimal batch of Note Off events, instead of 'All Notes Off' sent to
+    every channel of every destination.
+
+    :param client: the client the events are sent with
+
+    :ivar client: the client the events are sent with
+    """
+
+    client: 'SequencerClient'
+
+    def __init__(self, client: 'SequencerClient'):
+        self.client = client
+        # counters per (source port, dest client, dest port)
+        self._notes: dict[tuple[int, int, int], bytearray] = {}
+        self._scheduled: list[_Scheduled] = []
+        self._prune_limit = 4096
+        self._out: _snd_seq_event_t = ffi.new("snd_seq_event_t *")
+        self._output = partial(self._output_alsa, self._out)
+
+    def __len__(self) -> int:
+        """Number of notes tracked as sounding."""
+        return sum(len(counts) - counts.count(0) for counts in self._notes.values())
+
+    def _count(self, key: tuple[int, int, int], index: int, on: bool):
+        counts = self._notes.get(key)
+        if counts is None:
+            if not on:
+                return
+            counts = self._notes[key] = bytearray(2048)
+        count = counts[index]
+        if on:
+            if count < 255:
+                counts[index] = count + 1
+        elif count:
+            counts[index] = count - 1
+
+    def track_alsa(self, alsa_event: _snd_seq_event_t):
+        """Track an ALSA event being sent.
+
+        :param alsa_event: the event, with the source port, destination,
+                           queue and timestamp set
+        """
+        ev_type = alsa_event.type
+        if ev_type in _NOTE_ON_EVENTS:
+            on = alsa_event.data.note.velocity > 0
+        elif ev_type == EventType.NOTEOFF:
+            on = False
+        else:
+            return
+        dest_client = alsa_event.dest.client
+        if dest_client == alsa.SND_SEQ_ADDRESS_SUBSCRIBERS:
+            # the port number is not used then, may be anything
+            key = (alsa_event.source.port, dest_client, alsa.SND_SEQ_ADDRESS_UNKNOWN)
+        else:
+            key = (alsa_event.source.port, dest_client, alsa_event.dest.port)
+        index = (alsa_event.data.note.channel & 0x0f) << 7 | (alsa_event.data.note.note & 0x7f)
+        self._count(key, index, on)
+        flags = alsa_event.flags
+        if (alsa_event.queue != alsa.SND_SEQ_QUEUE_DIRECT
+                and flags & EventFlags.TIME_MODE_MASK == EventFlags.TIME_MODE_ABS):
+            if flags & EventFlags.TIME_STAMP_MASK == EventFlags.TIME_STAMP_TICK:
+                tick, timestamp = True, alsa_event.time.tick
+            else:
+                tick = False
+                timestamp = (alsa_event.time.time.tv_sec * 1000000000
+                             + alsa_event.time.time.tv_nsec)
+            self._scheduled.append((alsa_event.queue, tick, timestamp, alsa_event.tag,
+                                    key, index, on))
+            if len(self._scheduled) > self._prune_limit:
+                self._prune()
+
+    def track(self,
+              event: Event,
+              queue: Union['Queue', int] = None,
+              port: Union['Port', int] = None,
+              dest: AddressType = None):
+        """Track an event being sent.
+
+        The arguments are interpreted as by :meth:`SequencerClient.event_output`.
+        :class:`MidiBytesEvent` events are not tracked.
+
+        :param event: the event
+        :param queue: the queue to force the event to. Default: send directly, unless
+                      :data:`event.queue` is set.
+        :param port: the port the event is sent from. Default: the one set in the `event`.
+        :param dest: the destination. Default: all subscribers, unless :data:`event.dest` says
+                     otherwise.
+        """
+        if event.type not in _NOTE_ON_EVENTS and event.type != EventType.NOTEOFF:
+            return
+        alsa_event: _snd_seq_event_t = ffi.new("snd_seq_event_t *")
+        event._to_alsa(alsa_event, queue=queue, port=port, dest=dest)
+        self.track_alsa(alsa_event)
+
+    def event_output(self,
+                     event: Event,
+                     queue: Union['Queue', int] = None,
+                     port: Union['Port', int] = None,
+                     dest: AddressType = None) -> int:
+        """Track and output an event.
+
+        Arguments as for :meth:`SequencerClient.event_output`.
+
+        :return: Number of bytes used in the output buffer.
+        """
+        self.track(event, queue=queue, port=port, dest=dest)
+        return self.client.event_output(event, queue=queue, port=port, dest=dest)
+
+    def sounding(self) -> Iterator[SoundingNote]:
+        """Iterate over the notes tracked as sounding."""
+        for (port, dest_client, dest_port), counts in self._notes.items():
+            dest = Address(dest_client, dest_port)
+            for index, count in enumerate(counts):
+                if count:
+                    yield SoundingNote(port, dest, index >> 7, index & 0x7f)
+
+    def clear(self):
+        """Forget all the notes tracked."""
+        self._notes.clear()
+        self._scheduled.clear()
+
+    def _queue_times(self, queue_ids: Iterable[int]) -> dict[int, tuple[int, int]]:
+        """Current (tick, nanoseconds) times of the queues."""
+        times = {}
+        for queue_id in queue_ids:
+            status = self.client.get_queue_status(queue_id)
+            real_time = status.real_time
+            times[queue_id] = (status.tick_time,
+                               real_time.seconds * 1000000000 + real_time.nanoseconds)
+        return times
+
+    def _prune(self):
+        """Forget the scheduled events the queues have already passed."""
+        scheduled = self._scheduled
+        times = self._queue_times({item[0] for item in scheduled})
+        self._scheduled = [item for item in scheduled
+                           if item[2] > times[item[0]][0 if item[1] else 1]]
+        self._prune_limit = max(4096, 2 * len(self._scheduled))
+
+    def _discard(self,
+                 queue_id: Optional[int],
+                 tags: Optional[Iterable[int]],
+                 before: Optional[dict[int, tuple[int, int]]] = None):
+        tag_set = set(tags) if tags is not None else None
+        selected = []
+        kept = []
+        for item in self._scheduled:
+            if ((queue_id is None or item[0] == queue_id)
+                    and (tag_set is None or item[3] in tag_set)):
+                selected.append(item)
+            else:
+                kept.append(item)
+        self._scheduled = kept
+        if not selected:
+            return
+        after = self._queue_times({item[0] for item in selected})
+        if before is None:
+            before = after
+        for item_queue, tick, timestamp, _, key, index, on in selected:
+            i = 0 if tick else 1
+            # when not sure, assume Note On delivered and Note Off not
+            if on:
+                if timestamp > after[item_queue][i]:
+                    self._count(key, index, False)
+            elif timestamp > before.get(item_queue, after[item_queue])[i]:
+                self._count(key, index, True)
+
+    def discard_scheduled(self,
+                          queue: Union['Queue', int, None] = None,
+                          tags: Optional[Iterable[int]] = None):
+        """Revert the tracking of scheduled events removed from a queue.
+
+        To be called after the events have been removed with
+        :meth:`SequencerClient.remove_events`. The tracked events with
+        timestamps later than the current queue time are considered removed.
+
+        :param queue: the queue the events were removed from. Default: all queues.
+        :param tags: tags of the events removed. Default: any tag.
+        """
+        if queue is None or isinstance(queue, int):
+            queue_id = queue
+        else:
+            queue_id = queue.queue_id
+        self._discard(queue_id, tags)
+
+    def _output_alsa(self, alsa_event: _snd_seq_event_t, remainder: Any = None):
+        _ = remainder
+        return alsa.snd_seq_event_output(self.client.handle, alsa_event), None
+
+    def all_notes_off(self) -> int:
+        """Send Note Off for each note tracked as sounding and forget them.
+
+        The events are sent directly (not via a queue), each from the port
+        the note was sent from, and the output is drained. Scheduled events
+        still remembered are forgotten too, so this should follow
+        :meth:`discard_scheduled` when events have been removed.
+
+        :return: number of Note Off events sent
+        """
+        out = self._out
+        ffi.memmove(out, bytes(ffi.sizeof("snd_seq_event_t")), ffi.sizeof("snd_seq_event_t"))
+        out.type = EventType.NOTEOFF
+        out.queue = alsa.SND_SEQ_QUEUE_DIRECT
+        output = self._output
+        client = self.client
+        sent = 0
+        for (port, dest_client, dest_port), counts in self._notes.items():
+            out.source.port = port
+            out.dest.client = dest_client
+            out.dest.port = dest_port
+            for index, count in enumerate(counts):
+                if not count:
+                    continue
+                out.data.note.channel = index >> 7
+                out.data.note.note = index & 0x7f
+                client._event_output_wait(output)
+                sent += 1
+        self.clear()
+        if sent:
+            client.drain_output()
+        return sent
+
+    def panic(self) -> int:
+        """Remove all the events not delivered yet and silence the notes tracked.
+
+        All the client output is removed (from the client buffer and from
+        the queues) with :meth:`SequencerClient.remove_events`, the tracking
+        is updated as by :meth:`discard_scheduled` and then
+        :meth:`all_notes_off` is called.
+
+        :return: number of Note Off events sent
+        """
+        # events still in the client buffer would be removed untracked
+        self.client.drain_output()
+        # queue times before the removal, as the queues may be running
+        before = self._queue_times({item[0] for item in self._scheduled})
+        self.client.remove_events(RemoveEvents(RemoveCondition.OUTPUT))
+        self._discard(None, None, before)
+        return self.all_notes_off()
+
+
+__all__ = ["NoteTracker", "SoundingNote"]
@@ -0,0 +1,608 @@
+from bisect import bisect_left
+from collections import deque
+from functools import partial
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Sequence, Union
+
+from ._ffi import alsa, ffi
+from .address import SYSTEM_TIMER, Address, AddressType
+from .client import RemoveCondition, RemoveEvents
+from .event import (ContinueEvent, Event, EventType, QueueSkewEvent, SetQueuePositionTickEvent,
+                    SetQueuePositionTimeEvent, SetQueueTempoEvent, StartEvent, StopEvent,
+                    _snd_seq_event_t)
+from .scheduler import EchoScheduler
+from .tempo import TempoMap
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+    from .notes import NoteTracker
+    from .port import Port
+    from .queue import Queue
+
+
+# events still played by a muted player, as they affect the queue
+_QUEUE_CONTROL_EVENTS = (SetQueueTempoEvent, QueueSkewEvent, SetQueuePositionTickEvent,
+                         SetQueuePositionTimeEvent, StartEvent, ContinueEvent, StopEvent)
+
+
+class QueuePlayer:
+    """Plays a stream of events on a queue, keeping only a bounded window of
+    them scheduled in the kernel.
+
+    Events are taken from the `events` iterable only as they are needed, so
+    the whole stream does not have to be kept in memory nor in the sequencer
+    output pool. When the queue reaches the middle of the scheduled window an
+    echo event, scheduled on the same queue with an :class:`EchoScheduler`,
+    is received by the player port and more events are scheduled.
+
+    The echo events have to be passed to :meth:`handle_event` (or the
+    :meth:`play` loop has to be used). When an existing `scheduler` is
+    provided, they may be passed to its
+    :meth:`~EchoScheduler.handle_event` instead.
+
+    Events must be provided in order and be timestamped with absolute queue
+    time: :attr:`Event.tick` when `lookahead_ticks` is used or
+    :attr:`Event.time` otherwise. When a `tempo_map` is provided, events with
+    :attr:`Event.tick` may be used with the `lookahead` in seconds too.
+
+    All the events are sent with the player `tag`, so the ones scheduled can
+    be dropped without affecting other events on the queue.
+
+    When `events` is a sequence (e.g. a list) and `lookahead_ticks` is used,
+    :meth:`seek` and :meth:`set_loop` are available too.
+
+    The player can be muted, which drops the events scheduled (by the tag)
+    and skips the events on following refills, and unmuted, which schedules
+    again only the events of the current window. Queue control events (tempo
+    changes, queue start, stop, position and skew changes) are not affected
+    by muting, so the queue timing and the `tempo_map` stay right.
+
+    :param client: client to use
+    :param queue: queue to play the events on
+    :param port: port to send the events from. Unless a `scheduler` is
+                 provided, the echo events are sent to this port too, so it
+                 has to be writable.
+    :param events: the events to play
+    :param lookahead: length of the window scheduled (in seconds)
+    :param lookahead_ticks: length of the window scheduled (in MIDI ticks),
+                            instead of `lookahead`
+    :param dest: destination for the events which have no
+                 :attr:`~Event.dest` set. Default: all subscribers of `port`.
+    :param tag: tag for the events (and echo events, when no `scheduler` is provided)
+    :param scheduler: scheduler to use for the refills. Must use the same
+                      client and queue. Default: a new one, for `port`.
+    :param tempo_map: tempo map of the queue. :class:`SetQueueTempoEvent`
+                      events are added to it when scheduled.
+    :param note_tracker: tracker (for the same client) the notes are
+                         registered with when scheduled. :meth:`stop` then
+                         sends Note Off for the notes left sounding.
+
+    :ivar client: client used
+    :ivar queue: queue used
+    :ivar port: port used
+    :ivar dest: destination of the events
+    :ivar tag: tag of the events sent
+    :ivar scheduler: scheduler used for the refills
+    :ivar tempo_map: tempo map tracking the tempo changes scheduled
+    :ivar note_tracker: tracker of the notes scheduled
+    :ivar done: `True` when all the events have been played
+    :ivar muted: `True` when the player is muted
+    """
+
+    client: 'SequencerClient'
+    queue: 'Queue'
+    port: 'Port'
+    dest: Optional[Address]
+    tag: int
+    scheduler: EchoScheduler
+    tempo_map: Optional[TempoMap]
+    note_tracker: Optional['NoteTracker']
+    done: bool
+    muted: bool
+
+    def __init__(self,
+                 client: 'SequencerClient',
+                 queue: 'Queue',
+                 port: 'Port',
+                 events: Iterable[Event],
+                 *,
+                 lookahead: float = 0.5,
+                 lookahead_ticks: Optional[int] = None,
+                 dest: Optional[AddressType] = None,
+                 tag: int = 0,
+                 scheduler: Optional[EchoScheduler] = None,
+                 tempo_map: Optional[TempoMap] = None,
+                 note_tracker: Optional['NoteTracker'] = None):
+        if lookahead_ticks is not None:
+            if lookahead_ticks < 1:
+                raise ValueError("lookahead_ticks must be positive")
+        elif lookahead <= 0:
+            raise ValueError("lookahead must be positive")
+        self.client = client
+        self.queue = queue
+        self.port = port
+        self.dest = Address(dest) if dest is not None else None
+        self.tag = tag
+        if scheduler is None:
+            scheduler = EchoScheduler(client, queue, port, tag=tag)
+        self.scheduler = scheduler
+        self.tempo_map = tempo_map
+        self.note_tracker = note_tracker
+        self.done = False
+        self.muted = False
+        self._lookahead = lookahead_ticks if lookahead_ticks is not None else lookahead
+        self._ticks = lookahead_ticks is not None
+        if isinstance(events, Sequence):
+            self._sequence: Optional[Sequence[Event]] = events
+            self._events: Optional[Iterator[Event]] = None
+        else:
+            self._sequence = None
+            self._events = iter(events)
+        self._index = 0
+        self._pending: Optional[Event] = None
+        self._exhausted = False
+        self._last_time: Union[int, float] = 0
+        self._refill_call: Optional[int] = None
+        self._remove_condition = RemoveEvents(RemoveCondition.OUTPUT | RemoveCondition.TAG_MATCH,
+                                              queue_id=queue.queue_id, tag=tag)
+        # (time, index, event, tick) of events in the current window, for unmute
+        self._window: deque[tuple[Union[int, float], int, Event, Optional[int]]] = deque()
+        # sequence mode only
+        self._event_ticks: Optional[list[int]] = None
+        self._loop: Optional[tuple[int, int]] = None
+        self._loop_index = 0
+        self._loop_cache: dict[int, tuple[Event, list[_snd_seq_event_t]]] = {}
+        # added to the event ticks, increased on each loop pass
+        self._offset = 0
+
+    def _event_time(self, event: Event) -> Union[int, float]:
+        if self._ticks:
+            if event.tick is None:
+                raise ValueError(f"{event!r} has no tick timestamp")
+            return event.tick
+        if event.time is not None:
+            return float(event.time)
+        if event.tick is not None and self.tempo_map is not None:
+            return float(self.tempo_map.tick_to_time(event.tick))
+        raise ValueError(f"{event!r} has no real-time timestamp")
+
+    def _current_time(self) -> Union[int, float]:
+        status = self.queue.get_status()
+        if self._ticks:
+            return status.tick_time
+        return float(status.real_time)
+
+    def _schedule_refill(self, when: Union[int, float]):
+        if self._ticks:
+            self._refill_call = self.scheduler.call_at_tick(int(when), self._refill_due)
+        else:
+            self._refill_call = self.scheduler.call_at_time(when, self._refill_due)
+
+    def _refill_due(self):
+        self._refill_call = None
+        if self._exhausted:
+            self.done = True
+        else:
+            self.refill()
+
+    def _encode(self, event: Event) -> list[_snd_seq_event_t]:
+        dest = self.dest if event.dest is None else None
+        result = []
+        remainder = None
+        while True:
+            alsa_event, remainder = self.client._prepare_event(event, queue=self.queue,
+                                                               port=self.port, dest=dest,
+                                                               remainder=remainder)
+            if alsa_event.type != EventType.NONE:
+                alsa_event = ffi.new("snd_seq_event_t *", alsa_event[0])
+                alsa_event.tag = self.tag
+                result.append(alsa_event)
+            if remainder is None:
+                return result
+
+    def _output_alsa(self, alsa_event: _snd_seq_event_t, remainder: Any = None):
+        _ = remainder
+        return alsa.snd_seq_event_output(self.client.handle, alsa_event), None
+
+    def _output(self, index: int, event: Event, tick: Optional[int]):
+        loop = self._loop
+        if loop is not None and self._loop_index <= index and event.tick < loop[1]:
+            # the loop region events are encoded only once
+            cached = self._loop_cache.get(index)
+            if cached is None:
+                cached = (event, self._encode(event))
+                self._loop_cache[index] = cached
+            encoded = cached[1]
+        else:
+            encoded = self._encode(event)
+        for alsa_event in encoded:
+            if tick is not None:
+                alsa_event.time.tick = tick
+            if self.note_tracker is not None:
+                self.note_tracker.track_alsa(alsa_event)
+            self.client._event_output_wait(partial(self._output_alsa, alsa_event))
+
+    def _next_event(self) -> Optional[Event]:
+        if self._pending is not None:
+            event = self._pending
+            self._pending = None
+            return event
+        if self._sequence is not None:
+            if self._index >= len(self._sequence):
+                return None
+            return self._sequence[self._index]
+        assert self._events is not None
+        return next(self._events, None)
+
+    def refill(self, now: Optional[Union[int, float]] = None) -> int:
+        """Schedule events up to the end of the lookahead window.
+
+        Normally called by the scheduler.
+
+        :param now: current queue time (ticks or seconds). Default: read from
+                    the queue status.
+
+        :return: number of events scheduled (not skipped because of mute)
+        """
+        if self._exhausted:
+            return 0
+        if now is None:
+            now = self._current_time()
+        horizon = now + self._lookahead
+        window = self._window
+        while window and window[0][0] < now:
+            window.popleft()
+        count = 0
+        while True:
+            event = self._next_event()
+            loop = self._loop
+            if loop is not None and (event is None or self._event_time(event) >= loop[1]):
+                if loop[1] + self._offset > horizon:
+                    self._pending = event
+                    break
+                # next loop pass
+                self._offset += loop[1] - loop[0]
+                self._index = self._loop_index
+                continue
+            if event is None:
+                self._exhausted = True
+                break
+            event_time = self._event_time(event) + self._offset
+            if event_time > horizon:
+                self._pending = event
+                break
+            if self._sequence is not None and self._ticks:
+                assert isinstance(event_time, int)
+                index, tick = self._index, event_time
+            else:
+                index, tick = -1, None
+            if self._sequence is not None:
+                self._index += 1
+            window.append((event_time, index, event, tick))
+            if not self.muted or isinstance(event, _QUEUE_CONTROL_EVENTS):
+                self._output(index, event, tick)
+                if self.tempo_map is not None:
+                    self.tempo_map.add_event(event)
+                count += 1
+            self._last_time = event_time
+
+        if self._exhausted:
+            # the final echo marks the end of the playback
+            self._schedule_refill(max(self._last_time, now))
+        elif self._ticks:
+            self._schedule_refill(horizon - self._lookahead // 2)
+        else:
+            self._schedule_refill(horizon - self._lookahead / 2)
+        self.client.drain_output()
+        return count
+
+    def handle_event(self, event: Event) -> bool:
+        """Process an event received by the player port.
+
+        :param event: the event received
+
+        :return: `True` if this was the scheduler's echo event, `False` otherwise
+        """
+        return self.scheduler.handle_event(event)
+
+    def _check_seekable(self):
+        if self._sequence is None or not self._ticks:
+            raise TypeError("events sequence and lookahead_ticks required")
+        if self._event_ticks is None:
+            self._event_ticks = [self._event_time(event) for event in self._sequence]
+
+    def _find_index(self, tick: int) -> int:
+        assert self._event_ticks is not None
+        return bisect_left(self._event_ticks, tick)
+
+    def _drop_scheduled(self):
+        self._remove_condition.tag = self.tag
+        self.client.remove_events(self._remove_condition)
+        if self.note_tracker is not None:
+            self.note_tracker.discard_scheduled(self.queue, [self.tag])
+        self._cancel_refill()
+
+    def _cancel_refill(self):
+        if self._refill_call is not None:
+            self.scheduler.cancel(self._refill_call)
+            self._refill_call = None
+
+    def mute(self):
+        """Drop the events scheduled and stop scheduling new ones, until
+        :meth:`unmute` is called.
+
+        Queue control events are still scheduled.
+        """
+        if self.muted:
+            return
+        self.muted = True
+        refill_pending = self._refill_call is not None
+        self._drop_scheduled()
+        # queue control events are played when muted too
+        now = self._current_time()
+        for event_time, index, event, tick in self._window:
+            if event_time >= now and isinstance(event, _QUEUE_CONTROL_EVENTS):
+                self._output(index, event, tick)
+        # the refill echo could have been removed with the events
+        if refill_pending and self._exhausted:
+            self._schedule_refill(self._last_time)
+            self.client.drain_output()
+        elif refill_pending:
+            self.refill()
+        else:
+            self.client.drain_output()
+
+    def unmute(self):
+        """Resume scheduling events, starting with the current window."""
+        if not self.muted:
+            return
+        self.muted = False
+        now = self._current_time()
+        for event_time, index, event, tick in self._window:
+            # queue control events are still scheduled
+            if event_time >= now and not isinstance(event, _QUEUE_CONTROL_EVENTS):
+                self._output(index, event, tick)
+        self.client.drain_output()
+
+    def set_loop(self, start: int, end: int):
+        """Loop playback of a region.
+
+        Events of the region are encoded only once and scheduled again (with
+        shifted timestamps) on every pass, so the queue position keeps
+        increasing while looping. Events already scheduled are not affected.
+
+        :param start: loop start (ticks)
+        :param end: loop end (ticks)
+        """
+        self._check_seekable()
+        if not 0 <= start < end:
+            raise ValueError("invalid loop region")
+        self._loop = (start, end)
+        self._loop_index = self._find_index(start)
+        self._loop_cache.clear()
+        if self._exhausted:
+            self._exhausted = False
+            self.done = False
+            self.refill()
+
+    def clear_loop(self):
+        """Stop looping.
+
+        Playback continues after the loop end after the current pass.
+        """
+        self._loop = None
+        self._loop_cache.clear()
+
+    def seek(self, tick: int, set_position: bool = True):
+        """Change playback position.
+
+        Drops the player events already scheduled, sends a
+        :class:`SetQueuePositionTickEvent` and schedules the events from the
+        new position on.
+
+        :param tick: new position (in the events time, ticks)
+        :param set_position: set to `False` to skip the queue position change
+                             (when done by other means)
+        """
+        self._check_seekable()
+        self._drop_scheduled()
+        self._offset = 0
+        self._pending = None
+        self._window.clear()
+        self._index = self._find_index(tick)
+        self._exhausted = False
+        self.done = False
+        if set_position:
+            event = SetQueuePositionTickEvent(tick, control_queue=self.queue, dest=SYSTEM_TIMER)
+            self.client.event_output(event, port=self.port)
+        self.refill(now=tick)
+
+    def start(self):
+        """Schedule the first window of events and start the queue."""
+        self.done = False
+        self.refill(now=0)
+        self.queue.start()
+        self.client.drain_output()
+
+    def stop(self):
+        """Stop the queue and drop the player events scheduled on it.
+
+        With a `note_tracker`, Note Off is sent for the notes left sounding.
+        """
+        self.queue.stop()
+        self.client.drain_output()
+        self._drop_scheduled()
+        self._window.clear()
+        if self.note_tracker is not None:
+            self.note_tracker.all_notes_off()
+
+    def play(self, timeout: float = 1.0):
+        """Play all the events, blocking until done.
+
+        Events received by the client, other than the player echo events, are
+        ignored.
+
+        :param timeout: how often (in seconds) the input is polled, when nothing is received
+        """
+        self.start()
+        while not self.done:
+            event = self.client.event_input(timeout=timeout)
+            if event is not None:
+                self.handle_event(event)
+
+
+class MultiTrackPlayer:
+    """Plays multiple tracks on a single queue, with per-track mute and solo.
+
+    Each track is played by a separate :class:`QueuePlayer`, with its own
+    event tag (`first_tag` + track number), all sharing a single
+    :class:`EchoScheduler`. Muting a track drops only its events scheduled
+    and unmuting schedules only its events of the current lookahead window.
+    Queue control events, like the tempo changes of a conductor track, are
+    played on muted tracks too.
+
+    The echo events have to be passed to :meth:`handle_event` (or the
+    :meth:`play` loop has to be used).
+
+    :param client: client to use
+    :param queue: queue to play the events on
+    :param port: port to send the events from
+    :param tracks: the tracks – event sources, as for :class:`QueuePlayer`
+    :param lookahead: length of the window scheduled (in seconds)
+    :param lookahead_ticks: length of the window scheduled (in MIDI ticks),
+                            instead of `lookahead`
+    :param dest: destination for the events which have no :attr:`~Event.dest` set
+    :param first_tag: tag of the first track events
+    :param scheduler: scheduler to use for the refills. Default: a new one,
+                      for `port`, using tag 0.
+    :param tempo_map: tempo map of the queue
+    :param note_tracker: tracker shared by the tracks, :meth:`stop` then
+                         sends Note Off for the notes left sounding
+
+    :ivar tracks: players of the individual tracks
+    :ivar scheduler: scheduler used for the refills
+    """
+
+    tracks: list[QueuePlayer]
+    scheduler: EchoScheduler
+
+    def __init__(self,
+                 client: 'SequencerClient',
+                 queue: 'Queue',
+                 port: 'Port',
+                 tracks: Sequence[Iterable[Event]],
+                 *,
+                 lookahead: float = 0.5,
+                 lookahead_ticks: Optional[int] = None,
+                 dest: Optional[AddressType] = None,
+                 first_tag: int = 1,
+                 scheduler: Optional[EchoScheduler] = None,
+                 tempo_map: Optional[TempoMap] = None,
+                 note_tracker: Optional['NoteTracker'] = None):
+        if first_tag < 0 or first_tag + len(tracks) > 256:
+            raise ValueError("not enough event tags available")
+        if scheduler is None:
+            scheduler = EchoScheduler(client, queue, port)
+        self.scheduler = scheduler
+        self._client = client
+        self._queue = queue
+        self.tracks = [QueuePlayer(client, queue, port, events,
+                                   lookahead=lookahead, lookahead_ticks=lookahead_ticks,
+                                   dest=dest, tag=first_tag + i, scheduler=scheduler,
+                                   tempo_map=tempo_map, note_tracker=note_tracker)
+                       for i, events in enumerate(tracks)]
+        self._note_tracker = note_tracker
+        self._remove_condition = RemoveEvents(RemoveCondition.OUTPUT | RemoveCondition.TAG_MATCH,
+                                              queue_id=queue.queue_id)
+        self._muted: set[int] = set()
+        self._soloed: set[int] = set()
+
+    @property
+    def done(self) -> bool:
+        """`True` when all the tracks have been played."""
+        return all(track.done for track in self.tracks)
+
+    def _apply(self):
+        for i, track in enumerate(self.tracks):
+            mute = i in self._muted or bool(self._soloed and i not in self._soloed)
+            if mute and not track.muted:
+                track.mute()
+            elif not mute and track.muted:
+                track.unmute()
+
+    def mute(self, track: int, muted: bool = True):
+        """Mute or unmute a track.
+
+        :param track: track number
+        :param muted: `False` to unmute the track
+        """
+        if muted:
+            self._muted.add(track)
+        else:
+            self._muted.discard(track)
+        self._apply()
+
+    def solo(self, track: int, soloed: bool = True):
+        """Solo a track or remove it from solo.
+
+        When any track is soloed, only the soloed tracks (and not muted) are played.
+
+        :param track: track number
+        :param soloed: `False` to remove the track from solo
+        """
+        if soloed:
+            self._soloed.add(track)
+        else:
+            self._soloed.discard(track)
+        self._apply()
+
+    def handle_event(self, event: Event) -> bool:
+        """Process an event received by the scheduler port.
+
+        :param event: the event received
+
+        :return: `True` if this was the scheduler's echo event, `False` otherwise
+        """
+        return self.scheduler.handle_event(event)
+
+    def seek(self, tick: int):
+        """Change playback position of all the tracks.
+
+        :param tick: new position (ticks)
+        """
+        for i, track in enumerate(self.tracks):
+            track.seek(tick, set_position=(i == 0))
+
+    def start(self):
+        """Schedule the first window of events and start the queue."""
+        for track in self.tracks:
+            track.done = False
+            track.refill(now=0)
+        self._queue.start()
+        self._client.drain_output()
+
+    def stop(self):
+        """Stop the queue and drop the events scheduled by the players."""
+        self._queue.stop()
+        self._client.drain_output()
+        self._client.remove_events_tags([track.tag for track in self.tracks],
+                                        self._remove_condition)
+        for track in self.tracks:
+            track._cancel_refill()
+            track._window.clear()
+        if self._note_tracker is not None:
+            self._note_tracker.discard_scheduled(self._queue, [track.tag for track in self.tracks])
+            self._note_tracker.all_notes_off()
+
+    def play(self, timeout: float = 1.0):
+        """Play all the tracks, blocking until done.
+
+        :param timeout: how often (in seconds) the input is polled, when nothing is received
+        """
+        self.start()
+        while not self.done:
+            event = self._client.event_input(timeout=timeout)
+            if event is not None:
+                self.handle_event(event)
+
+
+__all__ = ["QueuePlayer", "MultiTrackPlayer"]
@@ -0,0 +1,558 @@
+import heapq
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING, Any, Optional
+
+from .event import (Control14BitChangeEvent, ControlChangeEventBase, Event, EventType,
+                    NonRegisteredParameterChangeEvent, RegisteredParameterChangeEvent)
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+
+
+# shortest wait for input in _Stage.event_input() (seconds)
+_MIN_WAIT = 1e-6
+
+
+class _Stage(ABC):
+    """Base for the event processing stages.
+
+    Subclasses implement :meth:`process`, :meth:`flush` and
+    :meth:`_next_deadline`.
+    """
+
+    _clock: Callable[[], float]
+    _ready: deque[Event]
+
+    @abstractmethod
+    def process(self, event: Event) -> list[Event]:
+        """Process an incoming event.
+
+        :param event: the event
+
+        :return: events to be passed on now (possibly empty)
+        """
+
+    @abstractmethod
+    def flush(self, force: bool = False, *, now: Optional[float] = None) -> list[Event]:
+        """Collect the events held that are due.
+
+        :param force: collect all the events held
+        :param now: current time (in seconds), if already known
+
+        :return: events to be passed on now (possibly empty)
+        """
+
+    @abstractmethod
+    def _next_deadline(self) -> Optional[float]:
+        """Clock time of the next held event due, `None` when nothing is held."""
+
+    def timeout(self) -> Optional[float]:
+        """Time (in seconds) until :meth:`flush` will have something to return.
+
+        :return: the time or `None` if no events are held
+        """
+        deadline = self._next_deadline()
+        if deadline is None:
+            return None
+        return max(deadline - self._clock(), 0.0)
+
+    def event_input(self, client: 'SequencerClient', timeout: Optional[float] = None
+                    ) -> Optional[Event]:
+        """Receive the next event from a client, processed by this stage.
+
+        :param client: the client to read the events from
+        :param timeout: maximum time (in seconds) to wait for an event. Default: wait forever.
+
+        :return: The event or `None` if the timeout has been reached.
+        """
+        ready = self._ready
+        until = self._clock() + timeout if timeout is not None else None
+        while not ready:
+            now = self._clock()
+            ready.extend(self.flush(now=now))
+            if ready:
+                break
+            deadline = self._next_deadline()
+            if until is not None:
+                if now >= until:
+                    return None
+                deadline = until if deadline is None else min(deadline, until)
+            if deadline is not None:
+                # rounding may make it 0 (meaning 'forever') while flush()
+                # still holds the event
+                wait: Optional[float] = max(deadline - now, _MIN_WAIT)
+            else:
+                wait = None
+            event = client.event_input(timeout=wait)
+            if event is not None:
+                ready.extend(self.process(event))
+        return ready.popleft()
+
+
+class ControllerCoalescer(_Stage):
+    """Coalesces floods of controller events, keeping only the latest values.
+
+    Controller events (by default: :class:`ControlChangeEvent`,
+    :class:`PitchBendEvent` and :class:`ChannelPressureEvent`) are sent on at
+    most once per `interval` for each source, event type, channel and
+    controller number. The first change is passed immediately, the
+    following ones, within the interval, replace each other and only the last
+    value is passed when the interval ends.
+
+    Other events (notes, SysEx, etc.) are passed immediately, in order. Any
+    controller changes still held from the same source are passed before them,
+    so e.g. a pitch bend is never delivered after the note that followed it.
+
+    Events are fed with :meth:`process` and the held ones collected with
+    :meth:`flush`, or the coalescer may read a client input directly with
+    :meth:`event_input`.
+
+    :param interval: minimum time (in seconds) between events for the same
+                     controller
+    :param event_types: types of events to coalesce
+    :param clock: function returning current time in seconds
+
+    :ivar interval: minimum time (in seconds) between events for the same controller
+    :ivar coalesced: number of events dropped (replaced by newer values)
+    """
+
+    interval: float
+    coalesced: int
+
+    def __init__(self,
+                 interval: float = 0.01,
+                 *,
+                 event_types: Iterable[EventType] = (EventType.CONTROLLER, EventType.PITCHBEND,
+                                                     EventType.CHANPRESS),
+                 clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.coalesced = 0
+        self._event_types = frozenset(event_types)
+        self._clock = clock
+        # last time an event was passed, per key
+        self._last: dict[tuple[Any, ...], float] = {}
+        # events held, per key
+        self._pending: dict[tuple[Any, ...], Event] = {}
+        # events ready for event_input()
+        self._ready: deque[Event] = deque()
+
+    @staticmethod
+    def _key(event: Event) -> tuple[Any, ...]:
+        source = tuple(event.source) if event.source is not None else None
+        return (source, event.type, getattr(event, "channel", None),
+                getattr(event, "param", None))
+
+    def process(self, event: Event) -> list[Event]:
+        """Process an incoming event.
+
+        :param event: the event
+
+        :return: events to be passed on now (possibly empty)
+        """
+        now = self._clock()
+        result = self.flush(now=now)
+        if event.type not in self._event_types:
+            if self._pending:
+                source = tuple(event.source) if event.source is not None else None
+                for key in [key for key in self._pending if key[0] == source]:
+                    result.append(self._pending.pop(key))
+                    self._last[key] = now
+            result.append(event)
+            return result
+        key = self._key(event)
+        if key in self._pending:
+            self.coalesced += 1
+            self._pending[key] = event
+            return result
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._pending[key] = event
+            return result
+        self._last[key] = now
+        result.append(event)
+        return result
+
+    def flush(self, force: bool = False, *, now: Optional[float] = None) -> list[Event]:
+        """Collect the events held for which the interval has ended.
+
+        :param force: collect all the events held
+        :param now: current time (in seconds), if already known
+
+        :return: events to be passed on now (possibly empty)
+        """
+        if not self._pending:
+            return []
+        if now is None:
+            now = self._clock()
+        result = []
+        interval = self.interval
+        for key, event in list(self._pending.items()):
+            if force or now - self._last[key] >= interval:
+                result.append(event)
+                del self._pending[key]
+                self._last[key] = now
+        return result
+
+    def _next_deadline(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        return min(self._last[key] for key in self._pending) + self.interval
+
+    def reset(self):
+        """Forget all the events held and the controller state."""
+        self._last.clear()
+        self._pending.clear()
+        self._ready.clear()
+
+
+def _timestamp(event: Event) -> Optional[int]:
+    if event.tick is not None:
+        return event.tick
+    if event.time is not None:
+        return event.time.seconds * 1000000000 + event.time.nanoseconds
+    return None
+
+
+class TimestampMerger(_Stage):
+    """Reorders events merged from multiple inputs by their timestamps.
+
+    When events from multiple ports are timestamped by a queue, the order
+    they arrive in may differ from the timestamp order. The merger holds
+    events for up to `window` seconds in a heap keyed by :attr:`Event.tick`
+    or :attr:`Event.time` and passes them on in timestamp order. An event is
+    released no later than `window` after it arrived, together with all the
+    held events with earlier timestamps. No more than `max_events` events
+    are held – when the limit is exceeded, the earliest are released.
+
+    All inputs merged should use the same kind of timestamps (the same
+    queue). Events without a timestamp are passed immediately.
+
+    :param window: maximum time (in seconds) an event is held
+    :param max_events: maximum number of events held
+    :param clock: function returning current time in seconds
+
+    :ivar window: maximum time (in seconds) an event is held
+    :ivar max_events: maximum number of events held
+    :ivar late: number of events received with a timestamp earlier than an
+                event already released (delivered out of order)
+    """
+
+    window: float
+    max_events: int
+    late: int
+
+    def __init__(self,
+                 window: float = 0.01,
+                 *,
+                 max_events: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_events < 1:
+            raise ValueError("max_events must be positive")
+        self.window = window
+        self.max_events = max_events
+        self.late = 0
+        self._clock = clock
+        self._seq = 0
+        self._last_released: Optional[int] = None
+        # entries: [timestamp, sequence number, event, arrival time, released]
+        self._heap: list[list[Any]] = []
+        # the same entries in arrival order
+        self._arrivals: deque[list[Any]] = deque()
+        self._ready: deque[Event] = deque()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _release(self) -> Event:
+        entry = heapq.heappop(self._heap)
+        entry[4] = True
+        arrivals = self._arrivals
+        while arrivals and arrivals[0][4]:
+            arrivals.popleft()
+        self._last_released = entry[0]
+        return entry[2]
+
+    def process(self, event: Event) -> list[Event]:
+        """Process an incoming event.
+
+        :param event: the event
+
+        :return: events to be passed on now (possibly empty)
+        """
+        now = self._clock()
+        result = self.flush(now=now)
+        timestamp = _timestamp(event)
+        if timestamp is None:
+            result.append(event)
+            return result
+        if self._last_released is not None and timestamp < self._last_released:
+            self.late += 1
+        entry = [timestamp, self._seq, event, now, False]
+        self._seq += 1
+        heapq.heappush(self._heap, entry)
+        self._arrivals.append(entry)
+        while len(self._heap) > self.max_events:
+            result.append(self._release())
+        return result
+
+    def flush(self, force: bool = False, *, now: Optional[float] = None) -> list[Event]:
+        """Collect the events that have been held for the whole window.
+
+        Events with timestamps earlier than these are collected too.
+
+        :param force: collect all the events held
+        :param now: current time (in seconds), if already known
+
+        :return: events to be passed on now, in timestamp order (possibly empty)
+        """
+        if not self._heap:
+            return []
+        result = []
+        if force:
+            while self._heap:
+                result.append(self._release())
+            return result
+        if now is None:
+            now = self._clock()
+        arrivals = self._arrivals
+        limit = now - self.window
+        while arrivals and arrivals[0][3] <= limit:
+            result.append(self._release())
+        return result
+
+    def _next_deadline(self) -> Optional[float]:
+        if not self._arrivals:
+            return None
+        return self._arrivals[0][3] + self.window
+
+    def reset(self):
+        """Drop all the events held."""
+        self._heap.clear()
+        self._arrivals.clear()
+        self._ready.clear()
+        self._last_released = None
+
+
+# controller numbers
+_DATA_ENTRY_MSB = 6
+_DATA_ENTRY_LSB = 38
+_NRPN_LSB = 98
+_NRPN_MSB = 99
+_RPN_LSB = 100
+_RPN_MSB = 101
+_PARAM_NULL = 0x3fff
+
+
+class _ChannelState:
+    """Controller state of a single source and channel."""
+
+    __slots__ = ("msb", "msb_valid", "lsb_seen", "kind", "rpn", "nrpn", "data_msb",
+                 "data_lsb_seen")
+
+    def __init__(self):
+        # last MSB values of controllers 0-31
+        self.msb = bytearray(32)
+        # bit masks of controllers 0-31
+        self.msb_valid = 0
+        self.lsb_seen = 0
+        # type of the event for the data entry or 0 if no parameter selected
+        self.kind = 0
+        self.rpn = _PARAM_NULL
+        self.nrpn = _PARAM_NULL
+        self.data_msb = -1
+        self.data_lsb_seen = False
+
+
+class ParameterAssembler(_Stage):
+    """Combines 7-bit controller sequences into 14-bit and (N)RPN events.
+
+    Turns :class:`ControlChangeEvent` MSB / LSB pairs (controllers 0–31 and
+    32–63) into :class:`Control14BitChangeEvent` and RPN / NRPN selection
+    (controllers 101/100 and 99/98) followed by data entry (controllers 6 and
+    38) into :class:`RegisteredParameterChangeEvent` or
+    :class:`NonRegisteredParameterChangeEvent`. The parameter selection
+    controller events are consumed.
+
+    Many devices send only the MSB, so the LSB is waited for only after one
+    has been seen for the controller (or parameter data entry) on the same
+    source and channel. Until then, MSB events are passed on as they are
+    (data entry as a parameter change with the LSB 0). An MSB held is
+    passed on, with the LSB 0, after `lsb_timeout` if no LSB comes, or
+    before any other event from the same source (other than its LSB).
+
+    :param lsb_timeout: maximum time (in seconds) to wait for an LSB
+    :param clock: function returning current time in seconds
+
+    :ivar lsb_timeout: maximum time (in seconds) to wait for an LSB
+    :ivar assembled: number of combined events produced
+    """
+
+    lsb_timeout: float
+    assembled: int
+
+    def __init__(self,
+                 lsb_timeout: float = 0.01,
+                 *,
+                 clock: Callable[[], float] = time.monotonic):
+        self.lsb_timeout = lsb_timeout
+        self.assembled = 0
+        self._clock = clock
+        self._states: dict[tuple[Any, int], _ChannelState] = {}
+        # MSB-only events held, keyed by (source, channel, controller)
+        self._pending: dict[tuple[Any, int, int], tuple[float, Event]] = {}
+        self._ready: deque[Event] = deque()
+
+    def _combined(self, cls: type[ControlChangeEventBase], event: ControlChangeEventBase,
+                  param: int, value: int) -> Event:
+        return cls(event.channel, param, value,
+                   tag=event.tag, queue_id=event.queue_id, time=event.time, tick=event.tick,
+                   source=event.source, dest=event.dest, relative=event.relative)
+
+    def _param_event(self, state: _ChannelState, event: ControlChangeEventBase,
+                     value: int) -> Event:
+        if state.kind == EventType.REGPARAM:
+            return self._combined(RegisteredParameterChangeEvent, event, state.rpn, value)
+        return self._combined(NonRegisteredParameterChangeEvent, event, state.nrpn, value)
+
+    def _release(self, key: tuple[Any, int, int], result: list[Event]):
+        held = self._pending.pop(key, None)
+        if held is not None:
+            result.append(held[1])
+            self.assembled += 1
+
+    def _release_source(self, source: Any, result: list[Event],
+                        keep: Optional[tuple[Any, int, int]] = None):
+        if self._pending:
+            for key in [key for key in self._pending if key[0] == source and key != keep]:
+                self._release(key, result)
+
+    def process(self, event: Event) -> list[Event]:
+        """Process an incoming event.
+
+        :param event: the event
+
+        :return: events to be passed on now (possibly empty)
+        """
+        now = self._clock()
+        result = self.flush(now=now)
+        source = tuple(event.source) if event.source is not None else None
+        if event.type != EventType.CONTROLLER:
+            self._release_source(source, result)
+            result.append(event)
+            return result
+
+        assert isinstance(event, ControlChangeEventBase)
+        channel = event.channel
+        state = self._states.get((source, channel))
+        if state is None:
+            state = self._states[(source, channel)] = _ChannelState()
+        param = event.param
+        value = event.value & 0x7f
+
+        # everything held from the source goes before this event, except
+        # the MSB it completes
+        if param == _DATA_ENTRY_LSB:
+            partner = (source, channel, _DATA_ENTRY_MSB) if state.kind else None
+        elif 32 <= param < 64:
+            partner = (source, channel, param - 32)
+        else:
+            partner = None
+        self._release_source(source, result, partner)
+
+        if param == _DATA_ENTRY_MSB or param == _DATA_ENTRY_LSB:
+            if not state.kind:
+                result.append(event)
+                return result
+            key = (source, channel, _DATA_ENTRY_MSB)
+            if param == _DATA_ENTRY_MSB:
+                state.data_msb = value
+                combined = self._param_event(state, event, value << 7)
+                if state.data_lsb_seen:
+                    self._pending[key] = (now + self.lsb_timeout, combined)
+                else:
+                    result.append(combined)
+                    self.assembled += 1
+            else:
+                self._pending.pop(key, None)
+                state.data_lsb_seen = True
+                if state.data_msb >= 0:
+                    result.append(self._param_event(state, event, state.data_msb << 7 | value))
+                    self.assembled += 1
+                else:
+                    result.append(event)
+        elif param < 32:
+            key = (source, channel, param)
+            state.msb[param] = value
+            state.msb_valid |= 1 << param
+            if state.lsb_seen & (1 << param):
+                combined = self._combined(Control14BitChangeEvent, event, param, value << 7)
+                self._pending[key] = (now + self.lsb_timeout, combined)
+            else:
+                result.append(event)
+        elif param < 64:
+            msb_param = param - 32
+            self._pending.pop((source, channel, msb_param), None)
+            state.lsb_seen |= 1 << msb_param
+            if state.msb_valid & (1 << msb_param):
+                result.append(self._combined(Control14BitChangeEvent, event, msb_param,
+                                             state.msb[msb_param] << 7 | value))
+                self.assembled += 1
+            else:
+                result.append(event)
+        elif _NRPN_LSB <= param <= _RPN_MSB:
+            if param == _RPN_MSB:
+                state.rpn = (state.rpn & 0x7f) | value << 7
+            elif param == _RPN_LSB:
+                state.rpn = (state.rpn & 0x3f80) | value
+            elif param == _NRPN_MSB:
+                state.nrpn = (state.nrpn & 0x7f) | value << 7
+            else:
+                state.nrpn = (state.nrpn & 0x3f80) | value
+            if param >= _RPN_LSB:
+                state.kind = EventType.REGPARAM if state.rpn != _PARAM_NULL else 0
+            else:
+                state.kind = EventType.NONREGPARAM if state.nrpn != _PARAM_NULL else 0
+            state.data_msb = -1
+        else:
+            result.append(event)
+        return result
+
+    def flush(self, force: bool = False, *, now: Optional[float] = None) -> list[Event]:
+        """Collect the MSB-only events for which the LSB wait has timed out.
+
+        :param force: collect all the events held
+        :param now: current time (in seconds), if already known
+
+        :return: events to be passed on now (possibly empty)
+        """
+        pending = self._pending
+        if not pending:
+            return []
+        if now is None:
+            now = self._clock()
+        result = []
+        # held in deadline order
+        for key, (deadline, event) in list(pending.items()):
+            if not force and deadline > now:
+                break
+            result.append(event)
+            del pending[key]
+        self.assembled += len(result)
+        return result
+
+    def _next_deadline(self) -> Optional[float]:
+        for deadline, _ in self._pending.values():
+            return deadline
+        return None
+
+    def reset(self):
+        """Forget all the events held and the controller state."""
+        self._states.clear()
+        self._pending.clear()
+        self._ready.clear()
+
+
+__all__ = ["ControllerCoalescer", "TimestampMerger", "ParameterAssembler"]
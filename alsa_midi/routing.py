@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import select
+import threading
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Union
+
+from ._ffi import alsa, ffi
+from .address import Address, AddressType
+from .event import EventType, _snd_seq_event_t
+from .forward import _CONTROL_EVENTS, _NOTE_EVENTS, Forwarder, ForwardRule, _CompiledRule
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+
+
+logger = logging.getLogger("alsa_midi.routing")
+
+# kinds of event data, for the dispatch table entries
+_OTHER = 0
+_NOTE = 1
+_CONTROL = 2
+
+# events the velocity table applies to (when the velocity is not 0)
+_NOTE_ON_EVENTS = frozenset({EventType.NOTEON, EventType.NOTE})
+
+
+@dataclass
+class Route(ForwardRule):
+    """Routing rule.
+
+    Extends :class:`ForwardRule` with more matching criteria and
+    transformations. All the criteria set must match for the route to apply.
+
+    :ivar source: source address of the event. `None` for any.
+    :ivar channels: MIDI channels matched. Events without a channel (e.g.
+                    SysEx) do not match when this is set. `None` for any.
+    :ivar notes: range (lowest, highest – inclusive) of note numbers matched.
+                 Applies only to note events, other events are not affected.
+    :ivar velocity: velocity lookup table (128 values) for Note On events.
+                    Velocity 0 (Note Off) is not changed.
+    :ivar controllers: controller number mapping for :class:`ControlChangeEvent`
+                       (controllers not in the mapping are not changed)
+    """
+    source: Optional[AddressType] = None
+    channels: Optional[Iterable[int]] = None
+    notes: Optional[tuple[int, int]] = None
+    velocity: Optional[Sequence[int]] = None
+    controllers: Optional[Mapping[int, int]] = None
+
+
+class _CompiledRoute(_CompiledRule):
+    """:class:`Route` converted to plain values."""
+
+    __slots__ = ("source", "channels", "note_low", "note_high", "velocity", "controllers")
+
+    def __init__(self, route: Union[Route, ForwardRule]):
+        super().__init__(route)
+        if not isinstance(route, Route):
+            route = Route(**vars(route))
+        self.source = tuple(Address(route.source)) if route.source is not None else None
+        if route.channels is not None:
+            channels = set(route.channels)
+            self.channels: Optional[tuple[bool, ...]] = tuple(i in channels for i in range(16))
+        else:
+            self.channels = None
+        if route.notes is not None:
+            self.note_low, self.note_high = route.notes
+        else:
+            self.note_low, self.note_high = 0, 127
+        if route.velocity is not None:
+            if len(route.velocity) != 128:
+                raise ValueError("velocity table must have 128 values")
+            self.velocity: Optional[bytes] = bytes(route.velocity)
+        else:
+            self.velocity = None
+        if route.controllers is not None:
+            self.controllers: Optional[list[int]] = [route.controllers.get(i, i)
+                                                     for i in range(128)]
+        else:
+            self.controllers = None
+
+
+def _event_kind(event_type: int) -> int:
+    if event_type in _NOTE_EVENTS:
+        return _NOTE
+    if event_type in _CONTROL_EVENTS:
+        return _CONTROL
+    return _OTHER
+
+
+class Router(Forwarder):
+    """Routes input events of a client according to a set of rules.
+
+    Like :class:`Forwarder`, works on the raw ALSA events, without creating
+    :class:`Event` objects. The routes are compiled, when the router is
+    created, into a dispatch table mapping event type to the list of routes
+    which may apply to that type, so for each event received only the
+    remaining criteria (port, source, channel, note range) are checked.
+
+    The router may run in the calling thread (:meth:`run`), in its own thread
+    (:meth:`start` / :meth:`stop`) or as an asyncio task (:meth:`run_async`).
+    Nothing else should read the client input meanwhile. All the input
+    available is processed before the output is drained.
+
+    :param client: the client to receive and send the events with (should be
+                   dedicated to the router when it runs in its own thread)
+    :param routes: the routing rules (:class:`ForwardRule` objects are accepted too)
+
+    :ivar client: client used
+    :ivar forwarded: number of events sent
+    :ivar dropped: number of events received and not routed anywhere
+    """
+
+    def __init__(self, client: 'SequencerClient', routes: Iterable[Union[Route, ForwardRule]]):
+        super().__init__(client, [])
+        compiled = [_CompiledRoute(route) for route in routes]
+        self._rules = compiled
+        event_types = {t for route in compiled if route.event_types is not None
+                       for t in route.event_types}
+        # routes for any event type
+        self._default = [(route, _OTHER) for route in compiled if route.event_types is None]
+        self._table: dict[int, list[tuple[_CompiledRoute, int]]] = {}
+        for event_type in event_types:
+            kind = _event_kind(event_type)
+            self._table[event_type] = [(route, kind) for route in compiled
+                                       if route.event_types is None
+                                       or event_type in route.event_types]
+        for event_type in _NOTE_EVENTS | _CONTROL_EVENTS:
+            if event_type not in self._table and self._default:
+                kind = _event_kind(event_type)
+                self._table[event_type] = [(route, kind) for route, _ in self._default]
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._wake_r = self._wake_w = -1
+
+    def _route(self, route: _CompiledRoute, kind: int, alsa_event: _snd_seq_event_t) -> bool:
+        out = self._out
+        ffi.memmove(out, alsa_event, ffi.sizeof("snd_seq_event_t"))
+        if kind == _NOTE:
+            data = out.data.note
+            if route.channel_map is not None:
+                data.channel = route.channel_map[data.channel & 0x0f]
+            if route.transpose:
+                note = data.note + route.transpose
+                if not 0 <= note < 128:
+                    return False
+                data.note = note
+            if (route.velocity is not None and data.velocity
+                    and out.type in _NOTE_ON_EVENTS):
+                data.velocity = route.velocity[data.velocity & 0x7f]
+        elif kind == _CONTROL:
+            data = out.data.control
+            if route.channel_map is not None:
+                data.channel = route.channel_map[data.channel & 0x0f]
+            if route.controllers is not None and out.type == EventType.CONTROLLER:
+                data.param = route.controllers[data.param & 0x7f]
+        out.source.port = route.port
+        out.dest.client = route.dest_client
+        out.dest.port = route.dest_port
+        out.queue = alsa.SND_SEQ_QUEUE_DIRECT
+        self.client._event_output_wait(self._output)
+        return True
+
+    def forward_event(self, alsa_event: _snd_seq_event_t) -> int:
+        """Route a single ALSA event.
+
+        The event is not changed. :meth:`SequencerClient.drain_output` needs
+        to be called for the events to be actually sent.
+
+        :param alsa_event: the event
+
+        :return: number of copies sent
+        """
+        count = 0
+        in_port = alsa_event.dest.port
+        for route, kind in self._table.get(alsa_event.type, self._default):
+            if route.input_port is not None and route.input_port != in_port:
+                continue
+            if (route.source is not None
+                    and route.source != (alsa_event.source.client, alsa_event.source.port)):
+                continue
+            if kind == _NOTE:
+                data = alsa_event.data.note
+                if not route.note_low <= data.note <= route.note_high:
+                    continue
+                if route.channels is not None and not route.channels[data.channel & 0x0f]:
+                    continue
+            elif kind == _CONTROL:
+                if (route.channels is not None
+                        and not route.channels[alsa_event.data.control.channel & 0x0f]):
+                    continue
+            elif route.channels is not None:
+                continue
+            if self._route(route, kind, alsa_event):
+                count += 1
+        if count:
+            self.forwarded += count
+        else:
+            self.dropped += 1
+        return count
+
+    def _thread_main(self):
+        poll = select.poll()
+        poll.register(self.client._fd, select.POLLIN)
+        poll.register(self._wake_r, select.POLLIN)
+        try:
+            while not self._stopping:
+                self.forward_pending()
+                poll.poll()
+        except Exception:
+            logger.error("Error in alsa_midi.routing thread:", exc_info=True)
+
+    def start(self):
+        """Start routing in a separate thread."""
+        if self._thread is not None:
+            raise RuntimeError("Router already started")
+        self._stopping = False
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(name="ALSA seq router",
+                                        target=self._thread_main,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the routing thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        os.write(self._wake_w, b"\0")
+        thread.join()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self._thread = None
+
+    async def run_async(self):
+        """Route events until cancelled, in the running asyncio event loop."""
+        loop = asyncio.get_running_loop()
+        fd = self.client._fd
+        loop.add_reader(fd, self.forward_pending)
+        try:
+            # the events pending already do not make the fd readable
+            self.forward_pending()
+            await loop.create_future()
+        finally:
+            loop.remove_reader(fd)
+
+
+__all__ = ["Route", "Router"]
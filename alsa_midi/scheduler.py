@@ -0,0 +1,140 @@
+import struct
+from typing import TYPE_CHECKING, Any, Callable, Union
+
+from .address import Address
+from .event import EchoEvent, Event, RealTime
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+    from .port import Port
+    from .queue import Queue
+
+
+_ECHO_ID = struct.Struct("<I")
+
+
+class EchoScheduler:
+    """Calls Python functions at specified queue times.
+
+    For each call an echo event is scheduled on the queue, addressed to the
+    scheduler's own port. The call is made when the event comes back and is
+    passed to :meth:`handle_event`, so the timing precision is that of the
+    kernel queue timer and no busy-waiting is needed.
+
+    Echo events are only sent to the output buffer –
+    :meth:`~alsa_midi.SequencerClient.drain_output()` needs to be called for
+    them to be actually scheduled.
+
+    :param client: client to use
+    :param queue: queue to schedule the calls on
+    :param port: port to send the echo events from and to. Must be writable.
+    :param tag: tag for the echo events
+
+    :ivar client: client used
+    :ivar queue: queue used
+    :ivar port: port used
+    :ivar tag: tag used for the echo events
+    """
+
+    client: 'SequencerClient'
+    queue: 'Queue'
+    port: 'Port'
+    tag: int
+
+    def __init__(self,
+                 client: 'SequencerClient',
+                 queue: 'Queue',
+                 port: 'Port',
+                 *,
+                 tag: int = 0):
+        self.client = client
+        self.queue = queue
+        self.port = port
+        self.tag = tag
+        self._address = Address(port)
+        self._calls: dict[int, tuple[Callable[..., Any], tuple]] = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    def _schedule(self, echo: EchoEvent, callback: Callable[..., Any], args: tuple) -> int:
+        call_id = self._next_id
+        self._next_id = (call_id + 1) & 0xffffffff
+        echo.raw_data = _ECHO_ID.pack(call_id)
+        self.client.event_output(echo, queue=self.queue, port=self.port, dest=self._address)
+        self._calls[call_id] = (callback, args)
+        return call_id
+
+    def call_at_tick(self, tick: int, callback: Callable[..., Any], *args: Any) -> int:
+        """Schedule a call at given queue position in MIDI ticks.
+
+        :param tick: queue time
+        :param callback: function to call
+        :param args: arguments for the function
+
+        :return: call identifier, for :meth:`cancel`
+        """
+        return self._schedule(EchoEvent(tick=tick, tag=self.tag), callback, args)
+
+    def call_at_time(self, time: Union[RealTime, float, int],
+                     callback: Callable[..., Any], *args: Any) -> int:
+        """Schedule a call at given queue real time.
+
+        :param time: queue time (in seconds)
+        :param callback: function to call
+        :param args: arguments for the function
+
+        :return: call identifier, for :meth:`cancel`
+        """
+        return self._schedule(EchoEvent(time=time, tag=self.tag), callback, args)
+
+    def cancel(self, call_id: int) -> bool:
+        """Cancel a scheduled call.
+
+        The echo event is still delivered, but ignored.
+
+        :param call_id: value returned by :meth:`call_at_tick` or :meth:`call_at_time`
+
+        :return: `True` if the call was still pending
+        """
+        return self._calls.pop(call_id, None) is not None
+
+    def cancel_all(self):
+        """Cancel all the pending calls."""
+        self._calls.clear()
+
+    def handle_event(self, event: Event) -> bool:
+        """Process an event received by the scheduler port.
+
+        Makes the scheduled call if this is the scheduler's echo event.
+
+        :param event: the event received
+
+        :return: `True` if this was the scheduler's echo event, `False` otherwise
+        """
+        if (not isinstance(event, EchoEvent) or event.tag != self.tag
+                or event.source != self._address or not event.raw_data):
+            return False
+        call_id = _ECHO_ID.unpack_from(event.raw_data)[0]
+        call = self._calls.pop(call_id, None)
+        if call is not None:
+            callback, args = call
+            callback(*args)
+        return True
+
+    def run(self, timeout: float = 1.0):
+        """Process the input events until there are no more pending calls.
+
+        Events received by the client, other than the scheduler echo events,
+        are ignored.
+
+        :param timeout: how often (in seconds) the input is polled, when nothing is received
+        """
+        while self._calls:
+            event = self.client.event_input(timeout=timeout)
+            if event is not None:
+                self.handle_event(event)
+
+
+__all__ = ["EchoScheduler"]
@@ -0,0 +1,333 @@
+"""Sequencer connection shared by multiple components of a process.
+
+Every :class:`~alsa_midi.SequencerClient` is a separate kernel client with
+its own file descriptor and, usually, its own input thread. When several
+independent components of a single process need sequencer access, they may
+use :func:`get_shared_client` instead, which hands out lightweight
+:class:`SharedClientView` objects all using a single connection.
+"""
+
+import errno
+import logging
+import os
+import queue
+import select
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Union
+
+from ._ffi import alsa, ffi
+from .address import AddressType
+from .client import SequencerClient
+from .event import Event, _snd_seq_event_t
+from .exceptions import StateError
+from .port import DEFAULT_PORT_TYPE, RW_PORT, Port, PortCaps, PortInfo, PortType
+from .util import _check_alsa_error
+
+if TYPE_CHECKING:
+    from .client import ClientInfo
+    from .queue import Queue
+
+logger = logging.getLogger("alsa_midi.shared")
+
+
+class _SharedConnection:
+    """The actual sequencer client shared between the views."""
+
+    def __init__(self, client_name: str, sequencer_name: str):
+        self.sequencer_name = sequencer_name
+        self.client = SequencerClient(client_name, sequencer_name=sequencer_name)
+        self.lock = threading.RLock()
+        self.views: set['SharedClientView'] = set()
+        # port_id -> (view, prefer_bytes)
+        self.ports: dict[int, tuple['SharedClientView', bool]] = {}
+        self.closing = False
+        # exception that stopped the input thread
+        self.error: Optional[Exception] = None
+        self._wake_r, self._wake_w = os.pipe()
+        self.in_thread = threading.Thread(name="ALSA seq shared input",
+                                          target=self._input_loop,
+                                          daemon=True)
+        self.in_thread.start()
+
+    def close(self):
+        if self.closing:
+            return
+        self.closing = True
+        os.write(self._wake_w, b"\0")
+        if self.in_thread is not threading.current_thread():
+            self.in_thread.join()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        with self.lock:
+            self.client.close()
+
+    def _input_loop(self):
+        client = self.client
+        poll = select.poll()
+        poll.register(client._fd, select.POLLIN)
+        poll.register(self._wake_r, select.POLLIN)
+        buf = ffi.new("snd_seq_event_t**", ffi.NULL)
+        try:
+            while not self.closing:
+                # under the lock, as the event parser (for prefer_bytes) is
+                # used for output too and alsa-lib handles are not thread-safe.
+                # The read does not block, waiting is done outside the lock.
+                with self.lock:
+                    result = alsa.snd_seq_event_input(client.handle, buf)
+                    if result == -errno.EAGAIN:
+                        event = None
+                    else:
+                        _check_alsa_error(result)
+                        event = self._receive(result, buf[0])
+                if result == -errno.EAGAIN:
+                    poll.poll()
+                    continue
+                if event is not None:
+                    event[0]._input_queue.put(event[1])
+        except Exception as exc:
+            logger.error("Error in alsa_midi.shared input loop:", exc_info=True)
+            # make event_input() of the views raise instead of waiting forever
+            with _connections_lock:
+                self.error = exc
+                for view in self.views:
+                    view._input_queue.put(exc)
+
+    def _receive(self, result: int, alsa_event: _snd_seq_event_t
+                 ) -> Optional[tuple['SharedClientView', Event]]:
+        try:
+            target = self.ports.get(alsa_event.dest.port)
+            if target is None:
+                logger.debug("dropping event for unknown port %i", alsa_event.dest.port)
+                return None
+            view, prefer_bytes = target
+            _, event = self.client._decode_event(result, alsa_event, prefer_bytes=prefer_bytes)
+        finally:
+            alsa.snd_seq_free_event(alsa_event)
+        if event is None:
+            return None
+        return view, event
+
+
+_connections: dict[str, _SharedConnection] = {}
+_connections_lock = threading.Lock()
+
+
+class SharedClientView:
+    """A component's view of a shared sequencer connection.
+
+    Should not be created directly, use :func:`get_shared_client` instead.
+
+    Events received are dispatched to the view owning the destination port,
+    so ports should be created with :meth:`create_port` and removed with
+    :meth:`close_port`. Output, queries and reading the input (by the
+    connection's input thread) are serialized with a lock, so the views can
+    be used from different threads. If the input thread fails,
+    :meth:`event_input` raises :class:`~alsa_midi.StateError`.
+
+    :ivar client_id: client id of the shared connection
+    """
+
+    client_id: int
+
+    def __init__(self, connection: _SharedConnection):
+        self._connection: Optional[_SharedConnection] = connection
+        # exception put here when the connection input fails
+        self._input_queue: queue.Queue[Union[Event, Exception]] = queue.Queue()
+        self._ports: dict[int, Port] = {}
+        self.client_id = connection.client.client_id
+
+    def _get_connection(self) -> _SharedConnection:
+        if self._connection is None:
+            raise RuntimeError("View already closed")
+        return self._connection
+
+    def close(self):
+        """Close the view and all ports it created.
+
+        The shared connection is closed when its last view is closed.
+        """
+        connection = self._connection
+        if connection is None:
+            return
+        for port in list(self._ports.values()):
+            self.close_port(port)
+        self._connection = None
+        with _connections_lock:
+            connection.views.discard(self)
+            if connection.views:
+                return
+            if _connections.get(connection.sequencer_name) is connection:
+                del _connections[connection.sequencer_name]
+        connection.close()
+
+    @contextmanager
+    def locked(self) -> Iterator[SequencerClient]:
+        """Get exclusive access to the shared client.
+
+        For operations not provided by the view itself. Event input must not
+        be done on the returned client.
+
+        Usage::
+
+            with view.locked() as client:
+                queue = client.create_queue()
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            yield connection.client
+
+    def create_port(self,
+                    name: str,
+                    caps: PortCaps = RW_PORT,
+                    type: PortType = DEFAULT_PORT_TYPE,
+                    *,
+                    prefer_bytes: bool = False,
+                    **kwargs: Any) -> Port:
+        """Create a sequencer port owned by this view.
+
+        :param name: port name
+        :param caps: port capability flags
+        :param type: port type flags
+        :param prefer_bytes: set to `True` to receive :class:`~alsa_midi.MidiBytesEvent`
+                             for events sent to this port, when possible.
+        :param kwargs: other arguments for :meth:`SequencerClient.create_port`
+
+        :return: sequencer port created
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            port = connection.client.create_port(name, caps, type, **kwargs)
+            self._ports[port.port_id] = port
+            connection.ports[port.port_id] = (self, prefer_bytes)
+        return port
+
+    def close_port(self, port: Port):
+        """Close a port created with :meth:`create_port`.
+
+        :param port: the port to close
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            if self._ports.pop(port.port_id, None) is None:
+                raise ValueError("Port not owned by this view")
+            del connection.ports[port.port_id]
+            port.close()
+
+    def event_input(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Wait for and receive an event sent to one of the view's ports.
+
+        :param timeout: maximum time (in seconds) to wait for an event. Default: wait forever.
+
+        :return: The event received or `None` if the timeout has been reached.
+
+        :raises StateError: when receiving events for the shared connection
+                            failed (the original exception is chained)
+        """
+        try:
+            event = self._input_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if isinstance(event, Exception):
+            # for the following calls too
+            self._input_queue.put(event)
+            raise StateError("Shared connection input failed") from event
+        return event
+
+    def event_input_pending(self) -> int:
+        """Return number of events waiting in the view's input queue."""
+        return self._input_queue.qsize()
+
+    def event_output(self,
+                     event: Event,
+                     queue: Union['Queue', int] = None,
+                     port: Union[Port, int] = None,
+                     dest: AddressType = None) -> int:
+        """Output an event.
+
+        See :meth:`SequencerClient.event_output`.
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            return connection.client.event_output(event, queue=queue, port=port, dest=dest)
+
+    def event_output_direct(self,
+                            event: Event,
+                            queue: Union['Queue', int] = None,
+                            port: Union[Port, int] = None,
+                            dest: AddressType = None) -> int:
+        """Output an event without buffering.
+
+        See :meth:`SequencerClient.event_output_direct`.
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            return connection.client.event_output_direct(event, queue=queue, port=port,
+                                                         dest=dest)
+
+    def drain_output(self) -> int:
+        """Send events in the output queue to the sequencer.
+
+        Note: the output buffer is shared, so this also sends events output
+        by the other views.
+
+        See :meth:`SequencerClient.drain_output`.
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            return connection.client.drain_output()
+
+    def get_client_info(self, client_id: Optional[int] = None) -> 'ClientInfo':
+        """Obtain information about a client.
+
+        See :meth:`SequencerClient.get_client_info`.
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            return connection.client.get_client_info(client_id)
+
+    def get_port_info(self, port: Union[int, AddressType]) -> PortInfo:
+        """Obtain information about a port.
+
+        See :meth:`SequencerClient.get_port_info`.
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            return connection.client.get_port_info(port)
+
+    def list_ports(self, **kwargs: Any) -> list[PortInfo]:
+        """List sequencer ports.
+
+        See :meth:`SequencerClient.list_ports`.
+        """
+        connection = self._get_connection()
+        with connection.lock:
+            return connection.client.list_ports(**kwargs)
+
+
+def get_shared_client(client_name: str, *,
+                      sequencer_name: str = "default") -> SharedClientView:
+    """Get a view of the process-wide shared sequencer connection.
+
+    The connection is opened on the first call (for given `sequencer_name`)
+    and closed when all the views are closed. The `client_name` of the first
+    call is used for the sequencer client.
+
+    :param client_name: client name for the connection
+    :param sequencer_name: name of the sequencer to connect to
+
+    :return: new view of the shared connection
+    """
+    with _connections_lock:
+        connection = _connections.get(sequencer_name)
+        if connection is None:
+            connection = _SharedConnection(client_name, sequencer_name)
+            _connections[sequencer_name] = connection
+        view = SharedClientView(connection)
+        connection.views.add(view)
+        if connection.error is not None:
+            view._input_queue.put(connection.error)
+    return view
+
+
+__all__ = ["SharedClientView", "get_shared_client"]
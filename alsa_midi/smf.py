@@ -0,0 +1,547 @@
+import heapq
+import os
+import time
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Optional, Union
+
+from .address import SYSTEM_TIMER, AddressType
+from .event import (ChannelPressureEvent, ControlChangeEvent, Event, KeyPressureEvent,
+                    NoteOffEvent, NoteOnEvent, PitchBendEvent, ProgramChangeEvent,
+                    SetQueueTempoEvent, SysExEvent)
+from .player import QueuePlayer
+from .scheduler import EchoScheduler
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+    from .port import Port
+    from .queue import Queue
+
+
+_BLOCK_SIZE = 4096
+
+_META_END_OF_TRACK = 0x2f
+_META_TEMPO = 0x51
+
+
+class _TrackReader:
+    """Buffered reader of a single track chunk.
+
+    Reads the chunk in small blocks, so multiple tracks of the same file can
+    be read in parallel with a single file object."""
+
+    def __init__(self, file: BinaryIO, offset: int, length: int):
+        self._file = file
+        self._file_pos = offset
+        self._end = offset + length
+        self._data = b""
+        self._pos = 0
+
+    def _fill(self, count: int):
+        available = len(self._data) - self._pos
+        read_size = min(max(_BLOCK_SIZE, count - available), self._end - self._file_pos)
+        if available + read_size < count:
+            raise ValueError("Truncated MIDI track")
+        self._file.seek(self._file_pos)
+        block = self._file.read(read_size)
+        if len(block) < read_size:
+            raise ValueError("Truncated MIDI file")
+        self._file_pos += read_size
+        self._data = self._data[self._pos:] + block
+        self._pos = 0
+
+    def at_end(self) -> bool:
+        return self._pos >= len(self._data) and self._file_pos >= self._end
+
+    def read_byte(self) -> int:
+        if self._pos >= len(self._data):
+            self._fill(1)
+        value = self._data[self._pos]
+        self._pos += 1
+        return value
+
+    def read(self, count: int) -> bytes:
+        if self._pos + count > len(self._data):
+            self._fill(count)
+        start = self._pos
+        self._pos += count
+        return self._data[start:self._pos]
+
+    def read_vlq(self) -> int:
+        value = 0
+        for _ in range(4):
+            byte = self.read_byte()
+            value = (value << 7) | (byte & 0x7f)
+            if not byte & 0x80:
+                return value
+        raise ValueError("Invalid variable-length quantity")
+
+
+def _vlq(value: int) -> bytes:
+    result = bytearray([value & 0x7f])
+    value >>= 7
+    while value:
+        result.insert(0, 0x80 | (value & 0x7f))
+        value >>= 7
+    return bytes(result)
+
+
+def _channel_event(status: int, data1: int, data2: int, tick: int) -> Event:
+    kind = status & 0xf0
+    channel = status & 0x0f
+    if kind == 0x90:
+        return NoteOnEvent(data1, channel, data2, tick=tick)
+    elif kind == 0x80:
+        return NoteOffEvent(data1, channel, data2, tick=tick)
+    elif kind == 0xa0:
+        return KeyPressureEvent(data1, channel, data2, tick=tick)
+    elif kind == 0xb0:
+        return ControlChangeEvent(channel, data1, data2, tick=tick)
+    elif kind == 0xc0:
+        return ProgramChangeEvent(channel, data1, tick=tick)
+    elif kind == 0xd0:
+        return ChannelPressureEvent(channel, data1, tick=tick)
+    else:
+        return PitchBendEvent(channel, ((data2 << 7) | data1) - 8192, tick=tick)
+
+
+class MidiFile:
+    """Standard MIDI File reader.
+
+    Only the file header and the track chunk locations are read when the file
+    is opened. The events are decoded incrementally, while being iterated
+    over, so playing a file does not require loading all of it into memory.
+
+    Events are returned as :class:`Event` objects with :attr:`~Event.tick`
+    timestamps. Channel messages and System Exclusive messages are converted to
+    the respective event types, Set Tempo meta events are converted to
+    :class:`SetQueueTempoEvent` events addressed to
+    :data:`~alsa_midi.SYSTEM_TIMER`. Other meta events are skipped.
+
+    Files using SMPTE time division are not supported.
+
+    :param file: file name or binary file object (which must be seekable)
+
+    :ivar format: MIDI file format (0, 1 or 2)
+    :ivar ppq: MIDI pulses (ticks) per quarter note
+    """
+
+    format: int
+    ppq: int
+    _file: Optional[BinaryIO] = None
+    _own_file: bool = False
+
+    def __init__(self, file: Union[str, os.PathLike, BinaryIO]):
+        if isinstance(file, (str, os.PathLike)):
+            self._file = open(file, "rb")
+            self._own_file = True
+        else:
+            self._file = file
+            self._own_file = False
+        self._tracks: list[tuple[int, int]] = []
+        try:
+            self._read_chunks()
+        except BaseException:
+            self.close()
+            raise
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the file (if opened by this object)."""
+        if self._own_file and self._file is not None:
+            self._file.close()
+        self._file = None
+
+    def _get_file(self) -> BinaryIO:
+        if self._file is None:
+            raise ValueError("MIDI file closed")
+        return self._file
+
+    def _read_chunks(self):
+        file = self._get_file()
+        header = file.read(14)
+        if len(header) < 14 or header[:4] != b"MThd":
+            raise ValueError("Not a Standard MIDI File")
+        length = int.from_bytes(header[4:8], "big")
+        if length < 6:
+            raise ValueError("Invalid MIDI file header")
+        self.format = int.from_bytes(header[8:10], "big")
+        division = int.from_bytes(header[12:14], "big")
+        if division & 0x8000:
+            raise ValueError("SMPTE time division not supported")
+        if division == 0:
+            raise ValueError("Invalid MIDI file time division")
+        self.ppq = division
+        offset = 8 + length
+        while True:
+            file.seek(offset)
+            chunk_header = file.read(8)
+            if len(chunk_header) < 8:
+                break
+            length = int.from_bytes(chunk_header[4:8], "big")
+            if chunk_header[:4] == b"MTrk":
+                self._tracks.append((offset + 8, length))
+            offset += 8 + length
+
+    def __len__(self):
+        """Number of tracks in the file."""
+        return len(self._tracks)
+
+    def track_events(self, track: int,
+                     queue: Optional[Union['Queue', int]] = None) -> Iterator[Event]:
+        """Iterate over events of a single track.
+
+        :param track: track number
+        :param queue: queue for the :class:`SetQueueTempoEvent` events
+
+        :return: iterator over the track events, in order
+        """
+        offset, length = self._tracks[track]
+        reader = _TrackReader(self._get_file(), offset, length)
+        tick = 0
+        running_status = 0
+        while not reader.at_end():
+            tick += reader.read_vlq()
+            status = reader.read_byte()
+            if status < 0x80:
+                if not running_status:
+                    raise ValueError("Data byte without status in MIDI track")
+                data1 = status
+                status = running_status
+            elif status < 0xf0:
+                running_status = status
+                data1 = reader.read_byte()
+            elif status == 0xff:
+                running_status = 0
+                meta_type = reader.read_byte()
+                data = reader.read(reader.read_vlq())
+                if meta_type == _META_END_OF_TRACK:
+                    return
+                if meta_type == _META_TEMPO and len(data) == 3:
+                    yield SetQueueTempoEvent(int.from_bytes(data, "big"),
+                                             control_queue=queue, dest=SYSTEM_TIMER,
+                                             tick=tick)
+                continue
+            elif status in (0xf0, 0xf7):
+                running_status = 0
+                data = reader.read(reader.read_vlq())
+                if status == 0xf0:
+                    data = b"\xf0" + data
+                yield SysExEvent(data, tick=tick)
+                continue
+            else:
+                raise ValueError(f"Unexpected status byte 0x{status:02x} in MIDI track")
+            if 0xc0 <= status < 0xe0:
+                data2 = 0
+            else:
+                data2 = reader.read_byte()
+            yield _channel_event(status, data1, data2, tick)
+
+    def events(self, queue: Optional[Union['Queue', int]] = None) -> Iterator[Event]:
+        """Iterate over events of all the tracks, merged in time order.
+
+        Only one pending event of each track is kept in memory. Events with
+        equal timestamps are returned in the track order.
+
+        :param queue: queue for the :class:`SetQueueTempoEvent` events
+
+        :return: iterator over the events
+        """
+        tracks = [self.track_events(i, queue) for i in range(len(self._tracks))]
+        return heapq.merge(*tracks, key=lambda event: event.tick)
+
+
+class MidiFilePlayer(QueuePlayer):
+    """Plays a Standard MIDI File on a queue.
+
+    The file is read incrementally (see :class:`MidiFile`) and played as a
+    :class:`QueuePlayer` in MIDI ticks, with the file ppq and tempo changes
+    applied to the queue. The queue tempo is set when the player is
+    created, so the queue should not be running.
+
+    :param client: client to use
+    :param queue: queue to play the file on
+    :param port: port to send the events from. Unless a `scheduler` is
+                 provided, the echo events are sent to this port too, so it
+                 has to be writable.
+    :param file: file name, binary file object or a :class:`MidiFile` object
+    :param lookahead_ticks: length of the window scheduled (in MIDI ticks).
+                            Default: one quarter note.
+    :param dest: destination for the events. Default: all subscribers of `port`.
+    :param tag: tag for the events scheduled
+    :param scheduler: scheduler to use for the refills
+
+    :ivar midi_file: the file played
+    """
+
+    midi_file: MidiFile
+
+    def __init__(self,
+                 client: 'SequencerClient',
+                 queue: 'Queue',
+                 port: 'Port',
+                 file: Union[str, os.PathLike, BinaryIO, MidiFile],
+                 *,
+                 lookahead_ticks: Optional[int] = None,
+                 dest: Optional[AddressType] = None,
+                 tag: int = 0,
+                 scheduler: Optional[EchoScheduler] = None):
+        if isinstance(file, MidiFile):
+            self.midi_file = file
+        else:
+            self.midi_file = MidiFile(file)
+        ppq = self.midi_file.ppq
+        queue.set_tempo(500000, ppq)
+        super().__init__(client, queue, port, self.midi_file.events(queue),
+                         lookahead_ticks=lookahead_ticks if lookahead_ticks is not None else ppq,
+                         dest=dest, tag=tag, scheduler=scheduler)
+
+    def close(self):
+        """Close the file."""
+        self.midi_file.close()
+
+
+class MidiFileWriter:
+    """Standard MIDI File writer.
+
+    Writes a format 0 (single track) file, event by event. The data is
+    buffered and written in blocks, and the track length in the chunk header
+    is filled in by :meth:`close`, so the memory use does not depend on the
+    length of the recording. The file must be seekable.
+
+    Channel messages (:class:`NoteOnEvent`, :class:`ControlChangeEvent`,
+    etc.), :class:`SysExEvent` and :class:`SetQueueTempoEvent` events can be
+    written, other events are ignored.
+
+    :param file: file name or binary file object
+    :param ppq: MIDI pulses (ticks) per quarter note
+    :param buffer_size: size of the data blocks written
+
+    :ivar ppq: MIDI pulses (ticks) per quarter note
+    :ivar tick: time of the last event written
+    """
+
+    ppq: int
+    tick: int
+    _file: Optional[BinaryIO] = None
+    _own_file: bool = False
+
+    def __init__(self,
+                 file: Union[str, os.PathLike, BinaryIO],
+                 ppq: int = 96,
+                 buffer_size: int = 65536):
+        if not 0 < ppq < 0x8000:
+            raise ValueError("ppq must be in 1 – 32767 range")
+        if isinstance(file, (str, os.PathLike)):
+            self._file = open(file, "wb")
+            self._own_file = True
+        else:
+            self._file = file
+            self._own_file = False
+        self.ppq = ppq
+        self.tick = 0
+        self._buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._running_status = 0
+        self._length = 0
+        self._file.write(b"MThd\x00\x00\x00\x06\x00\x00\x00\x01" + ppq.to_bytes(2, "big"))
+        self._file.write(b"MTrk")
+        self._length_pos = self._file.tell()
+        self._file.write(b"\x00\x00\x00\x00")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _flush(self):
+        assert self._file is not None
+        self._file.write(self._buffer)
+        self._length += len(self._buffer)
+        self._buffer.clear()
+
+    def _encode(self, event: Event) -> Optional[bytes]:
+        if isinstance(event, NoteOnEvent):
+            status = 0x90 | event.channel
+            data = bytes([event.note, event.velocity])
+        elif isinstance(event, NoteOffEvent):
+            status = 0x80 | event.channel
+            data = bytes([event.note, event.velocity])
+        elif isinstance(event, KeyPressureEvent):
+            status = 0xa0 | event.channel
+            data = bytes([event.note, event.velocity])
+        elif isinstance(event, ControlChangeEvent):
+            status = 0xb0 | event.channel
+            data = bytes([event.param, event.value])
+        elif isinstance(event, ProgramChangeEvent):
+            status = 0xc0 | event.channel
+            data = bytes([event.value])
+        elif isinstance(event, ChannelPressureEvent):
+            status = 0xd0 | event.channel
+            data = bytes([event.value])
+        elif isinstance(event, PitchBendEvent):
+            value = event.value + 8192
+            status = 0xe0 | event.channel
+            data = bytes([value & 0x7f, (value >> 7) & 0x7f])
+        else:
+            self._running_status = 0
+            if isinstance(event, SysExEvent):
+                if event.data[:1] == b"\xf0":
+                    return b"\xf0" + _vlq(len(event.data) - 1) + event.data[1:]
+                return b"\xf7" + _vlq(len(event.data)) + event.data
+            elif isinstance(event, SetQueueTempoEvent):
+                return b"\xff\x51\x03" + event.midi_tempo.to_bytes(3, "big")
+            return None
+        if status == self._running_status:
+            return data
+        self._running_status = status
+        return bytes([status]) + data
+
+    def write_event(self, event: Event, tick: Optional[int] = None) -> bool:
+        """Write an event to the file.
+
+        Events must be written in time order. Events earlier than the last
+        event written are written with the time of the last event.
+
+        :param event: the event to write
+        :param tick: event time. Default: :attr:`~Event.tick` of the event.
+
+        :return: `False` if the event was not written, because of its type
+        """
+        if self._file is None:
+            raise ValueError("MIDI file closed")
+        if tick is None:
+            if event.tick is None:
+                raise ValueError(f"{event!r} has no tick timestamp")
+            tick = event.tick
+        data = self._encode(event)
+        if data is None:
+            return False
+        delta = max(tick - self.tick, 0)
+        self.tick += delta
+        self._buffer += _vlq(delta)
+        self._buffer += data
+        if len(self._buffer) >= self._buffer_size:
+            self._flush()
+        return True
+
+    def close(self):
+        """Finish the track and close the file (if opened by this object)."""
+        file = self._file
+        if file is None:
+            return
+        self._buffer += b"\x00\xff\x2f\x00"
+        self._flush()
+        end = file.tell()
+        file.seek(self._length_pos)
+        file.write(self._length.to_bytes(4, "big"))
+        file.seek(end)
+        if self._own_file:
+            file.close()
+        else:
+            file.flush()
+        self._file = None
+
+
+class MidiFileRecorder:
+    """Records events received by a client to a Standard MIDI File.
+
+    The events need tick timestamps, so the receiving port has to be
+    created with timestamping (in MIDI ticks) on the `queue`. Event times are
+    stored relative to `start_tick`. The queue tempo is written at the start
+    of the file, so it plays at the recorded speed.
+
+    Events are received with :meth:`SequencerClient.event_input` – after
+    each wake-up all the events already available are processed before
+    waiting again. Events can also be passed to :meth:`handle_event` by the
+    application's own input loop.
+
+    :param client: client to receive the events with
+    :param queue: queue used for the input port timestamping
+    :param file: file name or binary file object
+    :param start_tick: queue position of the file start. Default: the current
+                       queue position.
+    :param buffer_size: size of the data blocks written
+
+    :ivar client: client used
+    :ivar queue: queue used
+    :ivar writer: the file writer
+    :ivar start_tick: queue position of the file start
+    """
+
+    client: 'SequencerClient'
+    queue: 'Queue'
+    writer: MidiFileWriter
+    start_tick: int
+
+    def __init__(self,
+                 client: 'SequencerClient',
+                 queue: 'Queue',
+                 file: Union[str, os.PathLike, BinaryIO],
+                 *,
+                 start_tick: Optional[int] = None,
+                 buffer_size: int = 65536):
+        self.client = client
+        self.queue = queue
+        tempo = queue.get_tempo()
+        if start_tick is None:
+            start_tick = queue.get_status().tick_time
+        self.start_tick = start_tick
+        self.writer = MidiFileWriter(file, tempo.ppq, buffer_size=buffer_size)
+        self.writer.write_event(SetQueueTempoEvent(tempo.tempo), tick=0)
+        self._stopped = False
+
+    def handle_event(self, event: Event) -> bool:
+        """Write a received event to the file.
+
+        :param event: the event received
+
+        :return: `True` if the event was written
+        """
+        if event.tick is None or event.tick < self.start_tick:
+            return False
+        return self.writer.write_event(event, event.tick - self.start_tick)
+
+    def record(self, duration: Optional[float] = None, timeout: float = 0.1):
+        """Receive and record events until :meth:`stop` is called.
+
+        :param duration: maximum recording time (in seconds)
+        :param timeout: how often (in seconds) the stop request is checked,
+                        when nothing is received
+        """
+        client = self.client
+        deadline = time.monotonic() + duration if duration is not None else None
+        self._stopped = False
+        while not self._stopped:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait = min(timeout, remaining)
+            else:
+                wait = timeout
+            event = client.event_input(timeout=wait)
+            if event is None:
+                continue
+            self.handle_event(event)
+            # process whatever is already available before waiting again
+            while client.event_input_pending(fetch_sequencer=True):
+                self.handle_event(client.event_input())
+
+    def stop(self):
+        """Make :meth:`record` return (may be called from another thread)."""
+        self._stopped = True
+
+    def close(self):
+        """Finish and close the file."""
+        self.writer.close()
+
+
+__all__ = ["MidiFile", "MidiFilePlayer", "MidiFileWriter", "MidiFileRecorder"]
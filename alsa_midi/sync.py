@@ -0,0 +1,365 @@
+import time
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from .address import SYSTEM_TIMER, Address, AddressType
+from .client import RemoveCondition, RemoveEvents
+from .event import ClockEvent, ContinueEvent, Event, QueueSkewEvent, StartEvent, StopEvent
+from .scheduler import EchoScheduler
+
+if TYPE_CHECKING:
+    from .client import SequencerClient
+    from .port import Port
+    from .queue import Queue, QueueTempo
+
+
+CLOCKS_PER_QUARTER = 24
+SKEW_BASE = 0x10000
+
+# default tag of the ClockGenerator events and refill echoes (the MIDI clock
+# status byte), so removing the events of players using the default tag 0
+# does not stop the clock, and rescheduling the clock does not affect them
+CLOCK_TAG = 0xf8
+
+
+class ClockFollower:
+    """Keeps a queue in sync with an external MIDI clock.
+
+    Intervals between the incoming :class:`ClockEvent` events are smoothed
+    with a low-pass filter and the queue speed is adjusted with
+    :class:`QueueSkewEvent` events, sent only every `update_interval`
+    clocks and only when the change is significant. The queue tempo itself
+    is never changed.
+
+    When `follow_transport` is enabled, the queue is also started, stopped
+    and continued on the master's Start, Stop and Continue messages and, after
+    a Start, the phase of the queue is locked to the master (queue position
+    differences are corrected with the skew too).
+
+    The events received from the master have to be passed to
+    :meth:`handle_event` as soon as they are received. The intervals are
+    measured with `clock` at the :meth:`handle_event` calls – event
+    timestamps are not used, as real-time timestamps from the skewed queue
+    itself would include the speed correction being applied.
+
+    :param client: client to use
+    :param queue: the queue to control
+    :param port: port to send the skew events from
+    :param tempo: nominal queue tempo. Default: read from the queue.
+    :param smoothing: low-pass filter coefficient (0 – 1, lower is smoother)
+    :param phase_gain: correction of the queue speed per quarter note of
+                       the phase error
+    :param max_skew: maximum relative change of the queue speed
+    :param update_interval: number of clocks between skew updates
+    :param min_change: minimum relative skew change to send
+    :param follow_transport: start, stop and continue the queue with the master
+    :param clock: monotonic clock function returning seconds
+
+    :ivar client: client used
+    :ivar queue: the queue controlled
+    :ivar tempo: nominal queue tempo
+    :ivar period: current estimate of the master clock period (seconds), `None` if unknown
+    :ivar skew: current queue skew value (base is 0x10000)
+    """
+
+    client: 'SequencerClient'
+    queue: 'Queue'
+    tempo: 'QueueTempo'
+    period: Optional[float]
+    skew: int
+
+    def __init__(self,
+                 client: 'SequencerClient',
+                 queue: 'Queue',
+                 *,
+                 port: Optional[Union['Port', int]] = None,
+                 tempo: Optional['QueueTempo'] = None,
+                 smoothing: float = 0.1,
+                 phase_gain: float = 0.5,
+                 max_skew: float = 0.1,
+                 update_interval: int = 6,
+                 min_change: float = 0.0005,
+                 follow_transport: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        if not 0 < smoothing <= 1:
+            raise ValueError("smoothing must be in (0, 1] range")
+        if update_interval < 1:
+            raise ValueError("update_interval must be positive")
+        self.client = client
+        self.queue = queue
+        self.tempo = tempo if tempo is not None else queue.get_tempo()
+        self.period = None
+        self.skew = SKEW_BASE
+        self._port = port
+        self._smoothing = smoothing
+        self._phase_gain = phase_gain
+        self._max_skew = max_skew
+        self._update_interval = update_interval
+        self._min_change = min_change
+        self._follow_transport = follow_transport
+        self._clock = clock
+        self._last_time: Optional[float] = None
+        self._clocks = 0
+        # master position (in clocks) since Start, when locked
+        self._position = 0
+        self._locked = False
+        self._running = False
+
+    @property
+    def bpm(self) -> Optional[float]:
+        """Estimated master tempo in beats per minute, `None` if unknown."""
+        if self.period is None:
+            return None
+        return 60.0 / (self.period * CLOCKS_PER_QUARTER)
+
+    def reset(self):
+        """Forget the clock measurements and restore the nominal queue speed."""
+        self.period = None
+        self._last_time = None
+        self._clocks = 0
+        self._position = 0
+        self._locked = False
+        self._send_skew(SKEW_BASE)
+
+    def _send_skew(self, value: int):
+        if value == self.skew:
+            return
+        self.skew = value
+        event = QueueSkewEvent(value, SKEW_BASE, control_queue=self.queue, dest=SYSTEM_TIMER)
+        self.client.event_output(event, port=self._port)
+        self.client.drain_output()
+
+    def _update_skew(self):
+        assert self.period is not None
+        nominal = self.tempo.tempo / (1000000.0 * CLOCKS_PER_QUARTER)
+        ratio = nominal / self.period
+        if self._locked and self._running:
+            ppq = self.tempo.ppq
+            master_ticks = self._position * ppq / CLOCKS_PER_QUARTER
+            error = (master_ticks - self.queue.get_status().tick_time) / ppq
+            ratio *= 1.0 + self._phase_gain * error
+        ratio = min(max(ratio, 1.0 - self._max_skew), 1.0 + self._max_skew)
+        value = round(SKEW_BASE * ratio)
+        if abs(value - self.skew) >= self._min_change * SKEW_BASE:
+            self._send_skew(value)
+
+    def _handle_clock(self):
+        now = self._clock()
+        last_time = self._last_time
+        self._last_time = now
+        self._clocks += 1
+        if self._running:
+            self._position += 1
+        if last_time is None:
+            return
+        interval = now - last_time
+        if interval <= 0:
+            return
+        if self.period is None:
+            self.period = interval
+        elif interval > 4 * self.period:
+            # master paused or clock dropouts – restart the measurement
+            self.period = None
+            return
+        else:
+            self.period += self._smoothing * (interval - self.period)
+        if self._clocks % self._update_interval == 0:
+            self._update_skew()
+
+    def handle_event(self, event: Event) -> bool:
+        """Process an event received from the clock master.
+
+        :param event: the event received
+
+        :return: `True` if the event was a clock or (when following the
+                 transport) a transport event
+        """
+        if isinstance(event, ClockEvent):
+            self._handle_clock()
+            return True
+        if not self._follow_transport:
+            return False
+        if isinstance(event, StartEvent):
+            self._position = 0
+            self._locked = True
+            self._running = True
+            self.queue.start()
+            self.client.drain_output()
+        elif isinstance(event, StopEvent):
+            self._running = False
+            self.queue.stop()
+            self.client.drain_output()
+        elif isinstance(event, ContinueEvent):
+            self._running = True
+            self.queue.continue_()
+            self.client.drain_output()
+        else:
+            return False
+        return True
+
+
+class ClockGenerator:
+    """Sends MIDI clock (24 pulses per quarter note) driven by a queue.
+
+    :class:`ClockEvent` events are scheduled on the queue in MIDI ticks,
+    only a bounded window (`lookahead_ticks`) ahead, refilled with an
+    :class:`EchoScheduler` – the same way as :class:`QueuePlayer` works. The
+    timing precision is that of the kernel queue timer and the CPU use does not
+    depend on the tempo.
+
+    As the clock events are scheduled in ticks, queue tempo changes apply to
+    the events already scheduled too. When the queue position is changed,
+    :meth:`reschedule` should be called, which drops the unplayed clock events
+    (matching by `tag`) and schedules them again.
+
+    The echo events have to be passed to :meth:`handle_event`.
+
+    :param client: client to use
+    :param queue: the queue to use
+    :param port: port to send the clock from. Unless a `scheduler` is
+                 provided, the echo events are sent to this port too, so it
+                 has to be writable.
+    :param dest: clock destination. Default: all subscribers of `port`.
+    :param lookahead_ticks: length of the window scheduled (in MIDI ticks).
+                            Default: one quarter note.
+    :param tag: tag of the clock events. Default: ``CLOCK_TAG`` (0xF8), different
+                from the default tag of the players.
+    :param scheduler: scheduler to use for the refills. Must use the same
+                      client and queue. Default: a new one, for `port`, using
+                      the same `tag`.
+
+    :ivar client: client used
+    :ivar queue: the queue used
+    :ivar port: port used
+    :ivar dest: clock destination
+    :ivar tag: tag of the clock events
+    :ivar ppq: MIDI ticks per quarter note of the queue
+    :ivar scheduler: scheduler used for the refills
+    """
+
+    client: 'SequencerClient'
+    queue: 'Queue'
+    port: 'Port'
+    dest: Optional[Address]
+    tag: int
+    ppq: int
+    scheduler: EchoScheduler
+
+    def __init__(self,
+                 client: 'SequencerClient',
+                 queue: 'Queue',
+                 port: 'Port',
+                 *,
+                 dest: Optional[AddressType] = None,
+                 lookahead_ticks: Optional[int] = None,
+                 tag: int = CLOCK_TAG,
+                 scheduler: Optional[EchoScheduler] = None):
+        self.client = client
+        self.queue = queue
+        self.port = port
+        self.dest = Address(dest) if dest is not None else None
+        self.tag = tag
+        self.ppq = queue.get_tempo().ppq
+        if lookahead_ticks is None:
+            lookahead_ticks = self.ppq
+        elif lookahead_ticks < 1:
+            raise ValueError("lookahead_ticks must be positive")
+        if scheduler is None:
+            scheduler = EchoScheduler(client, queue, port, tag=tag)
+        self.scheduler = scheduler
+        self._lookahead = lookahead_ticks
+        self._next_clock = 0
+        self._refill_call: Optional[int] = None
+        self._remove_condition = RemoveEvents(RemoveCondition.OUTPUT | RemoveCondition.TAG_MATCH,
+                                              queue_id=queue.queue_id, tag=tag)
+        self._running = False
+
+    def _clock_tick(self, index: int) -> int:
+        return index * self.ppq // CLOCKS_PER_QUARTER
+
+    def _output(self, event: Event):
+        self.client.event_output(event, queue=self.queue, port=self.port, dest=self.dest)
+
+    def _refill_due(self):
+        self._refill_call = None
+        if self._running:
+            self.refill()
+
+    def refill(self, now: Optional[int] = None) -> int:
+        """Schedule clock events up to the end of the lookahead window.
+
+        Normally called by the scheduler.
+
+        :param now: current queue position (ticks). Default: read from the queue status.
+
+        :return: number of events scheduled
+        """
+        if now is None:
+            now = self.queue.get_status().tick_time
+        horizon = now + self._lookahead
+        count = 0
+        while True:
+            tick = self._clock_tick(self._next_clock)
+            if tick > horizon:
+                break
+            self._output(ClockEvent(tick=tick, tag=self.tag))
+            self._next_clock += 1
+            count += 1
+        self._refill_call = self.scheduler.call_at_tick(horizon - self._lookahead // 2,
+                                                        self._refill_due)
+        self.client.drain_output()
+        return count
+
+    def _cancel(self):
+        self._remove_condition.tag = self.tag
+        self.client.remove_events(self._remove_condition)
+        if self._refill_call is not None:
+            self.scheduler.cancel(self._refill_call)
+            self._refill_call = None
+
+    def reschedule(self):
+        """Drop the clock events not played yet and schedule them again, for
+        the current queue position."""
+        if not self._running:
+            return
+        self._cancel()
+        now = self.queue.get_status().tick_time
+        # first clock not before the current position
+        self._next_clock = -(-now * CLOCKS_PER_QUARTER // self.ppq)
+        self.refill(now)
+
+    def start(self):
+        """Start the queue (from position 0), send MIDI Start and the clock."""
+        self._running = True
+        self._next_clock = 0
+        self._output(StartEvent(tick=0, tag=self.tag))
+        self.refill(now=0)
+        self.queue.start()
+        self.client.drain_output()
+
+    def stop(self):
+        """Stop the queue and the clock, send MIDI Stop."""
+        self._running = False
+        self.queue.stop()
+        self._cancel()
+        self.client.event_output(StopEvent(), port=self.port, dest=self.dest)
+        self.client.drain_output()
+
+    def continue_(self):
+        """Continue the queue, send MIDI Continue and the clock."""
+        self._running = True
+        self.client.event_output(ContinueEvent(), port=self.port, dest=self.dest)
+        self.queue.continue_()
+        self.client.drain_output()
+        self.reschedule()
+
+    def handle_event(self, event: Event) -> bool:
+        """Process an event received by the scheduler port.
+
+        :param event: the event received
+
+        :return: `True` if this was the scheduler's echo event, `False` otherwise
+        """
+        return self.scheduler.handle_event(event)
+
+
+__all__ = ["ClockFollower", "ClockGenerator"]
@@ -0,0 +1,203 @@
+from bisect import bisect_right
+from typing import Iterable, Optional, Union
+
+from .event import Event, RealTime, SetQueueTempoEvent
+from .queue import QueueTempo
+
+
+class TempoMap:
+    """Tempo changes of a song, for conversion between MIDI ticks and real time.
+
+    Tempo segments are kept sorted by the starting tick, together with
+    the precomputed real time of each segment start, so a single conversion
+    is a binary search.
+
+    :param tempo: initial MIDI tempo (microseconds per quarter note) or a
+                  :class:`QueueTempo` object to take tempo and ppq from
+    :param ppq: MIDI pulses (ticks) per quarter note
+
+    :ivar ppq: MIDI pulses (ticks) per quarter note
+    """
+
+    ppq: int
+
+    def __init__(self, tempo: Union[int, QueueTempo] = 500000, ppq: Optional[int] = None):
+        if isinstance(tempo, QueueTempo):
+            if ppq is None:
+                ppq = tempo.ppq
+            tempo = tempo.tempo
+        if ppq is None:
+            ppq = 96
+        if ppq < 1:
+            raise ValueError("ppq must be positive")
+        if tempo < 1:
+            raise ValueError("tempo must be positive")
+        self.ppq = ppq
+        self._ticks: list[int] = [0]
+        self._tempos: list[int] = [tempo]
+        # segment start times in nanoseconds
+        self._times: list[int] = [0]
+
+    def __len__(self):
+        return len(self._ticks)
+
+    def __iter__(self):
+        """Iterate over the tempo segments as (tick, tempo) tuples."""
+        return zip(self._ticks, self._tempos)
+
+    def _update_times(self, start: int):
+        ticks, tempos, times = self._ticks, self._tempos, self._times
+        ppq = self.ppq
+        del times[start:]
+        for i in range(start, len(ticks)):
+            prev = i - 1
+            # rounded up, so converting back to ticks gives the same value
+            times.append(times[prev] - (-(ticks[i] - ticks[prev]) * tempos[prev] * 1000 // ppq))
+
+    def set_tempo(self, tick: int, tempo: int):
+        """Set tempo from given tick on.
+
+        Replaces any tempo change at the same tick.
+
+        :param tick: position of the tempo change
+        :param tempo: MIDI tempo (microseconds per quarter note)
+        """
+        if tick < 0:
+            raise ValueError("tick must not be negative")
+        if tempo < 1:
+            raise ValueError("tempo must be positive")
+        index = bisect_right(self._ticks, tick) - 1
+        if self._ticks[index] == tick:
+            self._tempos[index] = tempo
+        else:
+            index += 1
+            self._ticks.insert(index, tick)
+            self._tempos.insert(index, tempo)
+        self._update_times(max(index, 1))
+
+    def clear(self, tempo: Optional[int] = None):
+        """Remove all tempo changes.
+
+        :param tempo: new initial tempo. Default: keep the current initial tempo.
+        """
+        if tempo is None:
+            tempo = self._tempos[0]
+        self._ticks = [0]
+        self._tempos = [tempo]
+        self._times = [0]
+
+    def add_event(self, event: Event) -> bool:
+        """Track a tempo change event.
+
+        :param event: event scheduled. The event time may be in ticks or real time.
+
+        :return: `True` if the event was a tempo change, `False` if it was ignored
+        """
+        if not isinstance(event, SetQueueTempoEvent):
+            return False
+        if event.tick is not None:
+            tick = event.tick
+        elif event.time is not None:
+            tick = self.time_to_tick(event.time)
+        else:
+            tick = 0
+        self.set_tempo(tick, event.midi_tempo)
+        return True
+
+    def tempo_at(self, tick: int) -> int:
+        """Get tempo at given position.
+
+        :param tick: the position
+
+        :return: MIDI tempo (microseconds per quarter note)
+        """
+        return self._tempos[max(bisect_right(self._ticks, tick) - 1, 0)]
+
+    def _tick_to_ns(self, index: int, tick: int) -> int:
+        return self._times[index] - (-(tick - self._ticks[index])
+                                     * self._tempos[index] * 1000 // self.ppq)
+
+    def _ns_to_tick(self, index: int, ns: int) -> int:
+        return self._ticks[index] + ((ns - self._times[index]) * self.ppq
+                                     // (self._tempos[index] * 1000))
+
+    @staticmethod
+    def _to_ns(time: Union[RealTime, float, int]) -> int:
+        if not isinstance(time, RealTime):
+            time = RealTime(time)
+        return time.seconds * 1000000000 + time.nanoseconds
+
+    @staticmethod
+    def _from_ns(ns: int) -> RealTime:
+        return RealTime(ns // 1000000000, ns % 1000000000)
+
+    def tick_to_time(self, tick: int) -> RealTime:
+        """Convert MIDI ticks to real time.
+
+        :param tick: position in MIDI ticks
+
+        :return: the same position as real time
+        """
+        index = max(bisect_right(self._ticks, tick) - 1, 0)
+        return self._from_ns(self._tick_to_ns(index, tick))
+
+    def time_to_tick(self, time: Union[RealTime, float, int]) -> int:
+        """Convert real time to MIDI ticks.
+
+        :param time: position as real time (:class:`RealTime` or seconds)
+
+        :return: the same position in MIDI ticks (rounded down)
+        """
+        ns = self._to_ns(time)
+        index = max(bisect_right(self._times, ns) - 1, 0)
+        return self._ns_to_tick(index, ns)
+
+    def ticks_to_times(self, ticks: Iterable[int]) -> list[RealTime]:
+        """Convert multiple positions from MIDI ticks to real time.
+
+        Faster than multiple :meth:`tick_to_time` calls when the positions are
+        (mostly) sorted.
+
+        :param ticks: positions in MIDI ticks
+
+        :return: list of the same positions as real time
+        """
+        starts = self._ticks
+        last = len(starts) - 1
+        index = 0
+        result = []
+        for tick in ticks:
+            if tick < starts[index]:
+                index = max(bisect_right(starts, tick) - 1, 0)
+            else:
+                while index < last and starts[index + 1] <= tick:
+                    index += 1
+            result.append(self._from_ns(self._tick_to_ns(index, tick)))
+        return result
+
+    def times_to_ticks(self, times: Iterable[Union[RealTime, float, int]]) -> list[int]:
+        """Convert multiple positions from real time to MIDI ticks.
+
+        Faster than multiple :meth:`time_to_tick` calls when the positions are
+        (mostly) sorted.
+
+        :param times: positions as real time (:class:`RealTime` or seconds)
+
+        :return: list of the same positions in MIDI ticks (rounded down)
+        """
+        starts = self._times
+        last = len(starts) - 1
+        index = 0
+        result = []
+        for time in times:
+            ns = self._to_ns(time)
+            if ns < starts[index]:
+                index = max(bisect_right(starts, ns) - 1, 0)
+            else:
+                while index < last and starts[index + 1] <= ns:
+                    index += 1
+            result.append(self._ns_to_tick(index, ns))
+        return result
+
+
+__all__ = ["TempoMap"]
@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+
+from .address import Address
+from .event import (ClientChangeEvent, ClientExitEvent, ClientStartEvent, Event, PortChangeEvent,
+                    PortExitEvent, PortStartEvent, PortSubscribedEvent, PortUnsubscribedEvent)
+
+
+@dataclass
+class TopologyDelta:
+    """Coalesced changes of the sequencer topology.
+
+    Built from the announcement events (sent by the
+    :data:`~alsa_midi.SYSTEM_ANNOUNCE` port), with bursts of events collapsed
+    into net changes – e.g. a port created and removed again within the same
+    delta does not appear at all.
+
+    Connections are represented as (sender, dest) address tuples.
+
+    :ivar clients_added: ids of clients started
+    :ivar clients_removed: ids of clients exited
+    :ivar clients_changed: ids of clients changed
+    :ivar ports_added: addresses of ports created
+    :ivar ports_removed: addresses of ports deleted
+    :ivar ports_changed: addresses of ports changed
+    :ivar connections_added: connections made
+    :ivar connections_removed: connections removed
+    """
+
+    clients_added: set[int] = field(default_factory=set)
+    clients_removed: set[int] = field(default_factory=set)
+    clients_changed: set[int] = field(default_factory=set)
+    ports_added: set[Address] = field(default_factory=set)
+    ports_removed: set[Address] = field(default_factory=set)
+    ports_changed: set[Address] = field(default_factory=set)
+    connections_added: set[tuple[Address, Address]] = field(default_factory=set)
+    connections_removed: set[tuple[Address, Address]] = field(default_factory=set)
+
+    def __bool__(self):
+        return any((self.clients_added, self.clients_removed, self.clients_changed,
+                    self.ports_added, self.ports_removed, self.ports_changed,
+                    self.connections_added, self.connections_removed))
+
+    @staticmethod
+    def _start(key, added: set, removed: set, changed: set):
+        if key in removed:
+            # removed and created again – for the observer it has just changed
+            removed.discard(key)
+            changed.add(key)
+        else:
+            added.add(key)
+
+    @staticmethod
+    def _exit(key, added: set, removed: set, changed: set):
+        changed.discard(key)
+        if key in added:
+            # created and removed – nothing happened, as far as observer is concerned
+            added.discard(key)
+        else:
+            removed.add(key)
+
+    @staticmethod
+    def _change(key, added: set, changed: set):
+        if key not in added:
+            changed.add(key)
+
+    def add_event(self, event: Event) -> bool:
+        """Merge an announcement event into the delta.
+
+        :param event: the event received
+
+        :return: `True` if the event was a topology change announcement, `False`
+                 if it was ignored.
+        """
+        if isinstance(event, ClientStartEvent):
+            self._start(event.addr.client_id,
+                        self.clients_added, self.clients_removed, self.clients_changed)
+        elif isinstance(event, ClientExitEvent):
+            self._exit(event.addr.client_id,
+                       self.clients_added, self.clients_removed, self.clients_changed)
+        elif isinstance(event, ClientChangeEvent):
+            self._change(event.addr.client_id, self.clients_added, self.clients_changed)
+        elif isinstance(event, PortStartEvent):
+            self._start(event.addr, self.ports_added, self.ports_removed, self.ports_changed)
+        elif isinstance(event, PortExitEvent):
+            self._exit(event.addr, self.ports_added, self.ports_removed, self.ports_changed)
+        elif isinstance(event, PortChangeEvent):
+            self._change(event.addr, self.ports_added, self.ports_changed)
+        elif isinstance(event, PortSubscribedEvent):
+            conn = (event.connect_sender, event.connect_dest)
+            if conn in self.connections_removed:
+                self.connections_removed.discard(conn)
+            else:
+                self.connections_added.add(conn)
+        elif isinstance(event, PortUnsubscribedEvent):
+            conn = (event.connect_sender, event.connect_dest)
+            if conn in self.connections_added:
+                self.connections_added.discard(conn)
+            else:
+                self.connections_removed.add(conn)
+        else:
+            return False
+        return True
+
+
+__all__ = ["TopologyDelta"]
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import time
+from argparse import ArgumentParser
+
+from alsa_midi import READ_PORT, WRITE_PORT, PortType, SequencerClient
+
+# the kernel allows at most 254 ports per client
+PORTS_PER_CLIENT = 200
+
+
+def create_ports(count):
+    """Create clients with many ports, mimicking a big system (e.g. the
+    snd-seq-dummy driver loaded with many ports)."""
+    clients = []
+    ports = []
+    for i in range(count):
+        if i % PORTS_PER_CLIENT == 0:
+            client = SequencerClient(f"benchmark ports {len(clients)}")
+            clients.append(client)
+        if i % 4 == 0:
+            caps = WRITE_PORT
+            port_type = PortType.MIDI_GENERIC | PortType.HARDWARE
+        elif i % 4 == 1:
+            caps = READ_PORT
+            port_type = PortType.MIDI_GENERIC | PortType.HARDWARE
+        elif i % 4 == 2:
+            caps = READ_PORT | WRITE_PORT
+            port_type = PortType.MIDI_GENERIC | PortType.SOFTWARE
+        else:
+            caps = READ_PORT
+            port_type = PortType.APPLICATION
+        ports.append(client.create_port(f"port {i}", caps=caps, type=port_type))
+    return clients, ports
+
+
+def main():
+    parser = ArgumentParser(description="Measure list_ports() performance")
+    parser.add_argument("--ports", "-p", type=int, default=500,
+                        help="Number of ports to create for the test, "
+                        f"{PORTS_PER_CLIENT} per client (default: 500)")
+    parser.add_argument("--repeat", "-r", type=int, default=100,
+                        help="Number of repetitions (default: 100)")
+
+    args = parser.parse_args()
+
+    ports_clients, _ = create_ports(args.ports)
+
+    client = SequencerClient("benchmark_list_ports.py")
+
+    cases = [
+        ("all", {}),
+        ("output", {"output": True}),
+        ("input", {"input": True}),
+        ("hardware input", {"input": True, "type": PortType.MIDI_GENERIC | PortType.HARDWARE}),
+        ("any type", {"type": PortType.ANY}),
+        ]
+
+    for name, kwargs in cases:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = client.list_ports(**kwargs)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name:16s}: {len(result):5d} ports returned, {elapsed * 1000:8.3f} ms per call")
+
+    client.close()
+    for ports_client in ports_clients:
+        ports_client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser
+
+from alsa_midi import RW_PORT, Address, MidiFilePlayer, SequencerClient
+
+
+def main():
+    parser = ArgumentParser(description="Play Standard MIDI Files")
+    parser.add_argument("--port", "-p", type=Address, action="append",
+                        help="Connect to the specific port(s)")
+    parser.add_argument("files", metavar="FILE", nargs="+",
+                        help="MIDI file(s) to play")
+
+    args = parser.parse_args()
+
+    client = SequencerClient("play_midi_file.py")
+    port = client.create_port("output", RW_PORT)
+    queue = client.create_queue()
+
+    if args.port:
+        targets = args.port
+    else:
+        target = client.list_ports(output=True)[0]
+        print(f"Playing on {target.client_id}:{target.port_id}"
+              f" '{target.name}' of '{target.client_name}'")
+        targets = [target]
+
+    for target in targets:
+        port.connect_to(target)
+
+    try:
+        for filename in args.files:
+            print(f"Playing {filename}")
+            player = MidiFilePlayer(client, queue, port, filename)
+            try:
+                player.play()
+            finally:
+                player.stop()
+                player.close()
+    except KeyboardInterrupt:
+        pass
+
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -242,6 +242,68 @@ def alsa_seq_state():
     return AlsaSequencerState()
 
 
+def _receive_all(client):
+    events = []
+    while True:
+        event = client.event_input(timeout=0.1)
+        if event is None:
+            return events
+        events.append(event)
+
+
+@pytest.fixture
+def receive_all():
+    """Function reading the events from a client until none come for 0.1 s."""
+    return _receive_all
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock():
+    """Clock returning the value of its `now` attribute."""
+    return FakeClock()
+
+
+class OutputRecorder:
+    """Stands for the client, recording the events a player outputs."""
+
+    def __init__(self):
+        self.events = []
+
+    def _prepare_event(self, event, queue=None, port=None, dest=None, remainder=None):
+        from alsa_midi import ffi
+
+        alsa_event = ffi.new("snd_seq_event_t *")
+        event._to_alsa(alsa_event, queue=queue, port=port, dest=dest)
+        self.events.append(event)
+        return alsa_event, None
+
+    def _event_output_wait(self, func):
+        pass
+
+    def event_output(self, event, queue=None, port=None, dest=None):
+        pass
+
+    def drain_output(self):
+        pass
+
+    def remove_events(self, condition):
+        self.events.clear()
+
+
+@pytest.fixture
+def output_recorder():
+    """Client stand-in recording the events output with :meth:`_prepare_event`."""
+    return OutputRecorder()
+
+
 alsa_seq_present = os.path.exists("/proc/asound/seq/clients")
 if not alsa_seq_present:
     try:
@@ -0,0 +1,121 @@
+import pytest
+
+from alsa_midi import (SYSTEM_ANNOUNCE, Address, ClientChangeEvent, ClientInfo, InfoCache,
+                       NoteOnEvent, PortChangeEvent, PortExitEvent, PortInfo, PortSubscribedEvent,
+                       SequencerClient)
+
+
+def test_cache_get_put():
+    cache = InfoCache()
+    assert len(cache) == 0
+    assert cache.get_client_info(128) is None
+    assert cache.get_port_info(Address(128, 0)) is None
+
+    c_info = ClientInfo(client_id=128, name="client")
+    p_info = PortInfo(client_id=128, port_id=0, name="port")
+    cache.put_client_info(c_info)
+    cache.put_port_info(p_info)
+
+    assert len(cache) == 2
+    assert cache.get_client_info(128) is c_info
+    assert cache.get_port_info(Address(128, 0)) is p_info
+
+
+def test_cache_bounded():
+    cache = InfoCache(max_size=3)
+    for i in range(3):
+        cache.put_port_info(PortInfo(client_id=128, port_id=i))
+        cache.put_client_info(ClientInfo(client_id=128 + i))
+
+    # touch the oldest entries, so the second ones are evicted
+    assert cache.get_port_info(Address(128, 0)) is not None
+    assert cache.get_client_info(128) is not None
+
+    cache.put_port_info(PortInfo(client_id=128, port_id=3))
+    cache.put_client_info(ClientInfo(client_id=131))
+
+    assert len(cache) == 6
+    assert cache.get_port_info(Address(128, 1)) is None
+    assert cache.get_port_info(Address(128, 0)) is not None
+    assert cache.get_port_info(Address(128, 3)) is not None
+    assert cache.get_client_info(129) is None
+    assert cache.get_client_info(128) is not None
+    assert cache.get_client_info(131) is not None
+
+    with pytest.raises(ValueError):
+        InfoCache(max_size=0)
+
+
+def test_cache_invalidate():
+    cache = InfoCache()
+    for client_id in 128, 129:
+        cache.put_client_info(ClientInfo(client_id=client_id))
+        for port_id in 0, 1:
+            cache.put_port_info(PortInfo(client_id=client_id, port_id=port_id))
+
+    assert cache.invalidate(NoteOnEvent(60)) is False
+    assert len(cache) == 6
+
+    assert cache.invalidate(PortChangeEvent(Address(128, 0))) is True
+    assert cache.get_port_info(Address(128, 0)) is None
+    assert cache.get_client_info(128) is not None
+
+    assert cache.invalidate(PortExitEvent(Address(128, 1))) is True
+    assert cache.get_port_info(Address(128, 1)) is None
+    assert cache.get_client_info(128) is None
+
+    assert cache.invalidate(ClientChangeEvent(Address(129, 0))) is True
+    assert len(cache) == 0
+
+    cache.put_port_info(PortInfo(client_id=128, port_id=0))
+    cache.put_port_info(PortInfo(client_id=129, port_id=0))
+    cache.put_port_info(PortInfo(client_id=130, port_id=0))
+    assert cache.invalidate(PortSubscribedEvent(Address(128, 0), Address(129, 0))) is True
+    assert cache.get_port_info(Address(128, 0)) is None
+    assert cache.get_port_info(Address(129, 0)) is None
+    assert cache.get_port_info(Address(130, 0)) is not None
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.require_alsa_seq
+def test_client_info_cache():
+    client = SequencerClient("test")
+    port = client.create_port("announce")
+    port.connect_from(SYSTEM_ANNOUNCE)
+    client.info_cache = InfoCache()
+
+    other_client = SequencerClient("other")
+    other_port = other_client.create_port("p1")
+
+    c_info = client.get_client_info(other_client.client_id)
+    assert c_info.name == "other"
+    assert client.get_client_info(other_client.client_id) is c_info
+
+    p_info = client.get_port_info(other_port)
+    assert p_info.name == "p1"
+    assert client.get_port_info(other_port) is p_info
+
+    info = other_port.get_info()
+    info.name = "p1 changed"
+    other_port.set_info(info)
+
+    # process the announcements
+    while client.event_input(timeout=0.5) is not None:
+        pass
+
+    p_info = client.get_port_info(other_port)
+    assert p_info.name == "p1 changed"
+    assert client.get_port_info(other_port) is p_info
+
+    own_info = client.get_client_info()
+    assert own_info.client_id == client.client_id
+    assert client.get_client_info() is own_info
+
+    own_info.name = "test changed"
+    client.set_client_info(own_info)
+    assert client.get_client_info().name == "test changed"
+
+    other_client.close()
+    client.close()
@@ -0,0 +1,117 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from alsa_midi import (NoteOnEvent, QueueClock, QueueTempo, QueueTimeMapping, RealTime,
+                       SequencerClient, SetQueueTempoEvent, StartEvent, StopEvent)
+
+
+@pytest.mark.require_alsa_seq
+def test_queue_clock():
+    client = SequencerClient("test")
+    queue = client.create_queue()
+    queue.set_tempo(500000, 96)
+
+    clock = QueueClock(queue, resync_interval=10)
+    assert clock.running is False
+    assert clock.tick() == 0
+    assert clock.real_time() == 0
+
+    queue.start()
+    client.drain_output()
+    assert clock.handle_event(StartEvent(control_queue=queue)) is True
+
+    time.sleep(0.2)
+    # extrapolated, no status read for 10 s
+    real_time = float(clock.real_time())
+    status = queue.get_status()
+    assert clock.running is True
+    assert abs(real_time - float(status.real_time)) < 0.01
+    assert abs(clock.tick() - status.tick_time) <= 3
+
+    time.sleep(0.1)
+    assert abs(float(clock.real_time()) - float(queue.get_status().real_time)) < 0.01
+
+    queue.stop()
+    client.drain_output()
+    assert clock.handle_event(StopEvent(control_queue=queue)) is True
+    stopped_at = clock.tick()
+    time.sleep(0.05)
+    assert clock.running is False
+    assert clock.tick() == stopped_at
+
+    client.close()
+
+
+def test_queue_clock_skew(fake_clock):
+    # queue running at 1.5 times the normal speed, 96 ticks per second
+    tempo = QueueTempo(tempo=1000000, ppq=64, skew=0x18000, skew_base=0x10000)
+    status = SimpleNamespace(real_time=RealTime(10.0), tick_time=960, running=True)
+    queue = SimpleNamespace(queue_id=0, get_tempo=lambda: tempo, get_status=lambda: status)
+
+    clock = QueueClock(queue, resync_interval=10, clock=fake_clock)  # type: ignore
+    clock.sync()
+    fake_clock.now = 2.0
+    assert clock.tick() == 960 + 192
+    assert float(clock.real_time()) == pytest.approx(13.0)
+
+    # the extrapolation matches the status read
+    status.real_time = RealTime(13.0)
+    status.tick_time = 1152
+    clock.sync()
+    assert clock.last_error == pytest.approx(0.0)
+
+
+@pytest.mark.require_alsa_seq
+def test_queue_clock_events():
+    client = SequencerClient("test")
+    queue = client.create_queue()
+    other_queue = client.create_queue()
+
+    clock = QueueClock(queue)
+    assert clock.handle_event(NoteOnEvent(note=60)) is False
+    assert clock.handle_event(StartEvent(control_queue=other_queue)) is False
+    assert clock.handle_event(SetQueueTempoEvent(bpm=60, control_queue=queue)) is True
+
+    with pytest.raises(ValueError):
+        QueueClock(queue, resync_interval=0)
+
+    client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_queue_time_mapping():
+    client = SequencerClient("test")
+    queue = client.create_queue()
+
+    mapping = QueueTimeMapping(queue)
+    with pytest.raises(ValueError):
+        mapping.to_real_time()
+
+    # not running
+    assert mapping.update() is False
+    assert len(mapping) == 0
+
+    queue.start()
+    client.drain_output()
+    time.sleep(0.01)
+
+    for _ in range(5):
+        assert mapping.update() is True
+        time.sleep(0.02)
+    assert len(mapping) == 5
+    assert abs(mapping.rate - 1.0) < 0.01
+
+    now = time.monotonic_ns()
+    status = queue.get_status()
+    estimated = mapping.to_real_time(now)
+    assert abs(float(estimated) - float(status.real_time)) < 0.005
+
+    back = mapping.to_monotonic_ns(estimated)
+    assert abs(back - now) < 1000
+
+    assert mapping.handle_event(StopEvent(control_queue=queue)) is True
+    assert len(mapping) == 0
+
+    client.close()
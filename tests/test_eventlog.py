@@ -0,0 +1,167 @@
+import io
+
+import pytest
+
+from alsa_midi import (RW_PORT, WRITE_PORT, Address, ControlChangeEvent, EventLog, EventLogWriter,
+                       MidiBytesEvent, MidiFile, NoteOnEvent, RingRecorder, SequencerClient,
+                       SysExEvent)
+
+
+def write_log(path):
+    with EventLogWriter(path) as writer:
+        for i in range(100):
+            if i % 10 == 5:
+                event = SysExEvent(b"\xf0\x7e" + bytes([i]) + b"\xf7", source=Address(20, 0))
+            else:
+                event = NoteOnEvent(i, channel=i % 16, velocity=64, source=Address(20, 0))
+            writer.append(event, timestamp=1000000 + i * 1000)
+
+
+def test_write_read(tmp_path):
+    path = tmp_path / "events.log"
+    write_log(path)
+
+    with EventLog(path) as log:
+        assert len(log) == 100
+        assert log.timestamp(0) == 1000000
+        assert log.timestamp(-1) == 1000000 + 99 * 1000
+
+        timestamp, event = log[3]
+        assert timestamp == 1003000
+        assert isinstance(event, NoteOnEvent)
+        assert event.note == 3
+        assert event.channel == 3
+        assert event.velocity == 64
+        assert event.source == Address(20, 0)
+
+        timestamp, event = log[25]
+        assert timestamp == 1025000
+        assert isinstance(event, SysExEvent)
+        assert event.data == b"\xf0\x7e\x19\xf7"
+
+        with pytest.raises(IndexError):
+            log[100]
+
+        assert [r.timestamp for r in log][:3] == [1000000, 1001000, 1002000]
+
+
+def test_time_range(tmp_path):
+    path = tmp_path / "events.log"
+    write_log(path)
+
+    with EventLog(path) as log:
+        assert log.index(0) == 0
+        assert log.index(1010000) == 10
+        assert log.index(1010001) == 11
+        assert log.index(2000000) == 100
+
+        records = list(log.records(1010000, 1015000))
+        assert [r.timestamp for r in records] == [1010000 + i * 1000 for i in range(5)]
+        assert [r.event.note for r in records] == [10, 11, 12, 13, 14]
+
+        assert len(list(log.records(start=1098000))) == 2
+        assert len(list(log.records(end=1002000))) == 2
+
+
+def test_append_timestamp(tmp_path):
+    path = tmp_path / "events.log"
+    with EventLogWriter(path, clock=lambda: 42) as writer:
+        writer.append(ControlChangeEvent(1, 7, 100))
+        writer.flush()
+        with pytest.raises(TypeError):
+            writer.append(MidiBytesEvent(b"\x90\x3c\x40"))
+
+    with EventLog(path) as log:
+        assert len(log) == 1
+        timestamp, event = log[0]
+        assert timestamp == 42
+        assert (event.channel, event.param, event.value) == (1, 7, 100)
+
+
+def test_invalid_log(tmp_path):
+    path = tmp_path / "events.log"
+    path.write_bytes(b"MThd\x00\x00\x00\x06\x00\x00\x00\x01\x00\x60")
+    with pytest.raises(ValueError):
+        EventLog(path)
+
+
+def test_ring_recorder(fake_clock):
+    ring = RingRecorder(duration=10.0, capacity=50, ext_capacity=16, clock=fake_clock)
+    for i in range(100):
+        fake_clock.now = i * 100000000
+        if i % 10 == 5:
+            ring.append(SysExEvent(b"\xf0\x7e" + bytes([i]) + b"\xf7"))
+        else:
+            ring.append(NoteOnEvent(i))
+    assert len(ring) == 50
+
+    # capacity limit
+    records = list(ring.records())
+    assert records[0].timestamp == 5000000000
+    assert [r.event.data for r in records if isinstance(r.event, SysExEvent)] == [
+            b"\xf0\x7e" + bytes([i]) + b"\xf7" for i in (65, 75, 85, 95)]
+    assert [r.event.note for r in records if isinstance(r.event, NoteOnEvent)] == [
+            i for i in range(50, 100) if i % 10 != 5]
+
+    # duration limit
+    fake_clock.now = 16000000000
+    records = list(ring.records())
+    assert records[0].timestamp == 6000000000
+
+    records = list(ring.records(7000000000, 7500000000))
+    assert [r.event.note for r in records] == [70, 71, 72, 73, 74]
+
+    ring.clear()
+    assert len(ring) == 0
+    assert list(ring.records()) == []
+
+
+def test_ring_recorder_dump(tmp_path, fake_clock):
+    ring = RingRecorder(clock=fake_clock)
+    for i in range(8):
+        fake_clock.now = 1000000000 + i * 250000000
+        ring.append(NoteOnEvent(60 + i))
+    ring.append(ControlChangeEvent(0, 7, 100))
+
+    path = tmp_path / "events.log"
+    assert ring.dump_log(path, start=1500000000) == 7
+    with EventLog(path) as log:
+        assert [log[i].event.note for i in range(6)] == [62, 63, 64, 65, 66, 67]
+
+    output = io.BytesIO()
+    assert ring.dump_smf(output, end=2000000000, tempo=500000, ppq=96) == 4
+    midi_file = MidiFile(io.BytesIO(output.getvalue()))
+    events = list(midi_file.events())
+    assert events[0].midi_tempo == 500000
+    assert [(e.note, e.tick) for e in events[1:]] == [(60, 0), (61, 48), (62, 96), (63, 144)]
+
+
+@pytest.mark.require_alsa_seq
+def test_replay(tmp_path):
+    path = tmp_path / "events.log"
+    with EventLogWriter(path) as writer:
+        for i in range(10):
+            writer.append(NoteOnEvent(60 + i), timestamp=i * 20000000)
+
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    with EventLog(path) as log:
+        player = log.replay(client, queue, port, start=40000000, dest=in_port, lookahead=0.05)
+        player.play()
+
+    notes = []
+    while True:
+        event = receiver.event_input(timeout=0.1)
+        if event is None:
+            break
+        notes.append(event.note)
+
+    assert notes == list(range(62, 70))
+
+    client.close()
+    receiver.close()
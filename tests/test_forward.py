@@ -0,0 +1,101 @@
+import pytest
+
+from alsa_midi import (READ_PORT, RW_PORT, WRITE_PORT, Address, ControlChangeEvent, EventType,
+                       Forwarder, ForwardRule, NoteOnEvent, ProgramChangeEvent, SequencerClient,
+                       alsa)
+from alsa_midi.forward import _CompiledRule
+
+
+def test_compiled_rule():
+    rule = _CompiledRule(ForwardRule(input_port=1,
+                                     event_types=[EventType.NOTEON, EventType.NOTEOFF],
+                                     port=2,
+                                     dest=Address(128, 3),
+                                     channel={0: 9, 1: 10},
+                                     transpose=-12))
+    assert rule.input_port == 1
+    assert rule.event_types == {EventType.NOTEON, EventType.NOTEOFF}
+    assert rule.port == 2
+    assert (rule.dest_client, rule.dest_port) == (128, 3)
+    assert rule.channel_map == [9, 10] + list(range(2, 16))
+    assert rule.transpose == -12
+
+    rule = _CompiledRule(ForwardRule(channel=5))
+    assert rule.input_port is None
+    assert rule.event_types is None
+    assert rule.dest_client == alsa.SND_SEQ_ADDRESS_SUBSCRIBERS
+    assert rule.channel_map == [5] * 16
+
+
+@pytest.mark.require_alsa_seq
+def test_forwarder(receive_all):
+    sender = SequencerClient("test_sender")
+    out_port = sender.create_port("output", READ_PORT)
+
+    client = SequencerClient("test_forwarder")
+    in_port = client.create_port("input", WRITE_PORT)
+    fwd_port = client.create_port("output", READ_PORT)
+
+    receiver = SequencerClient("test_receiver")
+    port1 = receiver.create_port("input1", WRITE_PORT)
+    port2 = receiver.create_port("input2", WRITE_PORT)
+
+    out_port.connect_to(in_port)
+    fwd_port.connect_to(port1)
+
+    forwarder = Forwarder(client, [
+        ForwardRule(input_port=in_port, port=fwd_port),
+        ForwardRule(event_types=[EventType.NOTEON], port=fwd_port, dest=port2,
+                    channel=3, transpose=12),
+        ])
+
+    sender.event_output(NoteOnEvent(60, channel=1, velocity=100))
+    sender.event_output(ControlChangeEvent(1, 7, 100))
+    sender.event_output(NoteOnEvent(120, channel=1, velocity=100))
+    sender.event_output(ProgramChangeEvent(2, 5))
+    sender.drain_output()
+
+    assert forwarder.run(timeout=0.1) == 4
+    assert forwarder.forwarded == 5
+    assert forwarder.dropped == 0
+
+    events = receive_all(receiver)
+    to_port1 = [e for e in events if e.dest == Address(port1)]
+    to_port2 = [e for e in events if e.dest == Address(port2)]
+
+    assert [type(e) for e in to_port1] == [NoteOnEvent, ControlChangeEvent, NoteOnEvent,
+                                           ProgramChangeEvent]
+    assert to_port1[0].note == 60 and to_port1[0].channel == 1
+    assert all(e.source == Address(fwd_port) for e in events)
+
+    # note 120 + 12 dropped
+    assert len(to_port2) == 1
+    assert to_port2[0].note == 72
+    assert to_port2[0].channel == 3
+    assert to_port2[0].velocity == 100
+
+    sender.close()
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_forwarder_drop():
+    sender = SequencerClient("test_sender")
+    out_port = sender.create_port("output", READ_PORT)
+
+    client = SequencerClient("test_forwarder")
+    port = client.create_port("inout", RW_PORT)
+    out_port.connect_to(port)
+
+    forwarder = Forwarder(client, [ForwardRule(event_types=[EventType.NOTEON], port=port,
+                                               dest=out_port)])
+    sender.event_output(ControlChangeEvent(1, 7, 100))
+    sender.drain_output()
+
+    assert forwarder.run(timeout=0.1) == 1
+    assert forwarder.forwarded == 0
+    assert forwarder.dropped == 1
+
+    sender.close()
+    client.close()
@@ -0,0 +1,99 @@
+import pytest
+
+from alsa_midi import (READ_PORT, WRITE_PORT, Address, MultiTrackPlayer, NoteEvent, NoteOffEvent,
+                       NoteOnEvent, NoteTracker, SequencerClient, SoundingNote, alsa)
+
+
+def test_track():
+    # client not used for direct events
+    tracker = NoteTracker(None)  # type: ignore
+    dest = Address(128, 0)
+    tracker.track(NoteOnEvent(60, channel=0), port=1, dest=dest)
+    tracker.track(NoteOnEvent(60, channel=0), port=1, dest=dest)
+    tracker.track(NoteOnEvent(62, channel=9), port=1, dest=dest)
+    tracker.track(NoteEvent(64, channel=1, duration=10), port=1, dest=dest)
+    tracker.track(NoteOnEvent(65, channel=1), port=2)
+    assert len(tracker) == 4
+
+    tracker.track(NoteOffEvent(60, channel=0), port=1, dest=dest)
+    assert len(tracker) == 4
+    tracker.track(NoteOffEvent(60, channel=0), port=1, dest=dest)
+    # velocity 0 is note off
+    tracker.track(NoteOnEvent(62, channel=9, velocity=0), port=1, dest=dest)
+    # not sounding, ignored
+    tracker.track(NoteOffEvent(70, channel=0), port=1, dest=dest)
+    tracker.track(NoteOffEvent(70, channel=0), port=3, dest=dest)
+
+    subscribers = Address(alsa.SND_SEQ_ADDRESS_SUBSCRIBERS, alsa.SND_SEQ_ADDRESS_UNKNOWN)
+    assert sorted(tracker.sounding()) == [
+            SoundingNote(1, dest, 1, 64),
+            SoundingNote(2, subscribers, 1, 65),
+            ]
+
+    tracker.clear()
+    assert len(tracker) == 0
+    assert list(tracker.sounding()) == []
+
+
+@pytest.mark.require_alsa_seq
+def test_panic(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("output", READ_PORT)
+    queue = client.create_queue()
+
+    receiver = SequencerClient("test_receiver")
+    in_port1 = receiver.create_port("input1", WRITE_PORT)
+    in_port2 = receiver.create_port("input2", WRITE_PORT)
+    port.connect_to(in_port2)
+
+    tracker = NoteTracker(client)
+    tracker.event_output(NoteOnEvent(60, channel=0), port=port, dest=in_port1)
+    tracker.event_output(NoteOnEvent(61, channel=3), port=port)
+    tracker.event_output(NoteOffEvent(61, channel=3), port=port)
+    tracker.event_output(NoteOnEvent(62, channel=5), port=port)
+    # scheduled note off removed by the panic
+    queue.start()
+    tracker.event_output(NoteOffEvent(62, channel=5, tick=1000), queue=queue, port=port)
+    client.drain_output()
+
+    assert len(receive_all(receiver)) == 4
+
+    assert tracker.panic() == 2
+    assert len(tracker) == 0
+
+    events = receive_all(receiver)
+    assert all(isinstance(e, NoteOffEvent) for e in events)
+    assert sorted((e.dest.port_id, e.channel, e.note) for e in events) == [
+            (in_port1.port_id, 0, 60), (in_port2.port_id, 5, 62)]
+
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_player_stop(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("player", READ_PORT | WRITE_PORT)
+    queue = client.create_queue()
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    tracks = [
+        [NoteOnEvent(36 + i, tick=i * 10) for i in range(4)]
+        + [NoteOffEvent(36 + i, tick=1000 + i) for i in range(4)],
+        [NoteOnEvent(72, tick=0), NoteOffEvent(72, tick=5)],
+        ]
+    tracker = NoteTracker(client)
+    player = MultiTrackPlayer(client, queue, port, tracks, lookahead_ticks=2000, dest=in_port,
+                              note_tracker=tracker)
+    player.start()
+    receive_all(receiver)
+    player.stop()
+
+    events = receive_all(receiver)
+    assert sorted(e.note for e in events) == [36, 37, 38, 39]
+    assert all(isinstance(e, NoteOffEvent) for e in events)
+
+    client.close()
+    receiver.close()
@@ -0,0 +1,265 @@
+from types import SimpleNamespace
+
+import pytest
+
+from alsa_midi import (READ_PORT, RW_PORT, SYSTEM_TIMER, WRITE_PORT, MultiTrackPlayer, NoteOnEvent,
+                       QueuePlayer, SequencerClient, SetQueueTempoEvent, TempoMap)
+
+
+def test_player_refill_real_time_sequence(output_recorder):
+    client = output_recorder
+    queue = SimpleNamespace(queue_id=0)
+    events = [NoteOnEvent(note=i, time=i * 0.02) for i in range(20)]
+    player = QueuePlayer(client, queue, 1, events, lookahead=0.1)  # type: ignore
+
+    assert player.refill(now=0) == 6
+    assert [e.note for e in client.events] == [0, 1, 2, 3, 4, 5]
+    assert player.refill(now=0.1) == 5
+    assert [e.note for e in client.events[6:]] == [6, 7, 8, 9, 10]
+
+
+def test_player_mute_queue_control(output_recorder):
+    client = output_recorder
+    queue = SimpleNamespace(queue_id=0, get_status=lambda: SimpleNamespace(tick_time=0))
+    tempo_map = TempoMap()
+    events = [NoteOnEvent(note=i, tick=i * 4) for i in range(12)]
+    events.insert(3, SetQueueTempoEvent(250000, control_queue=0, tick=12, dest=SYSTEM_TIMER))
+    events.insert(10, SetQueueTempoEvent(400000, control_queue=0, tick=36, dest=SYSTEM_TIMER))
+    player = QueuePlayer(client, queue, 1, events, lookahead_ticks=20,  # type: ignore
+                         tempo_map=tempo_map)
+
+    player.refill(now=0)
+    player.mute()
+    # tempo change kept scheduled
+    assert [type(e) for e in client.events] == [SetQueueTempoEvent]
+    assert player.refill(now=20) == 1
+    assert [e.tick for e in client.events] == [12, 36]
+    assert list(tempo_map) == [(0, 500000), (12, 250000), (36, 400000)]
+
+    player.unmute()
+    assert SetQueueTempoEvent not in [type(e) for e in client.events[2:]]
+    # the window from the last refill
+    assert [e.note for e in client.events[2:]] == list(range(5, 11))
+
+
+@pytest.mark.require_alsa_seq
+def test_player_ticks(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    events = [NoteOnEvent(note=i, tick=i * 10) for i in range(40)]
+    player = QueuePlayer(client, queue, port, events, lookahead_ticks=48, dest=in_port)
+
+    player.start()
+    # only the first window (and the echo) scheduled
+    status = queue.get_status()
+    assert status.events <= 7
+
+    while not player.done:
+        event = client.event_input(timeout=1)
+        assert event is not None
+        assert player.handle_event(event)
+
+    received = receive_all(receiver)
+
+    assert [e.note for e in received] == list(range(40))
+    assert [e.tick for e in received] == [i * 10 for i in range(40)]
+
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_player_real_time(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    events = [NoteOnEvent(note=i, time=i * 0.02) for i in range(20)]
+    player = QueuePlayer(client, queue, port, events, lookahead=0.1, dest=in_port)
+    player.play()
+    assert player.done
+
+    notes = [event.note for event in receive_all(receiver)]
+    assert notes == list(range(20))
+
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_player_handle_other_event():
+    client = SequencerClient("test")
+    port = client.create_port("player", READ_PORT)
+    queue = client.create_queue()
+    player = QueuePlayer(client, queue, port, [])
+    assert player.handle_event(NoteOnEvent(note=60, source=port)) is False
+    client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_player_tempo_map(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+    queue.set_tempo(500000, 96)
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    tempo_map = TempoMap(queue.get_tempo())
+    events = [NoteOnEvent(note=i, tick=i * 4) for i in range(12)]
+    events.insert(6, SetQueueTempoEvent(250000, control_queue=queue, tick=24,
+                                        dest=SYSTEM_TIMER))
+    player = QueuePlayer(client, queue, port, events, lookahead=0.05, dest=in_port,
+                         tempo_map=tempo_map)
+    player.play()
+
+    assert list(tempo_map) == [(0, 500000), (24, 250000)]
+    assert queue.get_tempo().tempo == 250000
+
+    notes = [event.note for event in receive_all(receiver)]
+    assert notes == list(range(12))
+
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_player_loop(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+    queue.set_tempo(250000, 96)
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    events = [NoteOnEvent(note=i, tick=i * 10) for i in range(6)]
+    player = QueuePlayer(client, queue, port, events, lookahead_ticks=16, dest=in_port, tag=3)
+    player.set_loop(10, 40)
+
+    player.start()
+    while queue.get_status().tick_time < 100:
+        event = client.event_input(timeout=1)
+        assert event is not None
+        player.handle_event(event)
+    player.clear_loop()
+    while not player.done:
+        event = client.event_input(timeout=1)
+        assert event is not None
+        player.handle_event(event)
+
+    received = []
+    for event in receive_all(receiver):
+        received.append((event.note, event.tick))
+        assert event.tag == 3
+
+    assert received[:7] == [(0, 0), (1, 10), (2, 20), (3, 30), (1, 40), (2, 50), (3, 60)]
+    assert received[-2:] == [(4, received[-2][1]), (5, received[-2][1] + 10)]
+    notes = [note for note, _ in received[1:-2]]
+    assert notes == [1, 2, 3] * (len(notes) // 3)
+    ticks = [tick for _, tick in received]
+    assert ticks == sorted(ticks)
+
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_player_seek(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+    queue.set_tempo(250000, 96)
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    events = [NoteOnEvent(note=i, tick=i * 10) for i in range(100)]
+    player = QueuePlayer(client, queue, port, events, lookahead_ticks=20, dest=in_port)
+
+    player.start()
+    while queue.get_status().tick_time < 50:
+        event = client.event_input(timeout=1)
+        assert event is not None
+        player.handle_event(event)
+
+    player.seek(905)
+    assert queue.get_status().tick_time >= 905
+    while not player.done:
+        event = client.event_input(timeout=1)
+        assert event is not None
+        player.handle_event(event)
+
+    notes = [event.note for event in receive_all(receiver)]
+
+    index = notes.index(91)
+    assert notes[index:] == list(range(91, 100))
+    assert notes[:index] == list(range(index))
+    assert index < 10
+
+    with pytest.raises(TypeError):
+        QueuePlayer(client, queue, port, iter(events), lookahead_ticks=20).seek(0)
+
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_player_mute(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+    queue.set_tempo(250000, 96)
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    tracks = [[NoteOnEvent(note=i, channel=track, tick=i * 10) for i in range(30)]
+              for track in range(3)]
+    player = MultiTrackPlayer(client, queue, port, tracks, lookahead_ticks=20, dest=in_port)
+    assert [track.tag for track in player.tracks] == [1, 2, 3]
+
+    def run_until(tick):
+        while queue.get_status().tick_time < tick:
+            event = client.event_input(timeout=1)
+            assert event is not None
+            player.handle_event(event)
+
+    player.start()
+    run_until(95)
+    player.mute(1)
+    run_until(195)
+    player.solo(2)
+    run_until(245)
+    player.mute(1, False)
+    player.solo(2, False)
+    while not player.done:
+        event = client.event_input(timeout=1)
+        assert event is not None
+        player.handle_event(event)
+
+    received = {0: [], 1: [], 2: []}
+    for event in receive_all(receiver):
+        received[event.channel].append(event.note)
+
+    assert received[0][:10] == list(range(10))
+    assert received[0][-5:] == list(range(25, 30))
+    assert 20 not in received[0] and 23 not in received[0]
+
+    assert received[1][:9] == list(range(9))
+    assert 11 not in received[1] and 22 not in received[1]
+    assert received[1][-4:] == list(range(26, 30))
+
+    assert received[2] == list(range(30))
+
+    client.close()
+    receiver.close()
@@ -0,0 +1,348 @@
+import pytest
+
+from alsa_midi import (READ_PORT, WRITE_PORT, Address, ChannelPressureEvent,
+                       Control14BitChangeEvent, ControlChangeEvent, ControllerCoalescer,
+                       NonRegisteredParameterChangeEvent, NoteOnEvent, ParameterAssembler,
+                       PitchBendEvent, RealTime, RegisteredParameterChangeEvent, SequencerClient,
+                       SysExEvent, TimestampMerger)
+from alsa_midi.processing import _Stage
+
+
+def test_coalescer(fake_clock):
+    coalescer = ControllerCoalescer(0.01, clock=fake_clock)
+
+    first = ControlChangeEvent(0, 7, 0)
+    assert coalescer.process(first) == [first]
+    for value in range(1, 10):
+        fake_clock.now += 0.001
+        assert coalescer.process(ControlChangeEvent(0, 7, value)) == []
+    # other controllers are independent
+    other = ControlChangeEvent(0, 1, 5)
+    assert coalescer.process(other) == [other]
+    assert coalescer.coalesced == 8
+    assert coalescer.timeout() == pytest.approx(0.001)
+
+    fake_clock.now = 0.0095
+    assert coalescer.flush() == []
+    fake_clock.now = 0.01
+    assert [e.value for e in coalescer.flush()] == [9]
+    assert coalescer.timeout() is None
+
+    # next interval starts with the flushed value
+    fake_clock.now = 0.015
+    assert coalescer.process(ControlChangeEvent(0, 7, 10)) == []
+    assert coalescer.process(PitchBendEvent(0, 100)) != []
+    assert coalescer.process(ChannelPressureEvent(0, 100)) != []
+    fake_clock.now = 0.02
+    pending = coalescer.process(PitchBendEvent(0, 200))
+    assert [e.value for e in pending] == [10]
+    assert [e.value for e in coalescer.flush(force=True)] == [200]
+
+
+def test_coalescer_event_input_rounding(fake_clock):
+    class InputStub:
+        def __init__(self):
+            self.timeouts = []
+
+        def event_input(self, timeout=None):
+            self.timeouts.append(timeout)
+            fake_clock.now += 0.001
+            return None
+
+    coalescer = ControllerCoalescer(0.01, clock=fake_clock)
+    fake_clock.now = 0.027
+    coalescer.process(ControlChangeEvent(0, 7, 10))
+    coalescer.process(ControlChangeEvent(0, 7, 20))
+    # (0.027 + 0.01) - 0.027 < 0.01
+    fake_clock.now = 0.037
+    assert coalescer.timeout() == 0.0
+    assert coalescer.flush() == []
+
+    client = InputStub()
+    event = coalescer.event_input(client)  # type: ignore
+    assert event is not None and event.value == 20
+    assert client.timeouts and all(t > 0 for t in client.timeouts)
+
+
+def test_coalescer_order(fake_clock):
+    coalescer = ControllerCoalescer(0.01, clock=fake_clock)
+    src1 = Address(20, 0)
+    src2 = Address(21, 0)
+
+    coalescer.process(PitchBendEvent(0, 0, source=src1))
+    coalescer.process(PitchBendEvent(0, 0, source=src2))
+    fake_clock.now = 0.001
+    assert coalescer.process(PitchBendEvent(0, 100, source=src1)) == []
+    assert coalescer.process(PitchBendEvent(0, 200, source=src2)) == []
+
+    note = NoteOnEvent(60, source=src1)
+    result = coalescer.process(note)
+    assert len(result) == 2
+    assert result[0].value == 100
+    assert result[1] is note
+
+    sysex = SysExEvent(b"\xf0\x7e\xf7", source=src2)
+    result = coalescer.process(sysex)
+    assert [type(e) for e in result] == [PitchBendEvent, SysExEvent]
+    assert result[0].value == 200
+
+    coalescer.reset()
+    assert coalescer.flush(force=True) == []
+
+
+@pytest.mark.require_alsa_seq
+def test_coalescer_event_input():
+    sender = SequencerClient("test_sender")
+    out_port = sender.create_port("output", READ_PORT)
+    client = SequencerClient("test_coalescer")
+    in_port = client.create_port("input", WRITE_PORT)
+    out_port.connect_to(in_port)
+
+    for value in range(100):
+        sender.event_output(ControlChangeEvent(0, 7, value))
+    sender.event_output(NoteOnEvent(60))
+    for value in range(100):
+        sender.event_output(ControlChangeEvent(0, 7, value))
+    sender.drain_output()
+
+    coalescer = ControllerCoalescer(0.05)
+    events = []
+    while True:
+        event = coalescer.event_input(client, timeout=0.2)
+        if event is None:
+            break
+        events.append(event)
+
+    assert [type(e) for e in events] == [ControlChangeEvent, ControlChangeEvent, NoteOnEvent,
+                                         ControlChangeEvent]
+    assert [e.value for e in events if isinstance(e, ControlChangeEvent)] == [0, 99, 99]
+
+    sender.close()
+    client.close()
+
+
+def test_merger(fake_clock):
+    merger = TimestampMerger(0.01, clock=fake_clock)
+
+    assert merger.process(NoteOnEvent(60, tick=20)) == []
+    fake_clock.now = 0.002
+    assert merger.process(NoteOnEvent(61, tick=10)) == []
+    fake_clock.now = 0.004
+    assert merger.process(NoteOnEvent(62, tick=30)) == []
+    untimed = NoteOnEvent(63)
+    assert merger.process(untimed) == [untimed]
+    assert len(merger) == 3
+    assert merger.timeout() == pytest.approx(0.006)
+
+    # first event expired – released with the earlier one
+    fake_clock.now = 0.01
+    assert [e.tick for e in merger.flush()] == [10, 20]
+    assert merger.timeout() == pytest.approx(0.004)
+
+    # too late to be reordered
+    assert merger.process(NoteOnEvent(64, tick=15)) == []
+    assert merger.late == 1
+    assert [e.tick for e in merger.flush(force=True)] == [15, 30]
+    assert len(merger) == 0
+    assert merger.timeout() is None
+
+
+def test_merger_real_time(fake_clock):
+    merger = TimestampMerger(0.01, clock=fake_clock)
+    merger.process(NoteOnEvent(60, time=RealTime(1, 500000000)))
+    merger.process(NoteOnEvent(61, time=RealTime(1, 200000000)))
+    merger.process(NoteOnEvent(62, time=2.0))
+    assert [e.note for e in merger.flush(force=True)] == [61, 60, 62]
+
+
+def test_merger_max_events(fake_clock):
+    merger = TimestampMerger(1.0, max_events=3, clock=fake_clock)
+    for tick in (50, 40, 30):
+        assert merger.process(NoteOnEvent(60, tick=tick)) == []
+    assert [e.tick for e in merger.process(NoteOnEvent(60, tick=45))] == [30]
+    assert [e.tick for e in merger.process(NoteOnEvent(60, tick=10))] == [10]
+    assert len(merger) == 3
+
+    with pytest.raises(ValueError):
+        TimestampMerger(max_events=0)
+
+
+@pytest.mark.require_alsa_seq
+def test_merger_event_input():
+    sender1 = SequencerClient("test_sender1")
+    out_port1 = sender1.create_port("output", READ_PORT)
+    sender2 = SequencerClient("test_sender2")
+    out_port2 = sender2.create_port("output", READ_PORT)
+    client = SequencerClient("test_merger")
+    in_port1 = client.create_port("input1", WRITE_PORT)
+    in_port2 = client.create_port("input2", WRITE_PORT)
+    out_port1.connect_to(in_port1)
+    out_port2.connect_to(in_port2)
+
+    for tick in (0, 20, 40, 60):
+        sender1.event_output(NoteOnEvent(60, tick=tick))
+    sender1.drain_output()
+    for tick in (10, 30, 50):
+        sender2.event_output(NoteOnEvent(61, tick=tick))
+    sender2.drain_output()
+
+    merger = TimestampMerger(0.05)
+    ticks = []
+    while True:
+        event = merger.event_input(client, timeout=0.2)
+        if event is None:
+            break
+        ticks.append(event.tick)
+
+    assert ticks == [0, 10, 20, 30, 40, 50, 60]
+    assert merger.late == 0
+
+    sender1.close()
+    sender2.close()
+    client.close()
+
+
+def test_assembler_14bit(fake_clock):
+    assembler = ParameterAssembler(0.01, clock=fake_clock)
+    source = Address(20, 0)
+
+    # no LSB seen yet – MSB passed as it is
+    msb = ControlChangeEvent(0, 7, 100, source=source)
+    assert assembler.process(msb) == [msb]
+    result = assembler.process(ControlChangeEvent(0, 39, 5, source=source, tick=10))
+    assert len(result) == 1
+    event = result[0]
+    assert isinstance(event, Control14BitChangeEvent)
+    assert (event.channel, event.param, event.value) == (0, 7, 100 << 7 | 5)
+    assert event.source == source
+    assert event.tick == 10
+
+    # LSB seen – MSB held until the LSB comes
+    assert assembler.process(ControlChangeEvent(0, 7, 101, source=source)) == []
+    assert assembler.timeout() == pytest.approx(0.01)
+    result = assembler.process(ControlChangeEvent(0, 39, 6, source=source))
+    assert [(e.param, e.value) for e in result] == [(7, 101 << 7 | 6)]
+
+    # ... or the timeout
+    assert assembler.process(ControlChangeEvent(0, 7, 102, source=source)) == []
+    fake_clock.now = 0.01
+    result = assembler.flush()
+    assert [(type(e), e.param, e.value) for e in result] == [
+            (Control14BitChangeEvent, 7, 102 << 7)]
+
+    # ... or another event from the same source
+    assert assembler.process(ControlChangeEvent(0, 7, 103, source=source)) == []
+    note = NoteOnEvent(60, source=source)
+    result = assembler.process(note)
+    assert [e.value for e in result[:1]] == [103 << 7]
+    assert result[1] is note
+
+    # other controllers and channels are not affected
+    other = ControlChangeEvent(1, 7, 100, source=source)
+    assert assembler.process(other) == [other]
+    other = ControlChangeEvent(0, 64, 127, source=source)
+    assert assembler.process(other) == [other]
+    assert assembler.assembled == 4
+
+
+def test_assembler_controller_order(fake_clock):
+    assembler = ParameterAssembler(0.01, clock=fake_clock)
+
+    # LSB seen for CC 7
+    assembler.process(ControlChangeEvent(0, 7, 10))
+    assembler.process(ControlChangeEvent(0, 39, 1))
+    assert assembler.process(ControlChangeEvent(0, 7, 11)) == []
+
+    # other controllers do not overtake the held volume MSB
+    result = assembler.process(ControlChangeEvent(0, 10, 64))
+    assert [(type(e), e.param, e.value) for e in result] == [
+            (Control14BitChangeEvent, 7, 11 << 7),
+            (ControlChangeEvent, 10, 64)]
+    result = assembler.process(ControlChangeEvent(0, 64, 127))
+    assert [(e.param, e.value) for e in result] == [(64, 127)]
+
+    # ... and the held MSB of one controller does not wait for another LSB
+    assembler.process(ControlChangeEvent(0, 1, 1))
+    assembler.process(ControlChangeEvent(0, 33, 1))
+    assert assembler.process(ControlChangeEvent(0, 7, 12)) == []
+    result = assembler.process(ControlChangeEvent(0, 1, 2))
+    assert [(e.param, e.value) for e in result] == [(7, 12 << 7)]
+    result = assembler.process(ControlChangeEvent(0, 33, 3))
+    assert [(e.param, e.value) for e in result] == [(1, 2 << 7 | 3)]
+
+
+def test_assembler_rpn(fake_clock):
+    assembler = ParameterAssembler(0.01, clock=fake_clock)
+
+    # data entry without a parameter selected
+    event = ControlChangeEvent(0, 6, 2)
+    assert assembler.process(event) == [event]
+
+    # pitch bend sensitivity, MSB only
+    assert assembler.process(ControlChangeEvent(0, 101, 0)) == []
+    assert assembler.process(ControlChangeEvent(0, 100, 0)) == []
+    result = assembler.process(ControlChangeEvent(0, 6, 12))
+    assert len(result) == 1
+    assert isinstance(result[0], RegisteredParameterChangeEvent)
+    assert (result[0].channel, result[0].param, result[0].value) == (0, 0, 12 << 7)
+
+    # fine tuning, with LSB
+    assert assembler.process(ControlChangeEvent(0, 101, 0)) == []
+    assert assembler.process(ControlChangeEvent(0, 100, 1)) == []
+    assert assembler.process(ControlChangeEvent(0, 6, 64)) != []
+    result = assembler.process(ControlChangeEvent(0, 38, 1))
+    assert [(e.param, e.value) for e in result] == [(1, 64 << 7 | 1)]
+    # LSB seen, so the next MSB waits for it
+    assert assembler.process(ControlChangeEvent(0, 6, 65)) == []
+    result = assembler.process(ControlChangeEvent(0, 38, 2))
+    assert [(e.param, e.value) for e in result] == [(1, 65 << 7 | 2)]
+
+    # NRPN
+    assert assembler.process(ControlChangeEvent(0, 99, 1)) == []
+    assert assembler.process(ControlChangeEvent(0, 98, 8)) == []
+    assert assembler.process(ControlChangeEvent(0, 6, 10)) == []
+    # new selection releases the held MSB
+    result = assembler.process(ControlChangeEvent(0, 101, 127))
+    assert len(result) == 1
+    assert isinstance(result[0], NonRegisteredParameterChangeEvent)
+    assert (result[0].param, result[0].value) == (1 << 7 | 8, 10 << 7)
+
+    # RPN null – data entry not assembled any more
+    assert assembler.process(ControlChangeEvent(0, 100, 127)) == []
+    event = ControlChangeEvent(0, 6, 3)
+    assert assembler.process(event) == [event]
+
+    assembler.reset()
+    assert assembler.flush(force=True) == []
+
+
+@pytest.mark.require_alsa_seq
+def test_assembler_event_input():
+    sender = SequencerClient("test_sender")
+    out_port = sender.create_port("output", READ_PORT)
+    client = SequencerClient("test_assembler")
+    in_port = client.create_port("input", WRITE_PORT)
+    out_port.connect_to(in_port)
+
+    for param, value in ((101, 0), (100, 0), (6, 2), (38, 0), (6, 12)):
+        sender.event_output(ControlChangeEvent(0, param, value))
+    sender.drain_output()
+
+    assembler = ParameterAssembler(0.05)
+    events = []
+    while True:
+        event = assembler.event_input(client, timeout=0.2)
+        if event is None:
+            break
+        events.append(event)
+
+    assert [type(e) for e in events] == [RegisteredParameterChangeEvent] * 3
+    assert [e.value for e in events] == [2 << 7, 2 << 7, 12 << 7]
+
+    sender.close()
+    client.close()
+
+
+def test_stage_abstract():
+    with pytest.raises(TypeError):
+        _Stage()  # type: ignore
@@ -1,7 +1,7 @@
 import pytest
 
 from alsa_midi import (READ_PORT, NoteOffEvent, NoteOnEvent, RemoveCondition, RemoveEvents,
-                       SequencerClient)
+                       SequencerClient, alsa)
 
 
 @pytest.mark.require_alsa_seq
@@ -102,4 +102,51 @@ def test_remove_output_events_object():
 
     client.close()
 
+
+def test_remove_events_object_reuse():
+    re = RemoveEvents(condition=RemoveCondition.OUTPUT | RemoveCondition.TAG_MATCH, tag=5)
+    a_cond = re._to_alsa()
+    assert alsa.snd_seq_remove_events_get_tag(a_cond) == 5
+
+    re.tag = 7
+    re.time = 100
+    assert re._to_alsa() is a_cond
+    assert alsa.snd_seq_remove_events_get_tag(a_cond) == 7
+    assert alsa.snd_seq_remove_events_get_time(a_cond).tick == 100
+
+    re.channel = 3
+    a_cond2 = re._to_alsa()
+    assert a_cond2 is not a_cond
+    assert alsa.snd_seq_remove_events_get_channel(a_cond2) == 3
+    assert alsa.snd_seq_remove_events_get_tag(a_cond2) == 7
+
+    assert re == RemoveEvents(condition=RemoveCondition.OUTPUT | RemoveCondition.TAG_MATCH,
+                              time=100, channel=3, tag=7)
+
+
+@pytest.mark.require_alsa_seq
+def test_remove_events_tags():
+    client = SequencerClient("test")
+    client.create_port("output", READ_PORT)
+
+    client.event_output(NoteOnEvent(note=60, tag=1))
+    client.event_output(NoteOnEvent(note=61, tag=2))
+    pending1 = client.event_output_pending()
+
+    client.event_output(NoteOnEvent(note=62, tag=3))
+    pending2 = client.event_output_pending()
+    assert pending2 > pending1
+
+    re = RemoveEvents(condition=RemoveCondition.OUTPUT)
+    client.remove_events_tags([1, 2], re)
+    assert re.condition == RemoveCondition.OUTPUT
+
+    pending3 = client.event_output_pending()
+    assert pending3 == pending2 - pending1
+
+    client.remove_events_tags([3])
+    assert client.event_output_pending() == 0
+
+    client.close()
+
 # TODO: more tests, to test all the scenarios actually supported by ALSA
@@ -0,0 +1,178 @@
+import asyncio
+import os
+
+import pytest
+
+from alsa_midi import (READ_PORT, WRITE_PORT, Address, ControlChangeEvent, EventType, ForwardRule,
+                       KeyPressureEvent, NoteEvent, NoteOffEvent, NoteOnEvent, Route, Router,
+                       SequencerClient, SysExEvent, ffi)
+from alsa_midi.routing import _CompiledRoute
+
+
+class OutputRecorder:
+    """Stands for the client, recording (type, velocity) of the note events routed."""
+
+    def __init__(self):
+        self._fd, self._wake_fd = os.pipe()
+        self.notes = []
+
+    def _event_output_wait(self, func):
+        alsa_event = func.args[0]
+        self.notes.append((alsa_event.type, alsa_event.data.note.velocity))
+
+    def close(self):
+        os.close(self._fd)
+        os.close(self._wake_fd)
+
+
+def test_compiled_route():
+    route = _CompiledRoute(Route(source=Address(20, 0),
+                                 channels=[0, 2],
+                                 notes=(36, 59),
+                                 velocity=[min(v * 2, 127) for v in range(128)],
+                                 controllers={1: 11},
+                                 transpose=12))
+    assert route.source == (20, 0)
+    assert route.channels == (True, False, True) + (False,) * 13
+    assert (route.note_low, route.note_high) == (36, 59)
+    assert route.velocity[10] == 20
+    assert route.velocity[100] == 127
+    assert route.controllers[1] == 11
+    assert route.controllers[2] == 2
+    assert route.transpose == 12
+
+    route = _CompiledRoute(ForwardRule(channel=1))
+    assert route.source is None
+    assert route.channels is None
+    assert (route.note_low, route.note_high) == (0, 127)
+    assert route.channel_map == [1] * 16
+
+    with pytest.raises(ValueError):
+        _CompiledRoute(Route(velocity=[1, 2, 3]))
+
+
+def test_router_velocity_note_off():
+    client = OutputRecorder()
+    router = Router(client, [Route(port=1, velocity=[64] * 128)])  # type: ignore
+    alsa_event = ffi.new("snd_seq_event_t *")
+    for event in [NoteOnEvent(60, velocity=100), NoteOnEvent(60, velocity=0),
+                  NoteOffEvent(60, velocity=10), KeyPressureEvent(60, velocity=20),
+                  NoteEvent(60, velocity=30)]:
+        event._to_alsa(alsa_event)
+        assert router.forward_event(alsa_event) == 1
+    client.close()
+
+    assert client.notes == [(EventType.NOTEON, 64),
+                            (EventType.NOTEON, 0),
+                            (EventType.NOTEOFF, 10),
+                            (EventType.KEYPRESS, 20),
+                            (EventType.NOTE, 64)]
+
+
+def make_clients():
+    sender = SequencerClient("test_sender")
+    out_port = sender.create_port("output", READ_PORT)
+    client = SequencerClient("test_router")
+    in_port = client.create_port("input", WRITE_PORT)
+    route_port = client.create_port("output", READ_PORT)
+    receiver = SequencerClient("test_receiver")
+    lower = receiver.create_port("lower", WRITE_PORT)
+    upper = receiver.create_port("upper", WRITE_PORT)
+    out_port.connect_to(in_port)
+    return sender, client, route_port, receiver, lower, upper
+
+
+def split_routes(route_port, lower, upper):
+    return [
+        Route(event_types=[EventType.NOTEON, EventType.NOTEOFF], notes=(0, 59),
+              port=route_port, dest=lower, channel=1),
+        Route(event_types=[EventType.NOTEON, EventType.NOTEOFF], notes=(60, 127),
+              port=route_port, dest=upper, transpose=-12,
+              velocity=[64] * 128),
+        Route(event_types=[EventType.CONTROLLER], channels=[0], controllers={1: 74},
+              port=route_port, dest=upper),
+        Route(port=route_port, dest=lower, channels=[5]),
+    ]
+
+
+@pytest.mark.require_alsa_seq
+def test_router(receive_all):
+    sender, client, route_port, receiver, lower, upper = make_clients()
+    router = Router(client, split_routes(route_port, lower, upper))
+
+    sender.event_output(NoteOnEvent(48, velocity=100))
+    sender.event_output(NoteOnEvent(72, velocity=100))
+    sender.event_output(NoteOffEvent(72))
+    sender.event_output(ControlChangeEvent(0, 1, 50))
+    sender.event_output(ControlChangeEvent(1, 1, 50))
+    sender.event_output(ControlChangeEvent(5, 7, 10))
+    sender.event_output(SysExEvent(b"\xf0\x7e\xf7"))
+    sender.drain_output()
+
+    assert router.run(timeout=0.1) == 7
+    assert router.forwarded == 5
+    assert router.dropped == 2
+
+    events = receive_all(receiver)
+    to_lower = [e for e in events if e.dest == Address(lower)]
+    to_upper = [e for e in events if e.dest == Address(upper)]
+
+    assert len(to_lower) == 2
+    assert to_lower[0].note == 48 and to_lower[0].channel == 1 and to_lower[0].velocity == 100
+    assert to_lower[1].param == 7 and to_lower[1].channel == 5
+
+    assert len(to_upper) == 3
+    assert isinstance(to_upper[0], NoteOnEvent)
+    assert to_upper[0].note == 60 and to_upper[0].velocity == 64
+    assert isinstance(to_upper[1], NoteOffEvent)
+    assert to_upper[1].note == 60
+    assert to_upper[2].param == 74 and to_upper[2].value == 50
+
+    sender.close()
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_router_thread(receive_all):
+    sender, client, route_port, receiver, lower, upper = make_clients()
+    router = Router(client, split_routes(route_port, lower, upper))
+    router.start()
+    try:
+        for note in range(40, 80):
+            sender.event_output(NoteOnEvent(note))
+        sender.drain_output()
+        events = receive_all(receiver)
+    finally:
+        router.stop()
+
+    assert [e.note for e in events] == list(range(40, 60)) + list(range(48, 68))
+
+    sender.close()
+    client.close()
+    receiver.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_router_async(receive_all):
+    sender, client, route_port, receiver, lower, upper = make_clients()
+    router = Router(client, split_routes(route_port, lower, upper))
+
+    async def main():
+        task = asyncio.create_task(router.run_async())
+        await asyncio.sleep(0.01)
+        sender.event_output(NoteOnEvent(50))
+        sender.drain_output()
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    events = receive_all(receiver)
+    assert [(e.note, e.dest) for e in events] == [(50, Address(lower))]
+
+    sender.close()
+    client.close()
+    receiver.close()
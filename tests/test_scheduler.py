@@ -0,0 +1,69 @@
+import pytest
+
+from alsa_midi import RW_PORT, EchoEvent, EchoScheduler, NoteOnEvent, SequencerClient
+
+
+@pytest.mark.require_alsa_seq
+def test_scheduler_ticks():
+    client = SequencerClient("test")
+    port = client.create_port("scheduler", RW_PORT)
+    queue = client.create_queue()
+
+    scheduler = EchoScheduler(client, queue, port, tag=5)
+
+    calls = []
+    scheduler.call_at_tick(20, calls.append, "b")
+    scheduler.call_at_tick(10, calls.append, "a")
+    cancelled = scheduler.call_at_tick(15, calls.append, "x")
+    scheduler.call_at_tick(30, lambda: calls.append(queue.get_status().tick_time))
+    assert len(scheduler) == 4
+    assert scheduler.cancel(cancelled) is True
+    assert scheduler.cancel(cancelled) is False
+    assert len(scheduler) == 3
+
+    queue.start()
+    client.drain_output()
+    scheduler.run()
+
+    assert calls[:2] == ["a", "b"]
+    assert calls[2] >= 30
+    assert len(scheduler) == 0
+
+    client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_scheduler_real_time():
+    client = SequencerClient("test")
+    port = client.create_port("scheduler", RW_PORT)
+    queue = client.create_queue()
+
+    scheduler = EchoScheduler(client, queue, port)
+
+    calls = []
+    scheduler.call_at_time(0.05, calls.append, 1)
+    scheduler.call_at_time(0.1, calls.append, 2)
+
+    queue.start()
+    client.drain_output()
+    scheduler.run()
+
+    assert calls == [1, 2]
+    assert float(queue.get_status().real_time) >= 0.1
+
+    client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_scheduler_other_events():
+    client = SequencerClient("test")
+    port = client.create_port("scheduler", RW_PORT)
+    queue = client.create_queue()
+
+    scheduler = EchoScheduler(client, queue, port, tag=5)
+    assert scheduler.handle_event(NoteOnEvent(note=60, source=port)) is False
+    assert scheduler.handle_event(EchoEvent(tag=4, source=port, raw_data=bytes(12))) is False
+    assert scheduler.handle_event(EchoEvent(tag=5, source=(0, 1), raw_data=bytes(12))) is False
+    assert scheduler.handle_event(EchoEvent(tag=5, source=port, raw_data=bytes(12))) is True
+
+    client.close()
@@ -0,0 +1,109 @@
+import pytest
+
+from alsa_midi import (READ_PORT, WRITE_PORT, MidiBytesEvent, NoteOnEvent, SequencerClient,
+                       StateError, get_shared_client)
+
+
+@pytest.mark.require_alsa_seq
+def test_shared_client_single_connection():
+    view1 = get_shared_client("test1")
+    view2 = get_shared_client("test2")
+    try:
+        assert view1.client_id == view2.client_id
+        info = view1.get_client_info()
+        assert info.name == "test1"
+    finally:
+        view1.close()
+    # second view still usable
+    info = view2.get_client_info()
+    assert info.client_id == view2.client_id
+    view2.close()
+
+    with pytest.raises(RuntimeError):
+        view2.get_client_info()
+
+    # new connection opened when all the views have been closed
+    view3 = get_shared_client("test3")
+    try:
+        assert view3.get_client_info().name == "test3"
+    finally:
+        view3.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_shared_client_demux():
+    client = SequencerClient("test")
+    out_port = client.create_port("output", READ_PORT)
+
+    view1 = get_shared_client("test")
+    view2 = get_shared_client("test")
+    try:
+        port1 = view1.create_port("in1", WRITE_PORT)
+        port2 = view2.create_port("in2", WRITE_PORT, prefer_bytes=True)
+        assert port1.port_id != port2.port_id
+
+        client.event_output(NoteOnEvent(note=60), port=out_port, dest=port1)
+        client.event_output(NoteOnEvent(note=61), port=out_port, dest=port2)
+        client.drain_output()
+
+        event1 = view1.event_input(timeout=1)
+        assert isinstance(event1, NoteOnEvent)
+        assert event1.note == 60
+
+        event2 = view2.event_input(timeout=1)
+        assert isinstance(event2, MidiBytesEvent)
+        assert event2.midi_bytes == b"\x90\x3d\x7f"
+
+        assert view1.event_input(timeout=0.1) is None
+        assert view2.event_input(timeout=0.1) is None
+
+        # output through a view
+        in_port = client.create_port("input", WRITE_PORT)
+        view1.event_output(NoteOnEvent(note=62), port=port1, dest=in_port)
+        view1.drain_output()
+        event = client.event_input(timeout=1)
+        assert isinstance(event, NoteOnEvent)
+        assert event.note == 62
+
+        view1.close_port(port1)
+        with pytest.raises(ValueError):
+            view2.close_port(port1)
+    finally:
+        view1.close()
+        view2.close()
+        client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_shared_client_input_error():
+    client = SequencerClient("test")
+    out_port = client.create_port("output", READ_PORT)
+
+    view = get_shared_client("test")
+    try:
+        port = view.create_port("in", WRITE_PORT)
+        connection = view._connection
+        assert connection is not None
+
+        def failing_decode(*args, **kwargs):
+            raise ValueError("decoding failed")
+
+        connection.client._decode_event = failing_decode  # type: ignore
+
+        client.event_output(NoteOnEvent(note=60), port=out_port, dest=port)
+        client.drain_output()
+
+        with pytest.raises(StateError) as exc_info:
+            view.event_input(timeout=1)
+        assert isinstance(exc_info.value.__cause__, ValueError)
+        # still failing, not waiting forever
+        with pytest.raises(StateError):
+            view.event_input()
+
+        other_view = get_shared_client("test")
+        with pytest.raises(StateError):
+            other_view.event_input()
+        other_view.close()
+    finally:
+        view.close()
+        client.close()
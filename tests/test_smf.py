@@ -0,0 +1,210 @@
+import io
+import os
+
+import pytest
+
+from alsa_midi import (READ_PORT, RW_PORT, SYSTEM_TIMER, WRITE_PORT, ControlChangeEvent, MidiFile,
+                       MidiFilePlayer, MidiFileRecorder, MidiFileWriter, NoteOffEvent, NoteOnEvent,
+                       PitchBendEvent, ProgramChangeEvent, SequencerClient, SetQueueTempoEvent,
+                       StartEvent, SysExEvent, smf)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+C_MAJOR = [60, 62, 64, 65, 67, 69, 71, 72]
+
+
+def make_smf(tracks, format=1, division=96):
+    data = [b"MThd\x00\x00\x00\x06",
+            format.to_bytes(2, "big"),
+            len(tracks).to_bytes(2, "big"),
+            division.to_bytes(2, "big")]
+    for track in tracks:
+        track += b"\x00\xff\x2f\x00"
+        data += [b"MTrk", len(track).to_bytes(4, "big"), track]
+    return io.BytesIO(b"".join(data))
+
+
+def test_read_c_major():
+    with MidiFile(os.path.join(DATA_DIR, "c_major.mid")) as midi_file:
+        assert midi_file.format == 0
+        assert midi_file.ppq == 96
+        assert len(midi_file) == 1
+        events = list(midi_file.events(queue=1))
+
+    tempo = events[0]
+    assert isinstance(tempo, SetQueueTempoEvent)
+    assert tempo.midi_tempo == 50000
+    assert tempo.control_queue == 1
+    assert tempo.dest == SYSTEM_TIMER
+    assert tempo.tick == 0
+
+    notes = events[1:]
+    assert [type(e) for e in notes] == [NoteOnEvent, NoteOffEvent] * 8
+    assert [e.note for e in notes] == [n for n in C_MAJOR for _ in range(2)]
+    assert [e.tick for e in notes] == [t for i in range(8) for t in (i * 96, i * 96 + 96)]
+
+
+def test_merge_tracks():
+    track1 = (b"\x00\xff\x51\x03\x07\xa1\x20"  # tempo
+              b"\x00\x90\x3c\x40"              # note on
+              b"\x60\x3c\x00"                  # running status
+              b"\x81\x40\x91\x3e\x40")         # at tick 288
+    track2 = (b"\x30\xb1\x07\x64"              # CC at tick 48
+              b"\x00\xc1\x05"                  # program change
+              b"\x30\xe1\x00\x40"              # pitch bend at tick 96
+              b"\x00\xf0\x03\x7e\x01\xf7")     # sysex at tick 96
+    midi_file = MidiFile(make_smf([track1, track2]))
+    events = list(midi_file.events())
+
+    assert [(type(e), e.tick) for e in events] == [
+            (SetQueueTempoEvent, 0),
+            (NoteOnEvent, 0),
+            (ControlChangeEvent, 48),
+            (ProgramChangeEvent, 48),
+            (NoteOnEvent, 96),
+            (PitchBendEvent, 96),
+            (SysExEvent, 96),
+            (NoteOnEvent, 288),
+            ]
+    assert events[0].midi_tempo == 500000
+    assert events[4].note == 0x3c and events[4].velocity == 0
+    assert events[2].channel == 1 and events[2].param == 7 and events[2].value == 100
+    assert events[3].value == 5
+    assert events[5].value == 0
+    assert events[6].data == b"\xf0\x7e\x01\xf7"
+    assert events[7].note == 0x3e and events[7].channel == 1
+
+
+def test_read_small_blocks(monkeypatch):
+    monkeypatch.setattr(smf, "_BLOCK_SIZE", 3)
+    with MidiFile(os.path.join(DATA_DIR, "c_major.mid")) as midi_file:
+        events = list(midi_file.events())
+    assert [e.note for e in events[1::2]] == C_MAJOR
+
+
+def test_invalid_files():
+    with pytest.raises(ValueError):
+        MidiFile(io.BytesIO(b"RIFF\x00\x00\x00\x06\x00\x00\x00\x01\x00\x60"))
+    with pytest.raises(ValueError):
+        MidiFile(make_smf([], division=0xe728))
+
+    midi_file = MidiFile(make_smf([b"\x00\x3c\x40"]))
+    with pytest.raises(ValueError):
+        list(midi_file.events())
+
+    data = make_smf([b"\x00\x90\x3c\x40"]).getvalue()
+    midi_file = MidiFile(io.BytesIO(data[:-3]))
+    with pytest.raises(ValueError):
+        list(midi_file.events())
+
+
+def test_write_read():
+    output = io.BytesIO()
+    writer = MidiFileWriter(output, ppq=480, buffer_size=8)
+    assert writer.write_event(SetQueueTempoEvent(400000), tick=0)
+    assert writer.write_event(NoteOnEvent(60, 2, 100, tick=0))
+    assert writer.write_event(NoteOnEvent(64, 2, 100, tick=10))
+    assert not writer.write_event(StartEvent(tick=20))
+    assert writer.write_event(PitchBendEvent(2, -8192), tick=480)
+    assert writer.write_event(SysExEvent(b"\xf0\x7e\x01\xf7", tick=500))
+    assert writer.write_event(ControlChangeEvent(15, 7, 0, tick=100000))
+    # out of order – written at the same tick as the previous one
+    assert writer.write_event(NoteOffEvent(64, 2, 0, tick=90000))
+    writer.close()
+
+    data = output.getvalue()
+    # running status used for the second note
+    assert b"\x0a\x40\x64" in data
+    assert int.from_bytes(data[18:22], "big") == len(data) - 22
+
+    midi_file = MidiFile(io.BytesIO(data))
+    assert midi_file.format == 0
+    assert midi_file.ppq == 480
+    events = list(midi_file.events())
+    assert [(type(e), e.tick) for e in events] == [
+            (SetQueueTempoEvent, 0),
+            (NoteOnEvent, 0),
+            (NoteOnEvent, 10),
+            (PitchBendEvent, 480),
+            (SysExEvent, 500),
+            (ControlChangeEvent, 100000),
+            (NoteOffEvent, 100000),
+            ]
+    assert events[0].midi_tempo == 400000
+    assert events[2].note == 64 and events[2].channel == 2
+    assert events[3].value == -8192
+    assert events[4].data == b"\xf0\x7e\x01\xf7"
+    assert events[5].channel == 15
+
+
+def test_write_file(tmp_path):
+    path = tmp_path / "test.mid"
+    with MidiFileWriter(path) as writer:
+        for i, note in enumerate(C_MAJOR):
+            writer.write_event(NoteOnEvent(note, tick=i * 96))
+
+    with MidiFile(path) as midi_file:
+        assert [e.note for e in midi_file.events()] == C_MAJOR
+
+
+@pytest.mark.require_alsa_seq
+def test_midi_file_recorder():
+    client = SequencerClient("test")
+    queue = client.create_queue()
+    queue.set_tempo(600000, 192)
+    in_port = client.create_port("input", WRITE_PORT,
+                                 timestamping=True, timestamp_queue=queue)
+    queue.start()
+    client.drain_output()
+
+    sender = SequencerClient("test_sender")
+    out_port = sender.create_port("output", READ_PORT)
+    out_port.connect_to(in_port)
+
+    output = io.BytesIO()
+    recorder = MidiFileRecorder(client, queue, output)
+    for note in C_MAJOR:
+        sender.event_output(NoteOnEvent(note, velocity=64))
+    sender.drain_output()
+    recorder.record(duration=0.2)
+    recorder.close()
+
+    midi_file = MidiFile(io.BytesIO(output.getvalue()))
+    assert midi_file.ppq == 192
+    events = list(midi_file.events())
+    assert events[0].midi_tempo == 600000
+    assert [e.note for e in events[1:]] == C_MAJOR
+
+    client.close()
+    sender.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_midi_file_player():
+    client = SequencerClient("test")
+    port = client.create_port("player", RW_PORT)
+    queue = client.create_queue()
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    player = MidiFilePlayer(client, queue, port, os.path.join(DATA_DIR, "c_major.mid"),
+                            dest=in_port)
+    assert queue.get_tempo().ppq == 96
+    player.play()
+    player.close()
+
+    assert queue.get_tempo().tempo == 50000
+
+    notes = []
+    while True:
+        event = receiver.event_input(timeout=0.1)
+        if event is None:
+            break
+        if isinstance(event, NoteOnEvent):
+            notes.append(event.note)
+
+    assert notes == C_MAJOR
+
+    client.close()
+    receiver.close()
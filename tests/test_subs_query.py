@@ -2,7 +2,8 @@ import errno
 
 import pytest
 
-from alsa_midi import Address, ALSAError, SequencerClient, SubscriptionQuery, SubscriptionQueryType
+from alsa_midi import (Address, ALSAError, AsyncSequencerClient, Connection, SequencerClient,
+                       SubscriptionQuery, SubscriptionQueryType)
 
 
 @pytest.mark.require_alsa_seq
@@ -178,3 +179,62 @@ def test_list_port_subscribers():
 
     client.close()
     other_client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_list_connections(alsa_seq_state):
+    client = SequencerClient("test")
+    p1 = client.create_port("p1")
+    p2 = client.create_port("p2")
+    other_client = SequencerClient("other")
+    other_p1 = other_client.create_port("p1")
+    other_p2 = other_client.create_port("p2")
+
+    p1.connect_to(other_p1)
+    p1.connect_from(other_p2)
+    p2.connect_from(other_p1)
+    p2.connect_from(other_p2)
+
+    connections = client.list_connections()
+    assert all(isinstance(conn, Connection) for conn in connections)
+
+    ours = [conn for conn in connections
+            if conn.sender.client_id in (client.client_id, other_client.client_id)]
+    assert sorted(ours) == sorted([
+        Connection(Address(p1), Address(other_p1)),
+        Connection(Address(other_p2), Address(p1)),
+        Connection(Address(other_p1), Address(p2)),
+        Connection(Address(other_p2), Address(p2)),
+        ])
+
+    alsa_seq_state.load()
+    expected = set()
+    for (client_id, port_id), alsa_port in alsa_seq_state.ports.items():
+        if client_id == 0:
+            continue
+        for dest in alsa_port.connected_to:
+            expected.add((Address(client_id, port_id), Address(dest)))
+    assert set((conn.sender, conn.dest) for conn in connections) == expected
+
+    with_system = client.list_connections(include_system=True)
+    assert set(ours) <= set(with_system)
+
+    client.close()
+    other_client.close()
+
+
+@pytest.mark.require_alsa_seq
+@pytest.mark.asyncio
+async def test_list_connections_async():
+    client = AsyncSequencerClient("test")
+    p1 = client.create_port("p1")
+    other_client = SequencerClient("other")
+    other_p1 = other_client.create_port("p1")
+
+    p1.connect_to(other_p1)
+
+    connections = await client.list_connections()
+    assert Connection(Address(p1), Address(other_p1)) in connections
+
+    await client.aclose()
+    other_client.close()
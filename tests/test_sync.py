@@ -0,0 +1,128 @@
+import itertools
+import time
+
+import pytest
+
+from alsa_midi import (RW_PORT, WRITE_PORT, ClockEvent, ClockFollower, ClockGenerator, NoteOnEvent,
+                       QueueTempo, RealTime, RemoveCondition, RemoveEvents, SequencerClient,
+                       StartEvent, StopEvent)
+from alsa_midi.sync import CLOCK_TAG, SKEW_BASE
+
+
+class SkewRecorder:
+    """Stands for the client, recording the skew events sent."""
+
+    def __init__(self):
+        self.skews = []
+
+    def event_output(self, event, port=None):
+        self.skews.append(event.value)
+
+    def drain_output(self):
+        pass
+
+
+def test_clock_follower_skewed_timestamps():
+    client = SkewRecorder()
+    now = 0.0
+    follower = ClockFollower(client, None, tempo=QueueTempo(500000, 96),  # type: ignore
+                             follow_transport=False, smoothing=0.5, clock=lambda: now)
+
+    # master at 125 BPM, clocks timestamped by the skewed queue itself
+    queue_time = 0.0
+    for _ in range(240):
+        now += 0.02
+        queue_time += 0.02 * follower.skew / SKEW_BASE
+        follower.handle_event(ClockEvent(time=RealTime(queue_time)))
+
+    assert follower.bpm == pytest.approx(125.0)
+    assert follower.skew == pytest.approx(SKEW_BASE * 125 / 120, rel=0.001)
+    # converged, not oscillating
+    assert len(client.skews) == 1
+
+
+@pytest.mark.require_alsa_seq
+def test_clock_follower_tempo():
+    client = SequencerClient("test")
+    queue = client.create_queue()
+    queue.set_tempo(500000, 96)
+
+    # master at 125 BPM
+    times = (i * 0.02 for i in itertools.count())
+    follower = ClockFollower(client, queue, follow_transport=False, smoothing=0.5,
+                             clock=lambda: next(times))
+    assert follower.bpm is None
+
+    for _ in range(48):
+        assert follower.handle_event(ClockEvent()) is True
+
+    assert follower.bpm == pytest.approx(125.0)
+    assert follower.skew == pytest.approx(0x10000 * 125 / 120, rel=0.001)
+    assert queue.get_tempo().skew == follower.skew
+
+    assert follower.handle_event(StartEvent()) is False
+    assert follower.handle_event(NoteOnEvent(note=60)) is False
+
+    follower.reset()
+    assert follower.bpm is None
+    assert queue.get_tempo().skew == 0x10000
+
+    client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_clock_follower_transport():
+    client = SequencerClient("test")
+    queue = client.create_queue()
+    queue.set_tempo(500000, 96)
+
+    follower = ClockFollower(client, queue)
+    assert follower.handle_event(StartEvent()) is True
+    assert queue.get_status().running is True
+
+    with pytest.raises(ValueError):
+        ClockFollower(client, queue, smoothing=0)
+
+    client.close()
+
+
+@pytest.mark.require_alsa_seq
+def test_clock_generator(receive_all):
+    client = SequencerClient("test")
+    port = client.create_port("clock", RW_PORT)
+    queue = client.create_queue()
+    queue.set_tempo(250000, 96)
+
+    receiver = SequencerClient("test_receiver")
+    in_port = receiver.create_port("input", WRITE_PORT)
+
+    generator = ClockGenerator(client, queue, port, dest=in_port, lookahead_ticks=24)
+    assert generator.tag == CLOCK_TAG
+    assert generator.scheduler.tag == CLOCK_TAG
+    generator.start()
+    # only the first window scheduled
+    assert queue.get_status().events <= 9
+
+    # as done by a QueuePlayer with the default tag, must not stop the clock
+    client.remove_events(RemoveEvents(RemoveCondition.OUTPUT | RemoveCondition.TAG_MATCH,
+                                      queue_id=queue.queue_id, tag=0))
+
+    end = time.monotonic() + 0.5
+    while time.monotonic() < end:
+        event = client.event_input(timeout=0.1)
+        if event is not None:
+            assert generator.handle_event(event)
+    generator.stop()
+
+    received = receive_all(receiver)
+
+    assert isinstance(received[0], StartEvent)
+    assert isinstance(received[-1], StopEvent)
+    clocks = received[1:-1]
+    # 4 BPS * 24 PPQN * 0.5 s
+    assert 40 <= len(clocks) <= 56
+    assert all(isinstance(event, ClockEvent) for event in clocks)
+    assert [event.tick for event in clocks] == [i * 4 for i in range(len(clocks))]
+
+    client.close()
+    receiver.close()
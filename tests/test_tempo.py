@@ -0,0 +1,76 @@
+import pytest
+
+from alsa_midi import NoteOnEvent, QueueTempo, RealTime, SetQueueTempoEvent, TempoMap
+
+
+def test_tempo_map_single():
+    tempo_map = TempoMap(500000, 96)
+    assert len(tempo_map) == 1
+    assert tempo_map.tick_to_time(0) == RealTime(0)
+    assert tempo_map.tick_to_time(96) == RealTime(0, 500000000)
+    assert tempo_map.tick_to_time(192 * 10) == RealTime(10)
+    assert tempo_map.time_to_tick(0.5) == 96
+    assert tempo_map.time_to_tick(RealTime(10)) == 1920
+    assert tempo_map.tempo_at(1000) == 500000
+
+
+def test_tempo_map_queue_tempo():
+    tempo_map = TempoMap(QueueTempo(tempo=1000000, ppq=480))
+    assert tempo_map.ppq == 480
+    assert tempo_map.tick_to_time(480) == RealTime(1)
+
+    with pytest.raises(ValueError):
+        TempoMap(500000, 0)
+    with pytest.raises(ValueError):
+        TempoMap(0)
+
+
+def test_tempo_map_changes():
+    tempo_map = TempoMap(500000, 96)
+    tempo_map.set_tempo(192, 250000)
+    tempo_map.set_tempo(96, 1000000)
+    assert list(tempo_map) == [(0, 500000), (96, 1000000), (192, 250000)]
+
+    assert tempo_map.tick_to_time(96) == RealTime(0.5)
+    assert tempo_map.tick_to_time(192) == RealTime(1.5)
+    assert tempo_map.tick_to_time(288) == RealTime(1.75)
+    assert tempo_map.time_to_tick(1.0) == 144
+    assert tempo_map.time_to_tick(1.75) == 288
+    assert tempo_map.tempo_at(95) == 500000
+    assert tempo_map.tempo_at(96) == 1000000
+    assert tempo_map.tempo_at(1000) == 250000
+
+    # replace
+    tempo_map.set_tempo(96, 500000)
+    assert len(tempo_map) == 3
+    assert tempo_map.tick_to_time(192) == RealTime(1)
+
+    tempo_map.clear()
+    assert list(tempo_map) == [(0, 500000)]
+
+
+def test_tempo_map_round_trip():
+    tempo_map = TempoMap(500000, 96)
+    tempo_map.set_tempo(100, 333333)
+    tempo_map.set_tempo(1000, 777777)
+    for tick in range(0, 2000, 3):
+        assert tempo_map.time_to_tick(tempo_map.tick_to_time(tick)) == tick
+
+
+def test_tempo_map_batch():
+    tempo_map = TempoMap(500000, 96)
+    tempo_map.set_tempo(100, 333333)
+    tempo_map.set_tempo(1000, 777777)
+
+    ticks = list(range(0, 2000, 7)) + [5, 1500, 0]
+    times = tempo_map.ticks_to_times(ticks)
+    assert times == [tempo_map.tick_to_time(tick) for tick in ticks]
+    assert tempo_map.times_to_ticks(times) == ticks
+
+
+def test_tempo_map_add_event():
+    tempo_map = TempoMap(500000, 96)
+    assert tempo_map.add_event(NoteOnEvent(note=60, tick=10)) is False
+    assert tempo_map.add_event(SetQueueTempoEvent(bpm=60, tick=96)) is True
+    assert tempo_map.add_event(SetQueueTempoEvent(bpm=240, time=1.5)) is True
+    assert list(tempo_map) == [(0, 500000), (96, 1000000), (192, 250000)]
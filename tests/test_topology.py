@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from alsa_midi import (SYSTEM_ANNOUNCE, WRITE_PORT, Address, AsyncSequencerClient,
+                       ClientChangeEvent, ClientExitEvent, ClientStartEvent, NoteOnEvent,
+                       PortChangeEvent, PortExitEvent, PortStartEvent, PortSubscribedEvent,
+                       PortUnsubscribedEvent, SequencerClient, SubscriptionQueryType,
+                       TopologyDelta)
+
+
+def test_delta_empty():
+    delta = TopologyDelta()
+    assert not delta
+    assert delta.add_event(NoteOnEvent(60)) is False
+    assert not delta
+
+
+def test_delta_ports():
+    delta = TopologyDelta()
+    assert delta.add_event(PortStartEvent(Address(128, 0))) is True
+    assert delta.add_event(PortStartEvent(Address(128, 1))) is True
+    assert delta.add_event(PortChangeEvent(Address(128, 1))) is True
+    assert delta.add_event(PortChangeEvent(Address(129, 0))) is True
+    assert delta.add_event(PortExitEvent(Address(130, 0))) is True
+    assert delta
+    assert delta.ports_added == {Address(128, 0), Address(128, 1)}
+    assert delta.ports_changed == {Address(129, 0)}
+    assert delta.ports_removed == {Address(130, 0)}
+
+
+def test_delta_ports_collapse():
+    delta = TopologyDelta()
+    # created and removed within the burst
+    delta.add_event(PortStartEvent(Address(128, 0)))
+    delta.add_event(PortChangeEvent(Address(128, 0)))
+    delta.add_event(PortExitEvent(Address(128, 0)))
+    # removed and created again
+    delta.add_event(PortExitEvent(Address(129, 0)))
+    delta.add_event(PortStartEvent(Address(129, 0)))
+    # changed and then removed
+    delta.add_event(PortChangeEvent(Address(130, 0)))
+    delta.add_event(PortExitEvent(Address(130, 0)))
+    assert delta.ports_added == set()
+    assert delta.ports_changed == {Address(129, 0)}
+    assert delta.ports_removed == {Address(130, 0)}
+
+
+def test_delta_clients():
+    delta = TopologyDelta()
+    delta.add_event(ClientStartEvent(Address(128, 0)))
+    delta.add_event(ClientChangeEvent(Address(128, 0)))
+    delta.add_event(ClientChangeEvent(Address(129, 0)))
+    delta.add_event(ClientStartEvent(Address(130, 0)))
+    delta.add_event(ClientExitEvent(Address(130, 0)))
+    delta.add_event(ClientExitEvent(Address(131, 0)))
+    assert delta.clients_added == {128}
+    assert delta.clients_changed == {129}
+    assert delta.clients_removed == {131}
+
+
+def test_delta_connections():
+    a, b, c = Address(128, 0), Address(129, 0), Address(130, 0)
+    delta = TopologyDelta()
+    delta.add_event(PortSubscribedEvent(a, b))
+    delta.add_event(PortSubscribedEvent(a, c))
+    delta.add_event(PortUnsubscribedEvent(a, c))
+    delta.add_event(PortUnsubscribedEvent(b, c))
+    delta.add_event(PortUnsubscribedEvent(c, a))
+    delta.add_event(PortSubscribedEvent(c, a))
+    assert delta.connections_added == {(a, b)}
+    assert delta.connections_removed == {(b, c)}
+
+
+@pytest.mark.require_alsa_seq
+@pytest.mark.asyncio
+async def test_topology_changes():
+    client = AsyncSequencerClient("test")
+
+    changes = client.topology_changes(window=0.2)
+    next_delta = asyncio.ensure_future(changes.__anext__())
+    await asyncio.sleep(0.2)
+
+    other_client = SequencerClient("other")
+    p1 = other_client.create_port("p1")
+    p2 = other_client.create_port("p2")
+    p3 = other_client.create_port("p3")
+    p3_addr = Address(p3)
+    p1.connect_to(p2)
+    p3.close()
+
+    delta = await asyncio.wait_for(next_delta, 5)
+
+    assert other_client.client_id in delta.clients_added
+    assert Address(p1) in delta.ports_added
+    assert Address(p2) in delta.ports_added
+    assert p3_addr not in delta.ports_added
+    assert (Address(p1), Address(p2)) in delta.connections_added
+
+    await changes.aclose()
+    other_client.close()
+    await client.aclose()
+
+
+@pytest.mark.require_alsa_seq
+@pytest.mark.asyncio
+async def test_topology_changes_port():
+    client = AsyncSequencerClient("test")
+    port = client.create_port("announce", caps=WRITE_PORT)
+
+    changes = client.topology_changes(window=0.1, port=port)
+    next_delta = asyncio.ensure_future(changes.__anext__())
+    await asyncio.sleep(0.1)
+    subs = port.list_subscribers(SubscriptionQueryType.WRITE)
+    assert [sub.addr for sub in subs] == [SYSTEM_ANNOUNCE]
+
+    other_client = SequencerClient("other")
+    await asyncio.wait_for(next_delta, 5)
+    await changes.aclose()
+
+    # subscription made for the iteration removed
+    assert port.list_subscribers(SubscriptionQueryType.WRITE) == []
+
+    # subscription made by the caller kept
+    port.connect_from(SYSTEM_ANNOUNCE)
+    changes = client.topology_changes(window=0.1, port=port)
+    next_delta = asyncio.ensure_future(changes.__anext__())
+    await asyncio.sleep(0.1)
+    other_client.close()
+    await asyncio.wait_for(next_delta, 5)
+    await changes.aclose()
+    subs = port.list_subscribers(SubscriptionQueryType.WRITE)
+    assert [sub.addr for sub in subs] == [SYSTEM_ANNOUNCE]
+
+    await client.aclose()